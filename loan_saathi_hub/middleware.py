@@ -1,7 +1,13 @@
+import json
 import logging
 import traceback
 
+from django.conf import settings
+
+from main.timing import RequestTimer
+
 logger = logging.getLogger(__name__)
+slow_logger = logging.getLogger("loan_saathi_hub.slow_requests")
 
 class ExceptionLoggingMiddleware:
     """
@@ -22,3 +28,45 @@ class ExceptionLoggingMiddleware:
                 traceback.format_exc(),
             )
             raise
+
+
+class RequestTimingMiddleware:
+    """
+    Times every request: total, DB (query count + time), template render
+    and outbound calls (Razorpay, SMTP, IMAP, wkhtmltopdf); see main/timing.py.
+
+    • Staff get the numbers as a ``Server-Timing`` header (browser dev tools).
+    • Requests slower than SLOW_REQUEST_MS are logged as one JSON line on the
+      ``loan_saathi_hub.slow_requests`` logger, with the slowest SQL statements.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.REQUEST_TIMING:
+            return self.get_response(request)
+
+        timer = RequestTimer(top_sql=settings.SLOW_REQUEST_TOP_SQL)
+        with timer.activate():
+            response = self.get_response(request)
+        total_ms = timer.total_ms
+
+        user = getattr(request, "user", None)
+        if user is not None and user.is_authenticated and user.is_staff:
+            response["Server-Timing"] = timer.server_timing()
+
+        if total_ms >= settings.SLOW_REQUEST_MS:
+            slow_logger.warning("🐢 Slow request %s", json.dumps({
+                "method": request.method,
+                "path": request.path,
+                "status": response.status_code,
+                "user": getattr(user, "user_id", None) if user is not None and user.is_authenticated else None,
+                "total_ms": round(total_ms, 1),
+                "db_ms": round(timer.db_ms, 1),
+                "queries": timer.queries,
+                "template_ms": round(timer.template_ms, 1),
+                "outbound_ms": {kind: round(ms, 1) for kind, ms in timer.outbound.items()},
+                "slowest_sql": [{**row, "sql": row["sql"][:1000]} for row in timer.slowest_sql()],
+            }))
+        return response
@@ -44,6 +44,7 @@ INSTALLED_APPS = [
 # 🔹 MIDDLEWARE
 # =====================================================
 MIDDLEWARE = [
+    "loan_saathi_hub.middleware.RequestTimingMiddleware",  # first, so it sees the whole request
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -52,6 +53,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "main.middleware.profile_check.ProfileCompletionMiddleware",
     "main.middleware.security_monitor.SecurityMonitorMiddleware",
     "loan_saathi_hub.middleware.ExceptionLoggingMiddleware",
 ]
@@ -63,7 +65,7 @@ ROOT_URLCONF = "loan_saathi_hub.urls"
 # =====================================================
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        "BACKEND": "main.timing.TimedDjangoTemplates",  # DjangoTemplates + render time per request
         "DIRS": [BASE_DIR / "templates"],
         "APP_DIRS": True,
         "OPTIONS": {
@@ -122,6 +124,96 @@ SESSION_ENGINE = "django.contrib.sessions.backends.db"
 MESSAGE_STORAGE = "django.contrib.messages.storage.session.SessionStorage"
 RATELIMIT_USE_CACHE = "default"
 RATELIMIT_CACHE = "default"
+# Seconds a worker may serve its in-memory PageAd snapshot (main/ads.py)
+# before re-checking the database, on top of signal-driven invalidation.
+PAGE_ADS_MAX_AGE = int(os.getenv("PAGE_ADS_MAX_AGE", "300"))
+
+# =====================================================
+# 🔹 RAZORPAY
+# =====================================================
+RAZORPAY_KEY_ID = os.getenv("RAZORPAY_KEY_ID", "")
+RAZORPAY_KEY_SECRET = os.getenv("RAZORPAY_KEY_SECRET", "")
+RAZORPAY_WEBHOOK_SECRET = os.getenv("RAZORPAY_WEBHOOK_SECRET", "")
+# Shared per-worker client (main/razorpay_client.py); the base URL can point
+# at a local stand-in server for tests and benchmarks.
+RAZORPAY_BASE_URL = os.getenv("RAZORPAY_BASE_URL", "https://api.razorpay.com")
+RAZORPAY_CONNECT_TIMEOUT = float(os.getenv("RAZORPAY_CONNECT_TIMEOUT", "3.05"))
+RAZORPAY_READ_TIMEOUT = float(os.getenv("RAZORPAY_READ_TIMEOUT", "10"))
+RAZORPAY_MAX_RETRIES = int(os.getenv("RAZORPAY_MAX_RETRIES", "2"))
+RAZORPAY_RETRY_BACKOFF = float(os.getenv("RAZORPAY_RETRY_BACKOFF", "0.25"))
+RAZORPAY_POOL_SIZE = int(os.getenv("RAZORPAY_POOL_SIZE", "10"))
+
+# =====================================================
+# 🔹 INVOICES
+# =====================================================
+# Render each invoice PDF in the background as soon as its payment completes
+# (main/invoices.py); when off, the first download renders and stores it.
+INVOICE_PRERENDER = os.getenv("INVOICE_PRERENDER", "1").strip().lower() in ("1", "true", "yes")
+# At most this many wkhtmltopdf processes run at once on a host; further
+# renders queue. A render that can't finish in time fails instead of
+# holding the request past the gunicorn timeout.
+PDF_RENDER_WORKERS = int(os.getenv("PDF_RENDER_WORKERS", "2"))
+PDF_RENDER_TIMEOUT = int(os.getenv("PDF_RENDER_TIMEOUT", "60"))
+
+# =====================================================
+# 🔹 EMAIL POOL + OUTBOX
+# =====================================================
+# main.mail_backend.PooledEmailBackend (used on Render) keeps this many
+# authenticated SMTP connections per worker process, NOOP-checks one idle
+# longer than MAX_IDLE seconds, and retires it after MAX_MESSAGES sends.
+EMAIL_POOL_SIZE = int(os.getenv("EMAIL_POOL_SIZE", "3"))
+EMAIL_POOL_MAX_MESSAGES = int(os.getenv("EMAIL_POOL_MAX_MESSAGES", "100"))
+EMAIL_POOL_MAX_IDLE = float(os.getenv("EMAIL_POOL_MAX_IDLE", "30"))
+EMAIL_POOL_WAIT = float(os.getenv("EMAIL_POOL_WAIT", "30"))  # seconds to wait for a free connection
+EMAIL_TIMEOUT = int(os.getenv("EMAIL_TIMEOUT", "20"))
+
+# Transactional mail is queued in OutboundEmail and sent in the background
+# (main/outbox.py). With IN_PROCESS on, each web process runs a sender
+# thread woken on commit; turn it off when `manage.py send_outbox
+# --interval 1` runs as a separate worker.
+EMAIL_OUTBOX_IN_PROCESS = os.getenv("EMAIL_OUTBOX_IN_PROCESS", "1").strip().lower() in ("1", "true", "yes")
+EMAIL_OUTBOX_BATCH_SIZE = int(os.getenv("EMAIL_OUTBOX_BATCH_SIZE", "50"))
+# The in-process sender also wakes this often to pick up retries.
+EMAIL_OUTBOX_POLL_INTERVAL = float(os.getenv("EMAIL_OUTBOX_POLL_INTERVAL", "30"))
+
+# =====================================================
+# 🔹 BACKGROUND JOBS
+# =====================================================
+# DB-backed task queue (main/jobs.py). Run `manage.py run_worker
+# --concurrency N` as a worker process; with IN_PROCESS on, each web
+# process also runs an embedded worker, started on its first enqueue.
+JOBS_IN_PROCESS = os.getenv("JOBS_IN_PROCESS", "1").strip().lower() in ("1", "true", "yes")
+JOBS_IN_PROCESS_CONCURRENCY = int(os.getenv("JOBS_IN_PROCESS_CONCURRENCY", "1"))
+JOBS_POLL_INTERVAL = float(os.getenv("JOBS_POLL_INTERVAL", "5"))
+JOBS_KEEP_DONE_DAYS = int(os.getenv("JOBS_KEEP_DONE_DAYS", "7"))
+# Workers run the reconcile_payments job this often (seconds); 0 = off,
+# e.g. when cron runs `manage.py reconcile_payments` instead.
+RECONCILE_PAYMENTS_EVERY = int(os.getenv("RECONCILE_PAYMENTS_EVERY", "900"))
+
+# =====================================================
+# 🔹 ID ALLOCATION
+# =====================================================
+# user_id / loan_id numbers each worker reserves at a time (main/ids.py).
+# Larger blocks mean fewer counter writes but bigger gaps after restarts.
+ID_BLOCK_SIZE = int(os.getenv("ID_BLOCK_SIZE", "20"))
+
+# =====================================================
+# 🔹 LOAN ↔ LENDER STATUS ROWS
+# =====================================================
+# True: a missing LoanLenderStatus row means "Pending"; rows are only
+# written when a lender acts (approve / reject / pay).
+# False: one Pending row per lender is created at loan submission.
+LAZY_LENDER_STATUSES = os.getenv("LAZY_LENDER_STATUSES", "1").strip().lower() in ("1", "true", "yes")
+
+# =====================================================
+# 🔹 REQUEST TIMING
+# =====================================================
+# loan_saathi_hub.middleware.RequestTimingMiddleware: staff get a
+# Server-Timing header (total / db / template / outbound); requests over
+# SLOW_REQUEST_MS are logged with their SLOW_REQUEST_TOP_SQL slowest queries.
+REQUEST_TIMING = os.getenv("REQUEST_TIMING", "1").strip().lower() in ("1", "true", "yes")
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "1000"))
+SLOW_REQUEST_TOP_SQL = int(os.getenv("SLOW_REQUEST_TOP_SQL", "5"))
 
 # =====================================================
 # 🔹 LANGUAGE & TIMEZONE
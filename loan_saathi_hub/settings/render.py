@@ -67,12 +67,15 @@ DATABASES = {
 
 
 # =====================================================
-# ⚠️ 4) CACHE → LocMem ONLY (100% No Redis)
+# ⚠️ 4) CACHE → shared SQLite file (100% No Redis)
 # =====================================================
+# One cache for every gunicorn worker, so rate limits and cached
+# versions are shared (see main/cache_backend.py). Must be local disk.
 CACHES = {
     "default": {
-        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
-        "LOCATION": "render-locmem",
+        "BACKEND": "main.cache_backend.SQLiteCache",
+        "LOCATION": os.getenv("CACHE_PATH", "/tmp/loan-saathi-cache.sqlite3"),
+        "OPTIONS": {"MAX_ENTRIES": int(os.getenv("CACHE_MAX_ENTRIES", "50000"))},
     }
 }
 
@@ -87,7 +90,7 @@ SILENCED_SYSTEM_CHECKS = ["django_ratelimit.E003", "django_ratelimit.W001"]
 # =====================================================
 # 📧 5) EMAIL SETTINGS
 # =====================================================
-EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
+EMAIL_BACKEND = "main.mail_backend.PooledEmailBackend"  # SMTP with per-worker connection pool
 EMAIL_HOST = "smtp.gmail.com"
 EMAIL_PORT = 587
 EMAIL_USE_TLS = True
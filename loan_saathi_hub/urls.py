@@ -36,6 +36,7 @@ urlpatterns = [
 
     # ---------------- Dashboards ----------------
     path("dashboard/admin/", views.dashboard_admin, name="dashboard_admin"),
+    path("dashboard/admin/data/<str:tab>/", views.dashboard_admin_data, name="dashboard_admin_data"),
     path("dashboard/applicant/", views.dashboard_applicant, name="dashboard_applicant"),
     path("dashboard/lender/", views.dashboard_lender, name="dashboard_lender"),
     path("dashboard/", views.dashboard_router, name="dashboard_router"),
@@ -43,6 +44,7 @@ urlpatterns = [
     # ---------------------- Payment Gateway ---------------------
     path("payment/initiate/", views.initiate_payment, name="initiate_payment"),
     path("payment/callback/", views.payment_callback, name="payment_callback"),
+    path("payment/webhook/", views.razorpay_webhook, name="razorpay_webhook"),
     path("payment/success/", views.payment_success, name="payment_success"),
     path("payment/failure/", views.payment_failure, name="payment_failure"),
     path("payment/invoice/", views.invoice_view, name="invoice"),
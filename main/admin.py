@@ -1,4 +1,5 @@
 from django.contrib import admin
+from django.utils import timezone
 from .models import PageAd
 
 from .models import (
@@ -8,6 +9,8 @@ from .models import (
     LenderDetails,
     LoanRequest,
     PaymentTransaction,
+    OutboundEmail,
+    Job,
 )
 
 
@@ -67,6 +70,31 @@ class PaymentTransactionAdmin(admin.ModelAdmin):
 
 
 
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ("kind", "subject", "status", "priority", "attempts", "created_at", "sent_at", "smtp_ms")
+    list_filter = ("status", "kind", "priority")
+    search_fields = ("subject", "to")
+    readonly_fields = ("created_at", "sent_at", "smtp_ms", "last_error")
+
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("task", "status", "queue", "attempts", "run_at", "finished_at", "duration_ms")
+    list_filter = ("status", "task", "queue")
+    readonly_fields = ("created_at", "started_at", "finished_at", "duration_ms", "locked_by", "locked_until", "last_error")
+    actions = ["retry_jobs"]
+
+    @admin.action(description="Retry selected jobs now")
+    def retry_jobs(self, request, queryset):
+        updated = queryset.exclude(status="Running").update(
+            status="Queued", attempts=0, run_at=timezone.now(), last_error=""
+        )
+        self.message_user(request, f"🔁 {updated} job(s) queued again.")
+
+
+
 @admin.register(PageAd)
 class PageAdAdmin(admin.ModelAdmin):
     list_display = ("title", "page", "position", "size", "is_active", "created_at")
@@ -0,0 +1,67 @@
+"""
+In-process cache of active PageAds, grouped by (page, position).
+
+Every template render used to query PageAd (once from ``ads_context`` and
+once per ``{% show_ads %}`` slot). The ads change rarely, so each process
+keeps one snapshot of all active ads and serves slots from memory.
+
+The snapshot is tagged with a version stored in the Django cache. Saving or
+deleting a PageAd bumps that version, and any process whose snapshot is
+older reloads it on its next lookup. The bump waits for the surrounding
+transaction to commit; bumping earlier would let another worker cache
+pre-commit rows under the new version and keep them. ``PAGE_ADS_MAX_AGE`` bounds how stale a
+snapshot can get when the cache backend isn't shared between workers
+(e.g. LocMemCache).
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from main.models import PageAd
+
+VERSION_KEY = "page_ads:version"
+
+_lock = threading.Lock()
+_snapshot = {"version": None, "loaded_at": 0.0, "slots": {}}
+
+
+def active_ads():
+    """Return ``{(page, position): [PageAd, ...]}`` for all active ads."""
+    version = cache.get(VERSION_KEY, 0)
+    if _snapshot["version"] == version and time.monotonic() - _snapshot["loaded_at"] < settings.PAGE_ADS_MAX_AGE:
+        return _snapshot["slots"]
+
+    with _lock:
+        slots = {}
+        for ad in PageAd.objects.filter(is_active=True).order_by("id"):
+            slots.setdefault((ad.page, ad.position), []).append(ad)
+        _snapshot.update(version=version, loaded_at=time.monotonic(), slots=slots)
+    return slots
+
+
+def ads_for(page=None, position=None):
+    """Active ads for a page and/or position (``None`` matches any)."""
+    slots = active_ads()
+    if page is not None and position is not None:
+        return slots.get((page, position), [])
+    return [
+        ad
+        for (ad_page, ad_position), ads in slots.items()
+        if page in (None, ad_page) and position in (None, ad_position)
+        for ad in ads
+    ]
+
+
+@receiver([post_save, post_delete], sender=PageAd, dispatch_uid="invalidate_page_ads")
+def invalidate_ads(**kwargs):
+    transaction.on_commit(_bump_version)
+
+
+def _bump_version():
+    cache.set(VERSION_KEY, time.time_ns(), None)
+    _snapshot["version"] = None
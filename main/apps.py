@@ -8,3 +8,6 @@ class MainConfig(AppConfig):
     def ready(self):
         # ✅ Signals import karo taaki Django inhe load kare
         import main.models
+        import main.ads  # PageAd cache invalidation
+        import main.invoices  # invoice pre-rendering
+        import main.tasks  # background job registry
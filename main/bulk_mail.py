@@ -0,0 +1,69 @@
+"""
+Segmented bulk email ("all active lenders", ...).
+
+Recipients are streamed from the database in chunks and each chunk is sent
+over one pooled SMTP connection (main/mail_backend.py), one message per
+recipient so addresses are never exposed to each other.
+"""
+import logging
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+
+from main.models import User
+
+logger = logging.getLogger(__name__)
+
+# key → (label, recipients queryset factory)
+SEGMENTS = {
+    "active_lenders": ("All active lenders", lambda: User.objects.filter(role="lender", is_active=True)),
+    "active_applicants": ("All active applicants", lambda: User.objects.filter(role="applicant", is_active=True)),
+    "active_users": ("All active users", lambda: User.objects.filter(is_active=True).exclude(role="admin")),
+}
+
+
+def segment_choices():
+    return [(key, label) for key, (label, _) in SEGMENTS.items()]
+
+
+def segment_recipients(segment):
+    return SEGMENTS[segment][1]().exclude(email="").order_by("pk").values_list("email", flat=True)
+
+
+def send_to_segment(segment, subject, body, batch_size=100, from_email=None):
+    """Send ``subject``/``body`` to everyone in ``segment``. Returns ``(sent, failed)``."""
+    from_email = from_email or settings.DEFAULT_FROM_EMAIL
+    sent = failed = 0
+    batch = []
+
+    def flush():
+        nonlocal sent, failed
+        connection = get_connection()
+        try:
+            connection.open()  # held for the whole batch
+        except Exception as e:
+            logger.error(f"❌ Bulk batch of {len(batch)} to '{segment}' skipped, SMTP unavailable: {e}")
+            failed += len(batch)
+            batch.clear()
+            return
+        try:
+            for to in batch:
+                try:
+                    sent += EmailMessage(subject, body, from_email, [to], connection=connection).send()
+                except Exception as e:
+                    failed += 1
+                    logger.warning(f"⚠️ Bulk mail to {to} failed: {e}")
+                    connection.close()  # a broken session is retired; the next send borrows another
+        finally:
+            connection.close()
+        batch.clear()
+
+    for email in segment_recipients(segment).iterator(chunk_size=batch_size):
+        batch.append(email)
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+
+    logger.info(f"📣 Bulk '{subject}' to {segment}: {sent} sent, {failed} failed")
+    return sent, failed
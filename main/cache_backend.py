@@ -0,0 +1,216 @@
+"""
+Shared cache backend on a local SQLite file (no Redis).
+
+LocMemCache gives every gunicorn worker its own cache, so django_ratelimit
+counters and cached versions (e.g. the PageAd snapshot) are per process.
+This backend keeps one SQLite database in WAL mode on local disk that every
+worker on the instance shares:
+
+* readers never block writers (WAL) and hot pages are served from the
+  memory-mapped file,
+* ``incr``/``decr`` and ``add`` are atomic in SQL (no read-modify-write in
+  Python), so shared counters stay exact across processes,
+* expired keys are ignored on read and purged during culls,
+* past ``MAX_ENTRIES`` the least recently used keys are evicted.
+
+::
+
+    CACHES = {"default": {
+        "BACKEND": "main.cache_backend.SQLiteCache",
+        "LOCATION": "/tmp/loan-saathi-cache.sqlite3",
+        "OPTIONS": {"MAX_ENTRIES": 50000},
+    }}
+
+Only for a single host: the file must be on local disk, never NFS.
+"""
+import os
+import pickle
+import random
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+# A hit refreshes the key's LRU timestamp at most this often, so reads
+# stay read-only transactions almost always.
+ACCESS_RESOLUTION = 30
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires REAL,
+    accessed REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed);
+CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires) WHERE expires IS NOT NULL;
+"""
+
+
+class SQLiteCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+        self.path = location
+        self.mmap_size = options.get("MMAP_SIZE", 64 * 1024 * 1024)
+        self.busy_timeout = options.get("BUSY_TIMEOUT", 5.0)
+        # Culling runs on roughly one write in CULL_EVERY rather than counting rows each time
+        self.cull_every = options.get("CULL_EVERY", 200)
+        self._local = threading.local()
+
+    # -------------------- Connection --------------------
+    def _db(self):
+        local = self._local
+        if getattr(local, "pid", None) != os.getpid():  # never reuse a handle across fork
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            db = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")  # a cache can lose the last commits on power loss
+            db.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+            db.executescript(SCHEMA)
+            local.db, local.pid = db, os.getpid()
+        return local.db
+
+    def _write(self, sql, params=()):
+        cursor = self._db().execute(sql, params)
+        if random.randrange(self.cull_every) == 0:
+            self._cull()
+        return cursor
+
+    # -------------------- Encoding --------------------
+    @staticmethod
+    def _encode(value):
+        # Plain ints are stored as SQLite integers so incr() can do arithmetic in SQL
+        if type(value) is int and -(2**63) <= value < 2**63:
+            return value
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def _decode(value):
+        return value if isinstance(value, int) else pickle.loads(value)
+
+    # -------------------- API --------------------
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        row = self._db().execute(
+            "SELECT value, accessed FROM cache WHERE key = ? AND (expires IS NULL OR expires > ?)", (key, now)
+        ).fetchone()
+        if row is None:
+            return default
+        if row[1] < now - ACCESS_RESOLUTION:
+            self._db().execute("UPDATE cache SET accessed = ? WHERE key = ?", (now, key))
+        return self._decode(row[0])
+
+    def get_many(self, keys, version=None):
+        mapping = {self.make_and_validate_key(key, version=version): key for key in keys}
+        if not mapping:
+            return {}
+        placeholders = ",".join("?" * len(mapping))
+        rows = self._db().execute(
+            f"SELECT key, value FROM cache WHERE key IN ({placeholders}) AND (expires IS NULL OR expires > ?)",
+            (*mapping, time.time()),
+        )
+        return {mapping[key]: self._decode(value) for key, value in rows}
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self._write(
+            "INSERT INTO cache (key, value, expires, accessed) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires = excluded.expires, accessed = excluded.accessed",
+            (key, self._encode(value), self.get_backend_timeout(timeout), time.time()),
+        )
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        db, expires, now = self._db(), self.get_backend_timeout(timeout), time.time()
+        rows = [(self.make_and_validate_key(key, version=version), self._encode(value), expires, now)
+                for key, value in data.items()]
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.executemany(
+                "INSERT INTO cache (key, value, expires, accessed) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires = excluded.expires, accessed = excluded.accessed",
+                rows,
+            )
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        # Inserts, or takes over an expired row; a live key is left alone
+        cursor = self._write(
+            "INSERT INTO cache (key, value, expires, accessed) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires = excluded.expires, accessed = excluded.accessed "
+            "WHERE cache.expires IS NOT NULL AND cache.expires <= ?",
+            (key, self._encode(value), self.get_backend_timeout(timeout), now, now),
+        )
+        return cursor.rowcount == 1
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        db, now = self._db(), time.time()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            updated = db.execute(
+                "UPDATE cache SET value = value + ?, accessed = ? "
+                "WHERE key = ? AND typeof(value) = 'integer' AND (expires IS NULL OR expires > ?)",
+                (delta, now, key, now),
+            ).rowcount
+            row = db.execute("SELECT value FROM cache WHERE key = ? AND (expires IS NULL OR expires > ?)", (key, now)).fetchone()
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        if row is None:
+            raise ValueError(f"Key '{key}' not found.")
+        if not updated:
+            raise TypeError(f"Value of '{key}' is not an integer.")
+        return row[0]
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        cursor = self._write(
+            "UPDATE cache SET expires = ?, accessed = ? WHERE key = ? AND (expires IS NULL OR expires > ?)",
+            (self.get_backend_timeout(timeout), now, key, now),
+        )
+        return cursor.rowcount == 1
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._db().execute(
+            "SELECT 1 FROM cache WHERE key = ? AND (expires IS NULL OR expires > ?)", (key, time.time())
+        ).fetchone() is not None
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._db().execute("DELETE FROM cache WHERE key = ?", (key,)).rowcount == 1
+
+    def delete_many(self, keys, version=None):
+        keys = [self.make_and_validate_key(key, version=version) for key in keys]
+        if keys:
+            self._db().execute(f"DELETE FROM cache WHERE key IN ({','.join('?' * len(keys))})", keys)
+
+    def clear(self):
+        self._db().execute("DELETE FROM cache")
+
+    def close(self, **kwargs):
+        pass  # per-thread connections are kept for the life of the process
+
+    # -------------------- Eviction --------------------
+    def _cull(self):
+        """Drop expired keys, then the least recently used beyond MAX_ENTRIES."""
+        db = self._db()
+        db.execute("DELETE FROM cache WHERE expires IS NOT NULL AND expires <= ?", (time.time(),))
+        excess = db.execute("SELECT COUNT(*) FROM cache").fetchone()[0] - self._max_entries
+        if excess > 0:
+            # Like Django's caches, cull an extra 1/CULL_FREQUENCY so this doesn't run on every write
+            excess += self._max_entries // self._cull_frequency if self._cull_frequency else 0
+            db.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed LIMIT ?)", (excess,)
+            )
@@ -1,6 +1,6 @@
 # main/context_processors.py
 from django.conf import settings
-from .models import PageAd
+from .ads import ads_for
 
 def user_profile(request):
     """
@@ -33,5 +33,4 @@ def testing_mode(request):
 
 def ads_context(request):
     current_page = request.resolver_match.view_name if request.resolver_match else None
-    ads = PageAd.objects.filter(page=current_page, is_active=True)
-    return {"ads_for_page": ads}
+    return {"ads_for_page": ads_for(current_page) if current_page else []}
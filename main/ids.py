@@ -0,0 +1,68 @@
+"""
+Human-readable IDs (LSHA0001, LSHL0001, LSHAD0001, LSH1000000) without a
+query per ID.
+
+Each counter is one IdCounter row. A worker reserves a block of
+``ID_BLOCK_SIZE`` numbers in one short transaction and then hands them
+out from memory, so most allocations cost no round-trip and two workers
+can never get the same number. IDs are unique but not gap-free: numbers
+left in a block when a process exits are simply never used.
+
+Inside a transaction a block can't be kept: if the caller rolls back, so
+does the reservation, and another worker may get the same numbers. There
+a single number is taken in the caller's transaction instead.
+"""
+import os
+import threading
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+
+from main.models import IdCounter
+
+USER_PREFIXES = {"applicant": "LSHA", "lender": "LSHL", "admin": "LSHAD"}
+# Loan IDs used to be "LSH" + 6 random digits; counting from 1000000
+# gives 7 digits, so the sequence can't collide with any of them.
+LOAN_START = 1_000_000
+
+_blocks = {}  # counter name → [next, end), for this process only
+_blocks_pid = None
+_lock = threading.Lock()
+
+
+def reserve_block(name, size, start=1):
+    """Take ``size`` consecutive numbers from the counter; returns the first one."""
+    with transaction.atomic():
+        if not IdCounter.objects.filter(name=name).update(next_value=F("next_value") + size):
+            # First use of this counter (the migration seeds the existing ones)
+            IdCounter.objects.get_or_create(name=name, defaults={"next_value": start})
+            IdCounter.objects.filter(name=name).update(next_value=F("next_value") + size)
+        # The row stays locked until commit, so this reads our own update
+        return IdCounter.objects.values_list("next_value", flat=True).get(name=name) - size
+
+
+def allocate(name, start=1):
+    """Next number from counter ``name`` (first one ever is ``start``)."""
+    global _blocks_pid
+    if connection.in_atomic_block:
+        return reserve_block(name, 1, start)
+    with _lock:
+        if _blocks_pid != os.getpid():  # blocks must not be shared with forked workers
+            _blocks.clear()
+            _blocks_pid = os.getpid()
+        block = _blocks.get(name)
+        if block is None or block[0] >= block[1]:
+            first = reserve_block(name, settings.ID_BLOCK_SIZE, start)
+            block = _blocks[name] = [first, first + settings.ID_BLOCK_SIZE]
+        block[0] += 1
+        return block[0] - 1
+
+
+def next_user_id(role):
+    role = role if role in USER_PREFIXES else "admin"
+    return f"{USER_PREFIXES[role]}{allocate(f'user:{role}'):04d}"
+
+
+def next_loan_id():
+    return f"LSH{allocate('loan', LOAN_START)}"
@@ -0,0 +1,181 @@
+"""
+Pre-rendered invoice PDFs.
+
+An invoice for a Completed PaymentTransaction never changes, so it is
+rendered once (right after the payment completes) and stored under
+``invoices/<txn_id>/<template version>.pdf`` in default storage. Downloads
+stream that file with a strong ETag instead of forking wkhtmltopdf on every
+request. Editing the invoice template changes its version, so stale PDFs
+are simply never looked up again and get re-rendered on demand.
+
+All PDF rendering goes through ``render_pdf()``, which queues jobs on a
+fixed-size pool. Each job also holds one of ``PDF_RENDER_WORKERS`` host-wide
+slot locks, so every gunicorn worker together never runs more than that
+many wkhtmltopdf processes.
+"""
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from decimal import Decimal
+from functools import lru_cache
+
+try:
+    import fcntl
+except ImportError:  # Windows dev boxes: per-process limit only
+    fcntl = None
+
+import pdfkit
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.template.loader import get_template, render_to_string
+from django.utils.text import get_valid_filename
+
+from main import timing
+from main.models import PaymentTransaction
+from main.tasks import prerender_invoice
+
+logger = logging.getLogger(__name__)
+
+INVOICE_TEMPLATE = "payments/invoice.html"
+# Everything that feeds the rendered invoice (the template and what it extends)
+INVOICE_TEMPLATE_SOURCES = (INVOICE_TEMPLATE, "base.html")
+
+WKHTML_PATH = shutil.which("wkhtmltopdf")
+PDFKIT_CONFIG = pdfkit.configuration(wkhtmltopdf=WKHTML_PATH) if WKHTML_PATH else None
+
+
+@lru_cache(maxsize=1)
+def template_version():
+    """Short hash of the invoice template sources; changes on every edit."""
+    digest = hashlib.sha256()
+    for name in INVOICE_TEMPLATE_SOURCES:
+        digest.update(get_template(name).template.source.encode())
+    return digest.hexdigest()[:12]
+
+
+def invoice_context(payment):
+    total_amount = payment.amount or Decimal("49.00")
+    base_amount = (total_amount / Decimal("1.18")).quantize(Decimal("0.01"))
+    gst_amount = (total_amount - base_amount).quantize(Decimal("0.01"))
+
+    user = payment.user
+    profile = getattr(user, "profile", None)
+    user_name = getattr(profile, "full_name", user.email.split("@")[0])
+
+    return {
+        "invoice_number": f"INV-{payment.txn_id[-8:].upper()}",
+        "txn_id": payment.txn_id,
+        "amount": total_amount,
+        "base_amount": base_amount,
+        "gst_amount": gst_amount,
+        "user_email": user.email,
+        "user_name": user_name,
+        "date": payment.created_at.strftime("%d %b %Y, %I:%M %p"),
+        "payment_method": payment.payment_method or "Razorpay",
+    }
+
+
+# -------------------- Bounded PDF rendering --------------------
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _pool():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.PDF_RENDER_WORKERS, thread_name_prefix="pdf-render"
+            )
+    return _executor
+
+
+@contextmanager
+def _host_slot():
+    """Hold one of PDF_RENDER_WORKERS lock files shared by every process on the host."""
+    if fcntl is None:
+        yield
+        return
+    while True:
+        for i in range(settings.PDF_RENDER_WORKERS):
+            handle = open(os.path.join(tempfile.gettempdir(), f"loan-saathi-pdf-{i}.lock"), "a")
+            try:
+                fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                handle.close()
+                continue
+            try:
+                yield
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+                handle.close()
+            return
+        time.sleep(0.05)
+
+
+def _html_to_pdf(html_content):
+    with _host_slot():
+        return pdfkit.from_string(html_content, False, configuration=PDFKIT_CONFIG)
+
+
+def submit_pdf(html_content):
+    """Queue ``html_content`` for rendering; returns a Future resolving to PDF bytes."""
+    return _pool().submit(_html_to_pdf, html_content)
+
+
+def render_pdf(html_content):
+    with timing.outbound("wkhtmltopdf"):  # includes the wait for a free render slot
+        return submit_pdf(html_content).result(timeout=settings.PDF_RENDER_TIMEOUT)
+
+
+def invoice_html(payment):
+    return render_to_string(INVOICE_TEMPLATE, invoice_context(payment))
+
+
+def render_invoice_pdf(payment):
+    return render_pdf(invoice_html(payment))
+
+
+def invoice_etag(payment):
+    return f'"{payment.txn_id}-{template_version()}"'
+
+
+def invoice_pdf_name(payment):
+    return f"invoices/{get_valid_filename(payment.txn_id)}/{template_version()}.pdf"
+
+
+def store_invoice_pdf(payment, pdf):
+    name = invoice_pdf_name(payment)
+    stored = default_storage.save(name, ContentFile(pdf))
+    if stored != name:
+        # Another worker rendered it at the same moment; keep theirs.
+        default_storage.delete(stored)
+    logger.info(f"🧾 Invoice rendered | TxnID={payment.txn_id} | {name}")
+    return name
+
+
+def ensure_invoice_pdf(payment):
+    """Render and store the PDF for ``payment`` unless it already exists; returns the storage name."""
+    name = invoice_pdf_name(payment)
+    if not default_storage.exists(name):
+        store_invoice_pdf(payment, render_invoice_pdf(payment))
+    return name
+
+
+@receiver(post_save, sender=PaymentTransaction, dispatch_uid="prerender_invoice")
+def prerender_completed_invoice(sender, instance, **kwargs):
+    """Queue a background render of the invoice once a payment reaches Completed."""
+    if instance.status != "Completed" or not settings.INVOICE_PRERENDER:
+        return
+    if default_storage.exists(invoice_pdf_name(instance)):
+        return
+    prerender_invoice.enqueue(args=[str(instance.pk)], key=f"invoice:{instance.pk}")
@@ -0,0 +1,320 @@
+"""
+DB-backed background jobs (no Redis).
+
+Register a function with ``@task`` and enqueue it from a view; the Job row
+is written in the caller's transaction, so a rolled-back request never
+leaves a job behind::
+
+    @task(max_attempts=3)
+    def prerender_invoice(payment_pk): ...
+
+    prerender_invoice.delay(payment.pk)
+    prerender_invoice.enqueue(args=[payment.pk], delay=60, key=f"invoice:{payment.pk}")
+
+Workers claim due jobs with ``SELECT ... FOR UPDATE SKIP LOCKED`` on
+Postgres; on SQLite, which has no row locks, queue writes are serialised
+by a host-wide file lock instead. A claimed job holds a lease of the task's
+``timeout``; if its worker dies, the job is picked up again once the lease
+expires. Failures retry with exponential backoff, and a job that runs out
+of attempts is kept as "Dead" for inspection (see the Job admin).
+
+A task registered with ``every=<seconds>`` runs on a schedule: workers
+queue its next run at the following multiple of the interval, under a key
+naming that slot, so any number of workers queue each run once.
+
+Workers run as ``manage.py run_worker --concurrency N``. When
+``JOBS_IN_PROCESS`` is on, each web process also runs a small embedded
+worker, started on its first enqueue, for deployments without a worker
+process.
+"""
+import logging
+import os
+import socket
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+try:
+    import fcntl
+except ImportError:  # Windows dev boxes: per-process lock only
+    fcntl = None
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, connection, transaction
+from django.db.models import Avg, Count, Max, Q
+from django.utils import timezone
+
+from main.models import Job
+
+logger = logging.getLogger(__name__)
+
+TASKS = {}
+
+
+class Task:
+    def __init__(self, func, name, queue, priority, max_attempts, retry_backoff, timeout, every=None):
+        self.func = func
+        self.name = name
+        self.queue = queue
+        self.priority = priority
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.timeout = timeout
+        self.every = every
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def delay(self, *args, **kwargs):
+        """Enqueue with these arguments, to run as soon as a worker is free."""
+        return self.enqueue(args=args, kwargs=kwargs)
+
+    def enqueue(self, args=(), kwargs=None, *, delay=None, run_at=None, key="", priority=None, queue=None):
+        """
+        Enqueue with options. ``delay`` (seconds) or ``run_at`` schedules the
+        job for later; a ``key`` that is already Queued makes this a no-op
+        (returns None).
+        """
+        if key and Job.objects.filter(key=key, status="Queued").exists():
+            return None
+        if run_at is None:
+            run_at = timezone.now() + timedelta(seconds=delay or 0)
+        try:
+            # Savepoint: a concurrent enqueue of the same key loses on the
+            # job_queued_key_uniq constraint without breaking the caller's transaction
+            with transaction.atomic():
+                job = Job.objects.create(
+                    task=self.name, args=list(args), kwargs=kwargs or {}, key=key, run_at=run_at,
+                    queue=queue or self.queue, max_attempts=self.max_attempts,
+                    priority=self.priority if priority is None else priority,
+                )
+        except IntegrityError:
+            if not key:
+                raise
+            return None
+        if settings.JOBS_IN_PROCESS:
+            transaction.on_commit(wake_embedded_worker)
+        return job
+
+
+def task(name=None, queue="default", priority=0, max_attempts=5, retry_backoff=30, timeout=300, every=None):
+    """
+    Register a background task. ``timeout`` (seconds) is the lease a worker
+    holds while running it; keep it above the task's worst-case run time.
+    ``every`` (seconds) has workers run it on that schedule.
+    """
+    def register(func):
+        registered = Task(
+            func, name or f"{func.__module__}.{func.__name__}", queue, priority,
+            max_attempts, retry_backoff, timeout, every,
+        )
+        TASKS[registered.name] = registered
+        return registered
+    return register
+
+
+def schedule_periodic(now=None):
+    """Queue the next run of every ``every=`` task that isn't queued yet."""
+    now = now or timezone.now()
+    for registered in list(TASKS.values()):
+        if registered.every:
+            slot = (int(now.timestamp()) // registered.every + 1) * registered.every
+            registered.enqueue(
+                run_at=datetime.fromtimestamp(slot, dt_timezone.utc), key=f"{registered.name}@{slot}",
+            )
+
+
+# -------------------- Claiming --------------------
+_queue_thread_lock = threading.Lock()
+
+
+@contextmanager
+def _queue_lock():
+    """
+    Serialise writes to the Job table on backends without SKIP LOCKED
+    (SQLite): threads in this process, then processes on this host.
+    """
+    if connection.features.has_select_for_update_skip_locked:
+        yield
+        return
+    with _queue_thread_lock:
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(tempfile.gettempdir(), "loan-saathi-jobs.lock"), "w") as fh:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def claim(worker_id, limit, queues=None):
+    """Lease up to ``limit`` due jobs (or jobs whose lease expired) to ``worker_id``."""
+    if limit <= 0:
+        return []
+    now = timezone.now()
+    due = Job.objects.filter(
+        Q(status="Queued", run_at__lte=now) | Q(status="Running", locked_until__lt=now)
+    ).order_by("priority", "run_at")
+    if queues:
+        due = due.filter(queue__in=queues)
+
+    with _queue_lock(), transaction.atomic():
+        if connection.features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        jobs = list(due[:limit])
+        for job in jobs:
+            lease = TASKS[job.task].timeout if job.task in TASKS else 300
+            job.status = "Running"
+            job.attempts += 1
+            job.locked_by = worker_id
+            job.locked_until = now + timedelta(seconds=lease)
+            job.started_at = now
+        Job.objects.bulk_update(jobs, ["status", "attempts", "locked_by", "locked_until", "started_at"])
+    return jobs
+
+
+# -------------------- Running --------------------
+def run_job(job):
+    """Run one claimed job and record the outcome. Returns the final status."""
+    registered = TASKS.get(job.task)
+    started = time.perf_counter()
+    error = None
+    try:
+        if registered is None:
+            raise LookupError(f"No task registered as {job.task!r}")
+        registered.func(*job.args, **job.kwargs)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        logger.warning(f"⚠️ Job {job} attempt {job.attempts}/{job.max_attempts} failed: {error}", exc_info=True)
+
+    now = timezone.now()
+    fields = {
+        "duration_ms": round((time.perf_counter() - started) * 1000),
+        "finished_at": now, "locked_by": "", "locked_until": None,
+    }
+    if error is None:
+        fields.update(status="Done", last_error="")
+    elif job.attempts >= job.max_attempts:
+        fields.update(status="Dead", last_error=error)
+        logger.error(f"❌ Job {job} is dead after {job.attempts} attempts: {error}")
+    else:
+        backoff = (registered.retry_backoff if registered else 30) * 2 ** (job.attempts - 1)
+        fields.update(status="Queued", last_error=error, run_at=now + timedelta(seconds=backoff))
+
+    if registered and fields["duration_ms"] > registered.timeout * 1000:
+        logger.warning(f"⚠️ Job {job} ran {fields['duration_ms']} ms, past its {registered.timeout}s lease")
+
+    # Only record if we still hold the lease; otherwise another worker owns it now.
+    with _queue_lock():
+        try:
+            with transaction.atomic():
+                Job.objects.filter(pk=job.pk, locked_by=job.locked_by).update(**fields)
+        except IntegrityError:
+            # Its key was queued again while it ran; that job covers the retry.
+            fields.update(status="Dead", last_error=f"{error} (superseded by a newer queued job)")
+            logger.warning(f"⚠️ Job {job} not retried: another job with key {job.key!r} is queued")
+            Job.objects.filter(pk=job.pk, locked_by=job.locked_by).update(**fields)
+    for name, value in fields.items():
+        setattr(job, name, value)
+    return job.status
+
+
+def purge_finished(days):
+    """Delete Done jobs older than ``days``; Dead ones stay until handled."""
+    return Job.objects.filter(status="Done", finished_at__lt=timezone.now() - timedelta(days=days)).delete()[0]
+
+
+def job_stats(since):
+    """Per-task runs, failures and timing for jobs finished since ``since``."""
+    return list(
+        Job.objects.filter(finished_at__gte=since).values("task").annotate(
+            runs=Count("pk"),
+            dead=Count("pk", filter=Q(status="Dead")),
+            retrying=Count("pk", filter=Q(status="Queued")),
+            avg_ms=Avg("duration_ms"),
+            max_ms=Max("duration_ms"),
+        ).order_by("task")
+    )
+
+
+class Worker:
+    """Claims jobs and runs them on ``concurrency`` threads until ``stop`` is set."""
+
+    PURGE_EVERY = 60 * 60
+    SCHEDULE_EVERY = 60
+
+    def __init__(self, concurrency=1, queues=None, poll_interval=1.0):
+        self.id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.concurrency = concurrency
+        self.queues = queues
+        self.poll_interval = poll_interval
+        self.stop = threading.Event()
+        self.wakeup = threading.Event()
+        self.stats = {}  # task → {"runs", "failed", "total_ms", "max_ms"}
+        self._stats_lock = threading.Lock()
+
+    def _run(self, job):
+        try:
+            status = run_job(job)
+            with self._stats_lock:
+                entry = self.stats.setdefault(job.task, {"runs": 0, "failed": 0, "total_ms": 0, "max_ms": 0})
+                entry["runs"] += 1
+                entry["failed"] += status != "Done"
+                entry["total_ms"] += job.duration_ms
+                entry["max_ms"] = max(entry["max_ms"], job.duration_ms)
+        finally:
+            close_old_connections()
+
+    def run(self, burst=False):
+        """Process jobs; with ``burst`` return once nothing is due or running."""
+        running = set()
+        last_purge = last_schedule = 0
+        with ThreadPoolExecutor(self.concurrency, thread_name_prefix="job") as pool:
+            while not self.stop.is_set():
+                running = {future for future in running if not future.done()}
+                try:
+                    jobs = claim(self.id, self.concurrency - len(running), self.queues)
+                    if time.monotonic() - last_purge > self.PURGE_EVERY:
+                        purge_finished(settings.JOBS_KEEP_DONE_DAYS)
+                        last_purge = time.monotonic()
+                    if time.monotonic() - last_schedule > self.SCHEDULE_EVERY:
+                        schedule_periodic()
+                        last_schedule = time.monotonic()
+                except Exception:
+                    logger.exception("❌ Job claim failed")
+                    jobs = []
+                finally:
+                    close_old_connections()
+                running.update(pool.submit(self._run, job) for job in jobs)
+
+                if burst and not jobs and not running:
+                    break
+                if len(running) >= self.concurrency:
+                    wait(running, timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+                elif not jobs:
+                    self.wakeup.wait(self.poll_interval)
+                    self.wakeup.clear()
+        # leaving the executor waits for running jobs to finish
+
+
+# -------------------- Embedded worker --------------------
+_embedded = {"pid": None, "worker": None}
+_embedded_lock = threading.Lock()
+
+
+def wake_embedded_worker():
+    """Start this process's embedded worker if needed and have it look for jobs now."""
+    # Checked per pid: gunicorn preloads the app, and threads don't survive fork.
+    if _embedded["pid"] != os.getpid():
+        with _embedded_lock:
+            if _embedded["pid"] != os.getpid():
+                worker = Worker(settings.JOBS_IN_PROCESS_CONCURRENCY, poll_interval=settings.JOBS_POLL_INTERVAL)
+                threading.Thread(target=worker.run, name="job-worker", daemon=True).start()
+                _embedded.update(pid=os.getpid(), worker=worker)
+    _embedded["worker"].wakeup.set()
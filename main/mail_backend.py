@@ -0,0 +1,159 @@
+"""
+Pooled SMTP email backend.
+
+Gmail's STARTTLS + AUTH handshake costs several round trips, so instead of
+one session per ``send_mail`` each worker process keeps up to
+``EMAIL_POOL_SIZE`` authenticated connections open and lends them to
+backend instances:
+
+* a connection idle longer than ``EMAIL_POOL_MAX_IDLE`` seconds is checked
+  with NOOP before reuse,
+* it is retired after ``EMAIL_POOL_MAX_MESSAGES`` messages or any
+  connection-level error,
+* a caller waits up to ``EMAIL_POOL_WAIT`` seconds for a free connection.
+
+Enable with ``EMAIL_BACKEND = "main.mail_backend.PooledEmailBackend"``.
+Everything that goes through Django's mail API (send_mail, EmailMessage,
+the outbox, admin compose) then shares the pool.
+"""
+import logging
+import os
+import smtplib
+import threading
+import time
+
+from django.conf import settings
+from django.core.mail.backends.smtp import EmailBackend
+
+from main import timing
+
+logger = logging.getLogger(__name__)
+
+
+class _Slot:
+    def __init__(self, smtp):
+        self.smtp = smtp
+        self.sent = 0
+        self.last_used = time.monotonic()
+        self.broken = False
+
+
+class _Pool:
+    def __init__(self, size):
+        self.free = threading.BoundedSemaphore(size)
+        self.idle = []  # LIFO: the most recently used connection is the likeliest alive
+        self.lock = threading.Lock()
+
+    def take_idle(self):
+        """An idle, healthy connection or None; stale ones are closed on the way."""
+        while True:
+            with self.lock:
+                if not self.idle:
+                    return None
+                slot = self.idle.pop()
+            if time.monotonic() - slot.last_used < settings.EMAIL_POOL_MAX_IDLE or _alive(slot.smtp):
+                return slot
+            _quit(slot.smtp)
+
+    def give_back(self, slot):
+        retire = slot.broken or slot.smtp.sock is None or slot.sent >= settings.EMAIL_POOL_MAX_MESSAGES
+        if retire:
+            _quit(slot.smtp)
+        else:
+            slot.last_used = time.monotonic()
+            with self.lock:
+                self.idle.append(slot)
+        self.free.release()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _pool_for(backend):
+    # Keyed by pid: gunicorn preloads the app and sockets must not be shared across fork.
+    key = (os.getpid(), backend.host, backend.port, backend.username)
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = _Pool(settings.EMAIL_POOL_SIZE)
+        return _pools[key]
+
+
+def _alive(smtp):
+    try:
+        return smtp.noop()[0] == 250
+    except (smtplib.SMTPException, OSError):
+        return False
+
+
+def _quit(smtp):
+    try:
+        smtp.quit()
+    except (smtplib.SMTPException, OSError):
+        smtp.close()
+
+
+class PooledEmailBackend(EmailBackend):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._slot = None
+
+    def open(self):
+        """Borrow a pooled connection; same return contract as the SMTP backend."""
+        if self.connection:
+            return False
+
+        pool = _pool_for(self)
+        if not pool.free.acquire(timeout=settings.EMAIL_POOL_WAIT):
+            if self.fail_silently:
+                return None
+            raise TimeoutError(f"No SMTP connection free within {settings.EMAIL_POOL_WAIT}s")
+
+        try:
+            self._slot = pool.take_idle()
+            if self._slot is None:
+                if not super().open():  # new authenticated session; None = failed silently
+                    raise ConnectionError("SMTP open failed silently")
+                self._slot = _Slot(self.connection)
+                logger.info(f"📧 Opened pooled SMTP connection to {self.host}")
+        except BaseException:
+            if self.connection is not None:
+                _quit(self.connection)  # e.g. STARTTLS or AUTH failed after connecting
+            self.connection = None
+            pool.free.release()
+            if self.fail_silently:
+                return None
+            raise
+        self.connection = self._slot.smtp
+        return True
+
+    def send_messages(self, email_messages):
+        with timing.outbound("smtp"):
+            return super().send_messages(email_messages)
+
+    def close(self):
+        """Return the connection to the pool (or retire it) instead of quitting."""
+        if self._slot is None:
+            return
+        slot, self._slot, self.connection = self._slot, None, None
+        _pool_for(self).give_back(slot)
+
+    def _send(self, email_message):
+        try:
+            sent = super()._send(email_message)
+        except smtplib.SMTPRecipientsRefused:
+            raise  # the session is still fine
+        except Exception:
+            self._slot.broken = True
+            raise
+        self._slot.sent += 1
+        return sent
+
+
+def close_pooled_connections():
+    """Quit every idle pooled connection in this process (tests, shutdown)."""
+    with _pools_lock:
+        pools = [pool for (pid, *_), pool in _pools.items() if pid == os.getpid()]
+    for pool in pools:
+        while (slot := pool.take_idle()) is not None:
+            _quit(slot.smtp)
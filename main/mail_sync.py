@@ -0,0 +1,228 @@
+"""
+Incremental Gmail IMAP sync into MailboxMessage / MailboxSyncState.
+
+Views never talk to IMAP directly: `manage.py sync_mailbox` (cron or
+`--interval` loop), or the sync_mailbox job that admin pages queue when the
+cache is stale, pulls only messages with a UID above the last one seen,
+and only their headers plus the first few KB of body for the snippet.
+"""
+import email
+import imaplib
+import logging
+import re
+from datetime import timedelta, timezone as dt_timezone
+from email.header import decode_header, make_header
+from email.utils import parsedate_to_datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.html import strip_tags
+
+from main import timing
+from main.models import MailboxMessage, MailboxSyncState
+from main.tasks import sync_mailbox as sync_mailbox_task
+
+logger = logging.getLogger(__name__)
+
+IMAP_HOST = "imap.gmail.com"
+
+# Local key → IMAP folder name
+MAILBOX_FOLDERS = {
+    "inbox": "INBOX",
+    "sent": '"[Gmail]/Sent Mail"',
+}
+
+SNIPPET_BYTES = 4096      # partial body fetched per message
+SNIPPET_LENGTH = 200      # characters kept
+INITIAL_SYNC_LIMIT = 50   # newest messages imported on a folder's first sync
+STALE_AFTER = timedelta(minutes=2)  # pages queue a background sync past this age
+FETCH_BATCH = 50
+
+_FETCH_META = re.compile(rb"^\d+ \(.*?UID (\d+)")
+_FLAGS = re.compile(rb"FLAGS \(([^)]*)\)")
+
+
+def _decode(value):
+    if not value:
+        return ""
+    try:
+        return str(make_header(decode_header(value)))
+    except Exception:
+        return str(value)
+
+
+def _snippet(msg):
+    """First text/plain (or stripped text/html) part of a possibly truncated message."""
+    html = ""
+    for part in msg.walk():
+        ctype = part.get_content_type()
+        if ctype not in ("text/plain", "text/html"):
+            continue
+        if "attachment" in str(part.get("Content-Disposition")):
+            continue
+        try:
+            payload = part.get_payload(decode=True) or b""
+            text = payload.decode(part.get_content_charset() or "utf-8", errors="ignore")
+        except Exception:
+            continue
+        if ctype == "text/plain" and text.strip():
+            return " ".join(text.split())[:SNIPPET_LENGTH]
+        if not html:
+            html = text
+    return " ".join(strip_tags(html).split())[:SNIPPET_LENGTH]
+
+
+def _parse_fetch(data):
+    """
+    Group an IMAP ``UID FETCH`` response into ``{uid: {"flags", "header", "text"}}``.
+
+    Each message arrives as one tuple per requested body section, followed
+    by a closing ``b")"``; the first tuple carries the UID and FLAGS.
+    """
+    messages, current = {}, None
+    for item in data or []:
+        if not isinstance(item, tuple):
+            continue
+        meta, body = item
+        m = _FETCH_META.match(meta)
+        if m:
+            current = messages.setdefault(int(m.group(1)), {"flags": b"", "header": b"", "text": b""})
+            flags = _FLAGS.search(meta)
+            if flags:
+                current["flags"] = flags.group(1)
+        if current is None:
+            continue
+        if b"BODY[HEADER" in meta:
+            current["header"] = body
+        elif b"BODY[TEXT]" in meta:
+            current["text"] = body
+    return messages
+
+
+def _build_message(folder_key, uid, parts):
+    msg = email.message_from_bytes(parts["header"] + b"\r\n" + parts["text"])
+    date_raw = msg.get("Date") or ""
+    try:
+        date = parsedate_to_datetime(date_raw) if date_raw else None
+        if date and timezone.is_naive(date):
+            date = timezone.make_aware(date, dt_timezone.utc)
+    except Exception:
+        date = None
+    return MailboxMessage(
+        folder=folder_key,
+        uid=uid,
+        message_id=(msg.get("Message-ID") or "")[:255] or None,
+        from_addr=_decode(msg.get("From"))[:255],
+        to_addr=_decode(msg.get("To"))[:255],
+        subject=(_decode(msg.get("Subject")) or "(No Subject)")[:500],
+        date=date,
+        date_raw=date_raw[:100],
+        snippet=_snippet(msg),
+        is_seen=b"\\Seen" in parts["flags"],
+    )
+
+
+def sync_folder(conn, folder_key):
+    """Pull new messages for one folder over an already logged-in connection."""
+    state, _ = MailboxSyncState.objects.get_or_create(folder=folder_key)
+
+    status, _ = conn.select(MAILBOX_FOLDERS[folder_key], readonly=True)
+    if status != "OK":
+        raise imaplib.IMAP4.error(f"Cannot select {folder_key}")
+
+    # UIDs are only stable within one UIDVALIDITY; start over if it changed.
+    uidvalidity = None
+    _, resp = conn.response("UIDVALIDITY")
+    if resp and resp[0]:
+        uidvalidity = int(resp[0])
+    if state.uidvalidity and uidvalidity and state.uidvalidity != uidvalidity:
+        logger.warning("📧 UIDVALIDITY changed for %s, resyncing", folder_key)
+        MailboxMessage.objects.filter(folder=folder_key).delete()
+        state.last_uid = 0
+
+    # `n:*` always matches the newest message, so filter on our side too.
+    status, data = conn.uid("SEARCH", None, f"UID {state.last_uid + 1}:*")
+    uids = sorted(int(u) for u in (data[0] or b"").split()) if status == "OK" else []
+    uids = [u for u in uids if u > state.last_uid]
+    if not state.last_uid:
+        uids = uids[-INITIAL_SYNC_LIMIT:]
+
+    created = 0
+    for i in range(0, len(uids), FETCH_BATCH):
+        batch = uids[i:i + FETCH_BATCH]
+        status, data = conn.uid(
+            "FETCH",
+            ",".join(str(u) for u in batch),
+            f"(UID FLAGS BODY.PEEK[HEADER] BODY.PEEK[TEXT]<0.{SNIPPET_BYTES}>)",
+        )
+        if status != "OK":
+            break
+        rows = [_build_message(folder_key, uid, parts) for uid, parts in _parse_fetch(data).items()]
+        with transaction.atomic():
+            MailboxMessage.objects.bulk_create(rows, ignore_conflicts=True)
+            state.last_uid = max([state.last_uid, *batch])
+            state.save(update_fields=["last_uid"])
+        created += len(rows)
+
+    status, data = conn.search(None, "UNSEEN")
+    state.unread_count = len(data[0].split()) if status == "OK" and data and data[0] else 0
+    state.uidvalidity = uidvalidity or state.uidvalidity
+    state.last_synced_at = timezone.now()
+    state.last_error = ""
+    state.save()
+    return created
+
+
+def sync_mailbox(folders=None, connect=None):
+    """
+    Sync the given folder keys (default: all) over a single IMAP session.
+    Returns ``{folder_key: new_message_count}``; errors are recorded on the
+    folder's MailboxSyncState instead of being raised.
+    """
+    folders = folders or list(MAILBOX_FOLDERS)
+    results = {}
+    try:
+        with timing.outbound("imap"):
+            conn = connect() if connect else imaplib.IMAP4_SSL(IMAP_HOST, timeout=30)
+        conn = timing.Timed(conn, "imap")
+        conn.login(settings.EMAIL_HOST_USER, settings.EMAIL_HOST_PASSWORD)
+    except Exception as e:
+        logger.error(f"📧 IMAP login failed: {e}")
+        for key in folders:
+            MailboxSyncState.objects.update_or_create(folder=key, defaults={"last_error": str(e)})
+        return results
+
+    try:
+        for key in folders:
+            try:
+                results[key] = sync_folder(conn, key)
+            except Exception as e:
+                logger.error(f"📧 Mailbox sync failed for {key}: {e}")
+                MailboxSyncState.objects.update_or_create(folder=key, defaults={"last_error": str(e)})
+    finally:
+        try:
+            conn.logout()
+        except Exception:
+            pass
+    return results
+
+
+def refresh_if_stale(state):
+    """Queue a background sync when ``state`` (the inbox MailboxSyncState, or None) is old."""
+    if not state or not state.last_synced_at or state.last_synced_at < timezone.now() - STALE_AFTER:
+        sync_mailbox_task.enqueue(key="sync_mailbox")
+
+
+def cached_emails(folder_key, limit):
+    """Most recent synced messages in the dict shape the templates expect."""
+    return [
+        {
+            "from": m.from_addr,
+            "to": m.to_addr,
+            "subject": m.subject,
+            "date": m.date_raw,
+            "snippet": m.snippet or "(No content)",
+        }
+        for m in MailboxMessage.objects.filter(folder=folder_key)[:limit]
+    ]
@@ -0,0 +1,113 @@
+import multiprocessing
+import os
+import statistics
+import tempfile
+import time
+import uuid
+
+from django.core.cache.backends.db import DatabaseCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+from django.core.management.commands.createcachetable import Command as CreateCacheTable
+from django.db import connection, connections
+
+from main.cache_backend import SQLiteCache
+
+COUNTER = "bench:counter"
+
+
+def _count(backend, increments, errors):
+    """Child process: hammer one shared counter the way django_ratelimit does."""
+    connections.close_all()  # never share the parent's DB socket
+    for _ in range(increments):
+        try:
+            if not backend.add(COUNTER, 1, timeout=300):
+                backend.incr(COUNTER)
+        except Exception:
+            with errors.get_lock():
+                errors.value += 1
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = "⏱️ Benchmark the shared SQLite cache against LocMemCache and DatabaseCache."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--ops", type=int, default=5000, help="Operations per single-process measurement")
+        parser.add_argument("--processes", type=int, default=4, help="Processes sharing one rate-limit counter")
+        parser.add_argument("--increments", type=int, default=500, help="Counter increments per process")
+
+    def handle(self, *args, **options):
+        table = f"bench_cache_{uuid.uuid4().hex[:8]}"
+        creator = CreateCacheTable()
+        creator.verbosity = 0
+        creator.create_table("default", table, dry_run=False)
+        path = os.path.join(tempfile.mkdtemp(prefix="lsh-cache-bench-"), "cache.sqlite3")
+        params = {"OPTIONS": {"MAX_ENTRIES": options["ops"] * 4}}  # measure access, not culling
+        backends = {
+            "LocMemCache": LocMemCache(f"bench-{table}", params),
+            f"DatabaseCache ({connection.vendor})": DatabaseCache(table, params),
+            "SQLiteCache (shared file)": SQLiteCache(path, params),
+        }
+        try:
+            self.stdout.write(f"{'backend':<28} | {'op':<9} | {'ops/s':>9} | {'p50 µs':>8} | {'p99 µs':>8}")
+            self.stdout.write("-" * 74)
+            for name, backend in backends.items():
+                for op, row in self._single_process(backend, options["ops"]).items():
+                    self.stdout.write(f"{name:<28} | {op:<9} | {row['ops']:>9,.0f} | {row['p50']:>8.1f} | {row['p99']:>8.1f}")
+
+            self.stdout.write("")
+            self.stdout.write(f"Shared counter: {options['processes']} processes × {options['increments']} increments "
+                              f"(expected {options['processes'] * options['increments']})")
+            for name, backend in backends.items():
+                row = self._multi_process(backend, options["processes"], options["increments"])
+                if row is None:
+                    self.stdout.write(f"   {name:<28} skipped (no fork on this platform)")
+                    continue
+                self.stdout.write(f"   {name:<28} counted {row['seen']:>6} | {row['errors']} errors | {row['ops']:,.0f} incr/s")
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute(f"DROP TABLE {connection.ops.quote_name(table)}")
+
+    def _single_process(self, backend, ops):
+        backend.clear()
+        results = {}
+        plan = {
+            "set": lambda i: backend.set(f"k{i}", {"ad": i, "title": "x" * 64}, 300),
+            "get hit": lambda i: backend.get(f"k{i}"),
+            "get miss": lambda i: backend.get(f"missing{i}"),
+            "incr": lambda i: backend.incr("n"),
+        }
+        backend.set("n", 0, 300)
+        for op, call in plan.items():
+            samples = []
+            started = time.perf_counter()
+            for i in range(ops):
+                t0 = time.perf_counter()
+                call(i)
+                samples.append((time.perf_counter() - t0) * 1e6)
+            elapsed = time.perf_counter() - started
+            samples.sort()
+            results[op] = {
+                "ops": ops / elapsed,
+                "p50": statistics.median(samples),
+                "p99": samples[min(len(samples) - 1, int(len(samples) * 0.99))],
+            }
+        return results
+
+    def _multi_process(self, backend, processes, increments):
+        if "fork" not in multiprocessing.get_all_start_methods():
+            return None
+        backend.delete(COUNTER)
+        connections.close_all()
+        ctx = multiprocessing.get_context("fork")
+        errors = ctx.Value("i", 0)
+        started = time.perf_counter()
+        workers = [ctx.Process(target=_count, args=(backend, increments, errors)) for _ in range(processes)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - started
+        # What a different worker process (here: the parent) sees
+        return {"seen": backend.get(COUNTER, 0), "errors": errors.value, "ops": processes * increments / elapsed}
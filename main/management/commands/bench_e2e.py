@@ -0,0 +1,371 @@
+import hashlib
+import hmac
+import json
+import math
+import os
+import random
+import re
+import statistics
+import subprocess
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from main.models import LenderDetails, LoanRequest, OutboundEmail, Profile, User
+from main.razorpay_client import reset_client
+from main.razorpay_standin import RazorpayStandIn
+from main.smtp_standin import SMTPStandIn
+from main.synthetic import EMAIL_DOMAIN, aadhaar_number, pan_number
+
+# The journey, in order. A failed step ends its journey.
+STEPS = [
+    "register_page", "register", "verify_otp", "profile_form", "admin_review", "loan_request",
+    "lender_dashboard", "approve", "payment_initiate", "payment_callback", "invoice", "invoice_pdf",
+]
+QUERIES_HEADER = "X-Bench-Queries"
+
+
+class _StepFailed(Exception):
+    pass
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def _counting_app(app):
+    """WSGI wrapper that reports the request's query count in a response header."""
+    def wrapped(environ, start_response):
+        count = [0]
+
+        def counter(execute, sql, params, many, context):
+            count[0] += 1
+            return execute(sql, params, many, context)
+
+        def start(status, headers, exc_info=None):
+            return start_response(status, [*headers, (QUERIES_HEADER, str(count[0]))], exc_info)
+
+        with connection.execute_wrapper(counter):
+            return app(environ, start)
+
+    return wrapped
+
+
+def _percentile(samples, p):
+    """Nearest-rank percentile of an already sorted list."""
+    return samples[max(0, min(len(samples) - 1, math.ceil(p / 100 * len(samples)) - 1))]
+
+
+def _git_sha():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, timeout=5, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return "unknown"
+
+
+class Command(BaseCommand):
+    help = (
+        "⏱️ End-to-end HTTP benchmark of the critical journey (register → OTP → profile → loan → "
+        "lender dashboard → approve → payment → invoice) with stand-in SMTP and Razorpay. "
+        f"Accounts are created as bench-*@{EMAIL_DOMAIN}."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--journeys", type=int, default=20, help="Measured journeys")
+        parser.add_argument("--concurrency", type=int, default=4, help="Journeys in flight at once")
+        parser.add_argument("--warmup", type=int, default=1, help="Unmeasured journeys run first")
+        parser.add_argument("--lenders", type=int, default=5, help="Lender accounts the journeys are spread over")
+        parser.add_argument("--url", help="Benchmark an already running server (e.g. gunicorn) instead of an in-process one")
+        parser.add_argument("--razorpay-port", type=int, default=0, help="Fixed port for the Razorpay stand-in (for --url)")
+        parser.add_argument("--smtp-port", type=int, default=0, help="Fixed port for the SMTP stand-in (for --url)")
+        parser.add_argument("--razorpay-secret", help="Key secret the server signs with (default: RAZORPAY_KEY_SECRET)")
+        parser.add_argument("--output", help="JSON results file (default: bench_results/e2e-<sha>-<time>.json)")
+        parser.add_argument("--compare", help="Earlier JSON results to print deltas against")
+        parser.add_argument("--no-pdf", action="store_true", help="Skip the invoice PDF step (no wkhtmltopdf)")
+        parser.add_argument("--keep-data", action="store_true", help="Keep the accounts, loans and payments created")
+
+    def handle(self, *args, **options):
+        if options["journeys"] < 1 or options["concurrency"] < 1:
+            raise CommandError("--journeys and --concurrency must be at least 1")
+        self.token = uuid.uuid4().hex[:8]
+        self.rng = random.Random(self.token)
+        self.rng_lock = threading.Lock()
+        self.secret = options["razorpay_secret"] or settings.RAZORPAY_KEY_SECRET or "bench-secret"
+        self.steps = [step for step in STEPS if not (options["no_pdf"] and step == "invoice_pdf")]
+        if connection.vendor == "sqlite" and options["concurrency"] > 1:
+            self.stdout.write(self.style.WARNING("⚠️ SQLite allows one writer at a time: expect 'database is locked' errors"))
+
+        with ExitStack() as stack:
+            self.gateway = stack.enter_context(RazorpayStandIn(port=options["razorpay_port"]))
+            self.smtp = stack.enter_context(SMTPStandIn(port=options["smtp_port"]))
+            if options["url"]:
+                self.url = options["url"].rstrip("/")
+                self.stdout.write(
+                    f"🎯 Target {self.url}; start it with RAZORPAY_BASE_URL={self.gateway.url} "
+                    f"RAZORPAY_KEY_SECRET=<same secret> and SMTP at 127.0.0.1:{self.smtp.port} (no TLS/auth)"
+                )
+            else:
+                self.url = stack.enter_context(self._server())
+            try:
+                self._actors(options["lenders"])
+                for n in range(options["warmup"]):
+                    self._journey(f"w{n}", n)
+                started = time.perf_counter()
+                with ThreadPoolExecutor(options["concurrency"]) as pool:
+                    journeys = list(pool.map(self._journey, range(options["journeys"]), range(options["journeys"])))
+                elapsed = time.perf_counter() - started
+            finally:
+                if not options["keep_data"]:
+                    User.objects.filter(email__startswith=f"bench-{self.token}-").delete()
+
+        results = self._results(journeys, elapsed, options)
+        self._report(results)
+        path = options["output"] or os.path.join(
+            "bench_results", f"e2e-{results['meta']['git']}-{timezone.now():%Y%m%d-%H%M%S}.json"
+        )
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(results, f, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"✅ Results written to {path}"))
+        if options["compare"]:
+            with open(options["compare"]) as f:
+                self._compare(json.load(f), results)
+
+    # -------------------- Setup --------------------
+    @contextmanager
+    def _server(self):
+        """This project on a threaded WSGI server, wired to the stand-ins."""
+        server = ThreadedWSGIServer(("127.0.0.1", 0), _QuietHandler, allow_reuse_address=False)
+        server.set_app(_counting_app(WSGIHandler()))
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        # Keep a configured SMTP backend (e.g. the pooled one); locmem/console would skip SMTP entirely
+        smtp_backends = ("django.core.mail.backends.smtp.EmailBackend", "main.mail_backend.PooledEmailBackend")
+        mail = {
+            "EMAIL_BACKEND": settings.EMAIL_BACKEND if settings.EMAIL_BACKEND in smtp_backends else smtp_backends[0],
+            "EMAIL_HOST": "127.0.0.1", "EMAIL_PORT": self.smtp.port, "EMAIL_USE_TLS": False, "EMAIL_USE_SSL": False,
+            "EMAIL_HOST_USER": "", "EMAIL_HOST_PASSWORD": "",
+        }
+        with override_settings(RAZORPAY_BASE_URL=self.gateway.url, RAZORPAY_KEY_SECRET=self.secret, **mail):
+            reset_client()
+            thread.start()
+            try:
+                yield f"http://127.0.0.1:{server.server_address[1]}"
+            finally:
+                server.shutdown()
+                server.server_close()
+                reset_client()
+
+    def _cookies(self, user):
+        client = Client()
+        client.force_login(user)
+        return {settings.SESSION_COOKIE_NAME: client.cookies[settings.SESSION_COOKIE_NAME].value}
+
+    def _actors(self, lenders):
+        """Reviewed lenders and an admin for this run, logged in once (login_view is rate-limited)."""
+        self.lender_cookies = []
+        for n in range(lenders):
+            lender = User.objects.create_user(email=f"bench-{self.token}-lender{n}@{EMAIL_DOMAIN}", role="lender")
+            Profile.objects.create(
+                user=lender, full_name=f"Bench Lender {n}", mobile=f"9{self.rng.randint(0, 10**9 - 1):09d}",
+                pancard_number=pan_number(self.rng, "Bench"), aadhaar_number=aadhaar_number(self.rng),
+                status="Active", is_reviewed=True,
+            )
+            LenderDetails.objects.create(user=lender, lender_type="Bank", bank_firm_name="Bench Bank")
+            self.lender_cookies.append(self._cookies(lender))
+        admin = User.objects.create_superuser(email=f"bench-{self.token}-admin@{EMAIL_DOMAIN}")
+        self.admin_cookies = self._cookies(admin)
+
+    def _session(self, cookies=None):
+        session = requests.Session()
+        if cookies:
+            # Staff and lender sessions never load a form, so they bring their own CSRF cookie
+            host = urlsplit(self.url).hostname
+            for name, value in {**cookies, settings.CSRF_COOKIE_NAME: uuid.uuid4().hex}.items():
+                session.cookies.set(name, value, domain=host)
+        return session
+
+    # -------------------- Journey --------------------
+    def _step(self, samples, name, session, method, path, expect, json_ok=False, location=None, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = session.request(method, self.url + path, allow_redirects=False, timeout=60, **kwargs)
+        except requests.RequestException as e:
+            samples.append((name, (time.perf_counter() - started) * 1000, None, str(e)))
+            raise _StepFailed from e
+        ms = (time.perf_counter() - started) * 1000
+        queries = response.headers.get(QUERIES_HEADER)
+        error = None
+        if response.status_code != expect:
+            error = f"HTTP {response.status_code}"
+        elif json_ok and not response.json().get("ok"):
+            error = response.json().get("msg") or response.json().get("error") or "ok=false"
+        elif location and location not in response.headers.get("Location", ""):
+            error = f"redirected to {response.headers.get('Location')}"
+        samples.append((name, ms, int(queries) if queries else None, error))
+        if error:
+            raise _StepFailed(error)
+        return response
+
+    def _journey(self, name, n):
+        samples = []
+        email = f"bench-{self.token}-{name}@{EMAIL_DOMAIN}"
+        applicant = self._session()
+        lender = self._session(self.lender_cookies[n % len(self.lender_cookies)])
+        admin = self._session(self.admin_cookies)
+        csrf = lambda session: {"X-CSRFToken": session.cookies[settings.CSRF_COOKIE_NAME]}  # noqa: E731
+        xhr = {"X-Requested-With": "XMLHttpRequest"}
+        with self.rng_lock:
+            pan, aadhaar = pan_number(self.rng, "Bench"), aadhaar_number(self.rng)
+            mobile = f"9{self.rng.randint(0, 10**9 - 1):09d}"
+        try:
+            self._step(samples, "register_page", applicant, "GET", "/register/?role=applicant", 200)
+            self._step(samples, "register", applicant, "POST", "/register/", 200, json_ok=True, headers=csrf(applicant), data={
+                "email": email, "password": "Bench@12345", "confirm_password": "Bench@12345", "role": "applicant",
+            })
+            body = (OutboundEmail.objects.filter(kind="otp", to=[email]).order_by("-id")
+                    .values_list("body", flat=True).first() or "")
+            otp = re.search(r"\b(\d{6})\b", body)
+            response = self._step(samples, "verify_otp", applicant, "GET", f"/verify-email-otp/?otp={otp and otp.group(1)}",
+                                  200, json_ok=True)
+            profile_url = response.json()["redirect_url"]
+            user_id = profile_url.rstrip("/").rsplit("/", 1)[-1]
+
+            self._step(samples, "profile_form", applicant, "POST", profile_url, 200, json_ok=True,
+                       headers={**csrf(applicant), **xhr}, data={
+                           "full_name": f"Bench Applicant {name}", "mobile": mobile, "pancard_number": pan,
+                           "aadhaar_number": aadhaar, "dob": "1990-01-15", "gender": "Female", "marital_status": "Single",
+                           "address": "12, MG Road", "pincode": "411001", "city": "Pune", "state": "Maharashtra",
+                           "employment_type": "Salaried", "company_name": "Bench Pvt Ltd", "current_salary": "85000",
+                           "cibil_score": "760",
+                       })
+            self._step(samples, "admin_review", admin, "POST", f"/admin/user_action/{user_id}/", 200, json_ok=True,
+                       headers={**csrf(admin), **xhr}, data={"action": "accept"})
+            self._step(samples, "loan_request", applicant, "POST", "/loan/request/", 302, location=reverse("dashboard_router"),
+                       headers=csrf(applicant), data={
+                           "loan_type": "Personal", "amount_requested": "250000", "duration_months": "24",
+                           "interest_rate": "12.5", "reason_for_loan": "Home renovation",
+                       })
+            loan = LoanRequest.objects.filter(applicant_id=user_id).values_list("id", flat=True).first()
+            if not loan:
+                raise _StepFailed("loan not saved")
+
+            self._step(samples, "lender_dashboard", lender, "GET", "/dashboard/lender/", 200)
+            self._step(samples, "approve", lender, "POST", f"/dashboard/lender/approve/{loan}/", 302,
+                       location=reverse("dashboard_lender"), headers=csrf(lender))
+            order_id = self._step(samples, "payment_initiate", lender, "POST", "/payment/initiate/", 200,
+                                  json_ok=True, data={"loan_id": str(loan)}).json()["order_id"]
+            payment = self.gateway.pay(order_id)
+            signature = hmac.new(self.secret.encode(), f"{order_id}|{payment['id']}".encode(), hashlib.sha256).hexdigest()
+            self._step(samples, "payment_callback", lender, "POST", "/payment/callback/", 302,
+                       location=reverse("payment_success"), data={
+                           "razorpay_order_id": order_id, "razorpay_payment_id": payment["id"],
+                           "razorpay_signature": signature, "loan_id": str(loan),  # as the dashboard's button sends it
+                       })
+            self._step(samples, "invoice", lender, "GET", f"/payment/invoice/?txn_id={order_id}", 200)
+            if "invoice_pdf" in self.steps:
+                self._step(samples, "invoice_pdf", lender, "GET", f"/payment/invoice/?txn_id={order_id}&download=1", 200)
+        except _StepFailed:
+            pass
+        finally:
+            for session in (applicant, lender, admin):
+                session.close()
+        return samples
+
+    # -------------------- Results --------------------
+    def _results(self, journeys, elapsed, options):
+        by_step = defaultdict(list)
+        for samples in journeys:
+            for name, ms, queries, error in samples:
+                by_step[name].append((ms, queries, error))
+        steps, requests_made = {}, 0
+        for name in self.steps:
+            rows = by_step.get(name, [])
+            requests_made += len(rows)
+            times = sorted(ms for ms, _, error in rows if not error)
+            queries = [q for _, q, error in rows if not error and q is not None]
+            errors = [error for _, _, error in rows if error]
+            steps[name] = {
+                "count": len(rows),
+                "errors": len(errors),
+                "first_error": errors[0] if errors else None,
+                "p50_ms": round(_percentile(times, 50), 2) if times else None,
+                "p95_ms": round(_percentile(times, 95), 2) if times else None,
+                "p99_ms": round(_percentile(times, 99), 2) if times else None,
+                "mean_ms": round(statistics.fmean(times), 2) if times else None,
+                "max_ms": round(times[-1], 2) if times else None,
+                "rps": round(len(times) / elapsed, 2),
+                "queries": round(statistics.fmean(queries), 1) if queries else None,
+                "queries_max": max(queries) if queries else None,
+            }
+        completed = sum(1 for samples in journeys if len(samples) == len(self.steps) and not samples[-1][3])
+        return {
+            "meta": {
+                "git": _git_sha(),
+                "timestamp": timezone.now().isoformat(),
+                "target": options["url"] or "in-process",
+                "database": connection.vendor,
+                "journeys": options["journeys"],
+                "concurrency": options["concurrency"],
+                "lenders": options["lenders"],
+                "mails_delivered": len(self.smtp.messages),
+            },
+            "summary": {
+                "elapsed_s": round(elapsed, 3),
+                "journeys_completed": completed,
+                "journeys_per_s": round(completed / elapsed, 2),
+                "requests": requests_made,
+                "requests_per_s": round(requests_made / elapsed, 2),
+            },
+            "steps": steps,
+        }
+
+    def _report(self, results):
+        fmt = lambda value, spec: "-" if value is None else format(value, spec)  # noqa: E731
+        self.stdout.write(f"{'step':<17} | {'n':>4} | {'err':>3} | {'p50 ms':>8} | {'p95 ms':>8} | {'p99 ms':>8} | "
+                          f"{'req/s':>7} | {'queries':>7}")
+        self.stdout.write("-" * 88)
+        for name, row in results["steps"].items():
+            self.stdout.write(
+                f"{name:<17} | {row['count']:>4} | {row['errors']:>3} | {fmt(row['p50_ms'], '>8.1f')} | "
+                f"{fmt(row['p95_ms'], '>8.1f')} | {fmt(row['p99_ms'], '>8.1f')} | {row['rps']:>7.1f} | "
+                f"{fmt(row['queries'], '>7.1f')}"
+            )
+            if row["first_error"]:
+                self.stdout.write(self.style.WARNING(f"   ⚠️ {row['first_error']}"))
+        summary = results["summary"]
+        self.stdout.write(
+            f"\n{summary['journeys_completed']}/{results['meta']['journeys']} journeys in {summary['elapsed_s']}s "
+            f"at concurrency {results['meta']['concurrency']}: {summary['journeys_per_s']} journeys/s, "
+            f"{summary['requests_per_s']} req/s"
+        )
+
+    def _compare(self, old, new):
+        self.stdout.write(f"\nΔ against {old['meta']['git']} ({old['meta']['timestamp']}):")
+        for name, row in new["steps"].items():
+            before = old["steps"].get(name)
+            if not before or before["p50_ms"] is None or row["p50_ms"] is None:
+                continue
+            deltas = [f"{key[:3]} {row[key] - before[key]:+8.1f} ms ({(row[key] / before[key] - 1) * 100:+5.0f}%)"
+                      for key in ("p50_ms", "p95_ms") if before[key]]
+            if row["queries"] is not None and before["queries"] is not None:
+                deltas.append(f"queries {row['queries'] - before['queries']:+.1f}")
+            self.stdout.write(f"   {name:<17} " + " | ".join(deltas))
@@ -0,0 +1,90 @@
+import statistics
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from main.models import User, Profile, ApplicantDetails, LoanRequest, LoanLenderStatus
+from main.views import fan_out_to_lenders
+
+
+class Command(BaseCommand):
+    help = "⏱️ Benchmark loan submission latency at different lender counts (all data rolled back)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lenders", type=int, nargs="+", default=[10, 100, 1000])
+        parser.add_argument("--repeat", type=int, default=5, help="Submissions per lender count")
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{'lenders':>8} | {'legacy fan-out':>15} | {'bulk fan-out':>13} | "
+            f"{'submit p50':>11} | {'submit max':>11} | {'queries':>7}"
+        )
+        self.stdout.write("-" * 80)
+        for n in options["lenders"]:
+            row = self._run(n, options["repeat"])
+            self.stdout.write(
+                f"{n:>8} | {row['legacy']:>12.1f} ms | {row['bulk']:>10.1f} ms | "
+                f"{row['p50']:>8.1f} ms | {row['max']:>8.1f} ms | {row['queries']:>7}"
+            )
+
+    def _run(self, n, repeat):
+        with transaction.atomic():
+            tag = uuid.uuid4().hex[:8]
+            User.objects.bulk_create([
+                User(email=f"bench-{tag}-{i}@bench.local", role="lender") for i in range(n)
+            ])
+            applicant = User.objects.create_user(email=f"bench-{tag}@bench.local", role="applicant")
+            Profile.objects.create(
+                user=applicant, full_name="Bench Applicant", mobile="9999999999",
+                pancard_number=f"BENCH{uuid.uuid4().int % 10000:04d}B",
+                aadhaar_number=f"{uuid.uuid4().int % 10**12:012d}",
+                status="Active", is_reviewed=True,
+            )
+            ApplicantDetails.objects.create(user=applicant, employment_type="Salaried")
+
+            # Old behaviour: one INSERT per lender
+            loan = self._loan(applicant, f"BL{tag}")
+            started = time.perf_counter()
+            for lender in User.objects.filter(role="lender"):
+                LoanLenderStatus.objects.create(loan=loan, lender=lender, status="Pending", remarks="Lender Reviewing")
+            legacy_ms = (time.perf_counter() - started) * 1000
+
+            loan = self._loan(applicant, f"BB{tag}")
+            started = time.perf_counter()
+            fan_out_to_lenders(loan)
+            bulk_ms = (time.perf_counter() - started) * 1000
+
+            # Full HTTP submission through the view
+            client = Client(HTTP_HOST="localhost")
+            client.force_login(applicant)
+            timings, queries = [], 0
+            for _ in range(repeat):
+                with CaptureQueriesContext(connection) as ctx:
+                    started = time.perf_counter()
+                    client.post("/loan/request/", {
+                        "loan_type": "Personal", "amount_requested": "100000",
+                        "duration_months": "12", "interest_rate": "11.5",
+                    }, secure=True)
+                    timings.append((time.perf_counter() - started) * 1000)
+                queries = len(ctx.captured_queries)
+
+            transaction.set_rollback(True)
+
+        return {
+            "legacy": legacy_ms,
+            "bulk": bulk_ms,
+            "p50": statistics.median(timings),
+            "max": max(timings),
+            "queries": queries,
+        }
+
+    @staticmethod
+    def _loan(applicant, loan_id):
+        return LoanRequest.objects.create(
+            loan_id=loan_id, applicant=applicant, loan_type="Personal",
+            amount_requested=100000, duration_months=12, interest_rate=11.5,
+        )
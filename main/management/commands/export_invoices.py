@@ -0,0 +1,111 @@
+import csv
+import io
+import zipfile
+from concurrent.futures import as_completed
+from datetime import datetime
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.text import get_valid_filename
+
+from main.invoices import invoice_context, invoice_html, invoice_pdf_name, store_invoice_pdf, submit_pdf
+from main.models import PaymentTransaction
+
+GST_COLUMNS = [
+    "Invoice Number", "Transaction ID", "Date", "Customer", "Email",
+    "Payment Method", "Taxable Value", "GST @18%", "Total",
+]
+
+
+class Command(BaseCommand):
+    help = "🧾 Export every Completed payment's invoice for a month as a ZIP with a GST summary CSV."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--month", required=True, help="Billing month as YYYY-MM")
+        parser.add_argument("--output", help="ZIP path (default: invoices-YYYY-MM.zip)")
+
+    def handle(self, *args, **options):
+        try:
+            start = timezone.make_aware(datetime.strptime(options["month"], "%Y-%m"))
+        except ValueError:
+            raise CommandError("--month must look like YYYY-MM")
+        end = start.replace(year=start.year + (start.month == 12), month=start.month % 12 + 1)
+        output = options["output"] or f"invoices-{options['month']}.zip"
+
+        payments = list(
+            PaymentTransaction.objects.filter(status="Completed", created_at__gte=start, created_at__lt=end)
+            .select_related("user", "user__profile")
+            .order_by("created_at")
+        )
+        contexts = {p.pk: invoice_context(p) for p in payments}
+
+        rendered = failed = 0
+        # Renders in flight at once: enough to keep the pool busy without
+        # holding every invoice's HTML and PDF in memory for a large month.
+        window = settings.PDF_RENDER_WORKERS * 4
+        with zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as archive:
+            # ✅ PDFs already on disk go straight in; the rest render in parallel
+            #    on the bounded pool and are stored for later downloads too.
+            pending = {}
+            for payment in payments:
+                name = invoice_pdf_name(payment)
+                if default_storage.exists(name):
+                    with default_storage.open(name, "rb") as pdf:
+                        self._write(archive, payment, pdf.read())
+                    continue
+                pending[submit_pdf(invoice_html(payment))] = payment
+                if len(pending) >= window:
+                    ok, bad = self._collect(archive, pending)
+                    rendered, failed = rendered + ok, failed + bad
+            ok, bad = self._collect(archive, pending)
+            rendered, failed = rendered + ok, failed + bad
+
+            archive.writestr(f"gst-summary-{options['month']}.csv", self._gst_summary(payments, contexts))
+
+        summary = f"{len(payments) - failed} invoice(s) ({rendered} newly rendered) → {output}"
+        if failed:
+            self.stdout.write(self.style.WARNING(f"⚠️ {summary}; {failed} failed to render and were skipped"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"✅ {summary}"))
+
+    def _collect(self, archive, pending):
+        """Wait for the renders in ``pending``, storing and archiving each; returns (rendered, failed)."""
+        rendered = failed = 0
+        for future in as_completed(pending):
+            payment = pending[future]
+            try:
+                pdf = future.result()
+            except Exception as e:
+                self.stderr.write(f"❌ Invoice render failed | TxnID={payment.txn_id} | {e}")
+                failed += 1
+                continue
+            store_invoice_pdf(payment, pdf)
+            self._write(archive, payment, pdf)
+            rendered += 1
+        pending.clear()
+        return rendered, failed
+
+    @staticmethod
+    def _write(archive, payment, pdf):
+        # Named by the full txn_id: invoice numbers only keep its last 8 characters
+        archive.writestr(f"{get_valid_filename(payment.txn_id)}.pdf", pdf, compress_type=zipfile.ZIP_STORED)
+
+    @staticmethod
+    def _gst_summary(payments, contexts):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(GST_COLUMNS)
+        totals = [Decimal("0.00")] * 3
+        for payment in payments:
+            ctx = contexts[payment.pk]
+            amounts = [ctx["base_amount"], ctx["gst_amount"], ctx["amount"]]
+            totals = [t + a for t, a in zip(totals, amounts)]
+            writer.writerow([
+                ctx["invoice_number"], ctx["txn_id"], timezone.localtime(payment.created_at).date().isoformat(),
+                ctx["user_name"], ctx["user_email"], ctx["payment_method"], *amounts,
+            ])
+        writer.writerow(["TOTAL", "", "", "", "", "", *totals])
+        return buffer.getvalue()
@@ -0,0 +1,31 @@
+import time
+from django.core.management.base import BaseCommand
+
+from main.webhooks import process_pending
+
+
+class Command(BaseCommand):
+    help = "💳 Apply stored Razorpay webhook events to payments and loans, oldest first."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=0,
+            help="Keep running and poll every N seconds (0 = drain once).",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            blocked = set()  # failed events wait for the next poll
+            while True:
+                applied, failed = process_pending(options["batch_size"], blocked)
+                if applied or failed:
+                    self.stdout.write(self.style.SUCCESS(f"✅ {applied} applied, {failed} failed"))
+                if applied < options["batch_size"]:
+                    break
+
+            if not options["interval"]:
+                break
+            time.sleep(options["interval"])
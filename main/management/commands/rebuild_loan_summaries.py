@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from main.models import LoanRequest
+
+
+class Command(BaseCommand):
+    help = "🔁 Recompute the per-loan status summary (approved/rejected/pending counts, last activity)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loan", action="append", help="loan_id to rebuild (repeatable). Defaults to all loans.")
+        parser.add_argument("--batch-size", type=int, default=1000, help="Loans updated per transaction")
+
+    def handle(self, *args, **options):
+        loans = LoanRequest.objects.order_by("pk")
+        if options["loan"]:
+            loans = loans.filter(loan_id__in=options["loan"])
+
+        pks = list(loans.values_list("pk", flat=True))
+        size = options["batch_size"]
+        updated = 0
+        for start in range(0, len(pks), size):
+            with transaction.atomic():
+                updated += LoanRequest.objects.filter(pk__in=pks[start:start + size]).rebuild_status_summary()
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Rebuilt status summary for {updated} loan(s)"))
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from main.razorpay_client import latency_stats
+from main.reconcile import reconcile_pending
+
+
+class Command(BaseCommand):
+    help = "💳 Settle Pending payments whose browser never reached the callback by asking Razorpay."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--older-than", type=int, default=15, help="Only Pending payments older than N minutes")
+        parser.add_argument("--expire-after", type=int, default=24, help="Mark uncaptured orders Failed after N hours")
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument("--concurrency", type=int, default=4, help="Parallel Razorpay requests")
+        parser.add_argument("--dry-run", action="store_true", help="Report only; don't write anything")
+
+    def handle(self, *args, **options):
+        report = reconcile_pending(
+            older_than_minutes=options["older_than"],
+            expire_after_hours=options["expire_after"],
+            batch_size=options["batch_size"],
+            concurrency=options["concurrency"],
+            dry_run=options["dry_run"],
+        )
+
+        prefix = "🧪 DRY RUN — " if options["dry_run"] else ""
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}✅ Scanned {report['scanned']} in {report['batches']} batch(es), {report['elapsed_s']}s: "
+            f"{report['completed']} completed, {report['failed']} failed, "
+            f"{report['unchanged']} still pending, {report['errors']} error(s)"
+        ))
+        for endpoint, stats in latency_stats().items():
+            self.stdout.write(
+                f"   {endpoint}: {stats['calls']} calls, p50 {stats['p50_ms']} ms, "
+                f"p95 {stats['p95_ms']} ms, {stats['retries']} retries, {stats['errors']} errors"
+            )
+        if report["errors"]:
+            self.stdout.write(self.style.WARNING("⚠️ Some orders could not be checked; they stay Pending."))
@@ -0,0 +1,41 @@
+import signal
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from main.jobs import Worker, job_stats
+
+
+class Command(BaseCommand):
+    help = "⚙️ Run background jobs from the DB-backed queue (main/jobs.py)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=2, help="Jobs run in parallel (threads)")
+        parser.add_argument("--queue", action="append", help="Only take jobs from this queue (repeatable)")
+        parser.add_argument("--poll-interval", type=float, default=1.0, help="Seconds between polls when idle")
+        parser.add_argument("--burst", action="store_true", help="Exit once no job is due")
+        parser.add_argument("--stats", type=int, metavar="HOURS", help="Print per-task timing for the last N hours and exit")
+
+    def handle(self, *args, **options):
+        if options["stats"]:
+            for row in job_stats(timezone.now() - timedelta(hours=options["stats"])):
+                self.stdout.write(
+                    f"{row['task']}: {row['runs']} runs, {row['dead']} dead, {row['retrying']} retrying, "
+                    f"avg {row['avg_ms'] or 0:.0f} ms, max {row['max_ms'] or 0} ms"
+                )
+            return
+
+        worker = Worker(options["concurrency"], options["queue"], options["poll_interval"])
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: worker.stop.set())
+
+        self.stdout.write(self.style.SUCCESS(f"⚙️ Worker {worker.id} started (concurrency {options['concurrency']})"))
+        worker.run(burst=options["burst"])
+
+        for name, entry in sorted(worker.stats.items()):
+            self.stdout.write(
+                f"   {name}: {entry['runs']} runs, {entry['failed']} failed, "
+                f"avg {entry['total_ms'] / entry['runs']:.0f} ms, max {entry['max_ms']} ms"
+            )
+        self.stdout.write(self.style.SUCCESS("✅ Worker stopped"))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from main.bulk_mail import SEGMENTS, segment_recipients, send_to_segment
+
+
+class Command(BaseCommand):
+    help = "📣 Email every member of a segment (e.g. all active lenders) over the pooled SMTP backend."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--segment", required=True, choices=sorted(SEGMENTS))
+        parser.add_argument("--subject", required=True)
+        parser.add_argument("--body-file", required=True, help="Plain-text file with the message body")
+        parser.add_argument("--batch-size", type=int, default=100, help="Recipients per SMTP connection checkout")
+        parser.add_argument("--dry-run", action="store_true", help="Only count recipients")
+
+    def handle(self, *args, **options):
+        try:
+            with open(options["body_file"], encoding="utf-8") as fh:
+                body = fh.read()
+        except OSError as e:
+            raise CommandError(f"❌ Cannot read body file: {e}")
+
+        if options["dry_run"]:
+            count = segment_recipients(options["segment"]).count()
+            self.stdout.write(f"🧪 {count} recipient(s) in {options['segment']}")
+            return
+
+        sent, failed = send_to_segment(options["segment"], options["subject"], body, options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"✅ {sent} sent, {failed} failed"))
@@ -0,0 +1,36 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from main.outbox import drain, summarize
+
+
+class Command(BaseCommand):
+    help = "📧 Send queued OutboundEmail rows over a reused SMTP connection, OTPs first."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=50, help="Emails sent per SMTP connection")
+        parser.add_argument(
+            "--lane",
+            choices=["all", "otp"],
+            default="all",
+            help="'otp' only sends OTP mails, for a dedicated low-latency worker.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=0,
+            help="Keep running and poll every N seconds (0 = drain once).",
+        )
+
+    def handle(self, *args, **options):
+        lane = None if options["lane"] == "all" else options["lane"]
+        while True:
+            report = drain(options["batch_size"], lane)
+            if report["sent"] or report["retrying"] or report["failed"]:
+                self.stdout.write(self.style.SUCCESS(f"✅ {summarize(report)}"))
+
+            if not options["interval"]:
+                break
+            close_old_connections()
+            time.sleep(options["interval"])
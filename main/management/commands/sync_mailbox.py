@@ -0,0 +1,34 @@
+import time
+from django.core.management.base import BaseCommand
+
+from main.mail_sync import MAILBOX_FOLDERS, sync_mailbox
+
+
+class Command(BaseCommand):
+    help = "📧 Incrementally sync Gmail IMAP headers/snippets into the local mailbox cache."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--folder",
+            action="append",
+            choices=list(MAILBOX_FOLDERS),
+            help="Folder to sync (repeatable). Defaults to all folders.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=0,
+            help="Keep running and re-sync every N seconds (0 = run once).",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            results = sync_mailbox(options["folder"])
+            for folder, created in results.items():
+                self.stdout.write(self.style.SUCCESS(f"✅ {folder}: {created} new message(s)"))
+            if not results:
+                self.stdout.write(self.style.ERROR("❌ Mailbox sync failed (see MailboxSyncState.last_error)"))
+
+            if not options["interval"]:
+                break
+            time.sleep(options["interval"])
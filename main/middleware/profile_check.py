@@ -1,20 +1,51 @@
 from django.shortcuts import redirect
 from django.contrib import messages
 from django.urls import reverse
-from main.models import Profile
 from main.views import is_profile_complete  # ✅ Use your improved version
 
 EXEMPT_PATHS = [
     "/login/",
     "/register/",
-    "/verify-otp/",
+    "/verify-email-otp/",
+    "/resend-email-otp/",
+    "/forgot_password/",
+    "/reset_password/",
     "/logout/",
     "/admin/",
-    "/profile-form/",
+    "/admin_login/",
+    "/admin_logout/",
+    "/profile/",
+    "/review_profile/",
+    "/status/",
     "/static/",
     "/media/",
 ]
 
+# Session slot for the cached gate: [user pk, profile_version, complete, awaiting_review]
+SESSION_KEY = "_profile_gate"
+
+
+def profile_gate(request):
+    """
+    Return ``(complete, awaiting_review)`` for ``request.user``.
+
+    The result is cached in the session against the user's ``profile_version``
+    (bumped whenever their Profile / ApplicantDetails / LenderDetails is saved),
+    so the steady-state request path runs no extra queries.
+    """
+    user = request.user
+    key = [str(user.pk), user.profile_version]
+    cached = request.session.get(SESSION_KEY)
+    if cached and cached[:2] == key:
+        return cached[2], cached[3]
+
+    profile = getattr(user, "profile", None)
+    complete = is_profile_complete(user)
+    awaiting_review = bool(profile and not profile.is_reviewed)
+    request.session[SESSION_KEY] = key + [complete, awaiting_review]
+    return complete, awaiting_review
+
+
 class ProfileCompletionMiddleware:
     """
     Blocks logged-in users from accessing any page
@@ -34,16 +65,15 @@ class ProfileCompletionMiddleware:
 
         # ✅ Only for logged-in users (not superuser)
         if user.is_authenticated and not user.is_superuser:
-            profile = getattr(user, "profile", None)
+            complete, awaiting_review = profile_gate(request)
 
             # 🔒 Profile completion check
-            if not is_profile_complete(user):
-                if "profile-form" not in path:
-                    messages.warning(request, "Please complete your profile to continue.")
-                    return redirect(reverse("profile_form", args=[user.id]))
+            if not complete:
+                messages.warning(request, "Please complete your profile to continue.")
+                return redirect(reverse("profile_form", args=[user.id]))
 
             # 🔒 Admin review check
-            if profile and not profile.is_reviewed and "review-profile" not in path:
+            if awaiting_review:
                 messages.info(request, "Your profile is under admin review.")
                 return redirect("review_profile")
 
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0003_remove_loanrequest_previous_status'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='deleteduserlog',
+            index=models.Index(fields=['mobile', '-deleted_at'], name='deleteduserlog_mobile_idx'),
+        ),
+    ]
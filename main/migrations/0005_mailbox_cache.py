@@ -0,0 +1,47 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0004_deleteduserlog_mobile_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MailboxSyncState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('folder', models.CharField(max_length=20, unique=True)),
+                ('uidvalidity', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('last_uid', models.PositiveBigIntegerField(default=0)),
+                ('unread_count', models.PositiveIntegerField(default=0)),
+                ('last_synced_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='MailboxMessage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('folder', models.CharField(max_length=20)),
+                ('uid', models.PositiveBigIntegerField()),
+                ('message_id', models.CharField(blank=True, max_length=255, null=True)),
+                ('from_addr', models.CharField(blank=True, max_length=255)),
+                ('to_addr', models.CharField(blank=True, max_length=255)),
+                ('subject', models.CharField(blank=True, max_length=500)),
+                ('date', models.DateTimeField(blank=True, null=True)),
+                ('date_raw', models.CharField(blank=True, max_length=100)),
+                ('snippet', models.TextField(blank=True)),
+                ('is_seen', models.BooleanField(default=False)),
+                ('synced_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-uid'],
+                'indexes': [models.Index(fields=['folder', '-uid'], name='mailbox_folder_uid_idx')],
+                'unique_together': {('folder', 'uid')},
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+from django.db import migrations
+from django.db.models import Q
+
+
+def prune_untouched_pending(apps, schema_editor):
+    """
+    With LAZY_LENDER_STATUSES a missing row already means "Pending", so the
+    rows the old fan-out created and no lender ever touched are redundant.
+    """
+    LoanLenderStatus = apps.get_model("main", "LoanLenderStatus")
+    LoanLenderStatus.objects.filter(status="Pending").filter(
+        Q(remarks__isnull=True) | Q(remarks__in=["", "Lender Reviewing"])
+    ).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0005_mailbox_cache'),
+    ]
+
+    operations = [
+        # Not reversible in a meaningful way: implicit Pending is equivalent.
+        migrations.RunPython(prune_untouched_pending, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:16
+
+from django.db import migrations, models
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_status_summary(apps, schema_editor):
+    """Same computation as LoanRequestQuerySet.rebuild_status_summary()."""
+    LoanRequest = apps.get_model("main", "LoanRequest")
+    LoanLenderStatus = apps.get_model("main", "LoanLenderStatus")
+    rows = LoanLenderStatus.objects.filter(loan=OuterRef("pk")).order_by().values("loan")
+
+    def count(status):
+        return Coalesce(Subquery(rows.filter(status=status).annotate(n=Count("pk")).values("n")), 0)
+
+    LoanRequest.objects.update(
+        approved_count=count("Approved"),
+        rejected_count=count("Rejected"),
+        pending_count=count("Pending"),
+        last_activity=Subquery(rows.annotate(at=Max("updated_at")).values("at")),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0006_prune_untouched_lender_statuses'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='loanrequest',
+            name='approved_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='loanrequest',
+            name='last_activity',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='loanrequest',
+            name='pending_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='loanrequest',
+            name='rejected_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_status_summary, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:40
+
+import re
+
+from django.db import migrations, models
+
+USER_PREFIXES = {"applicant": "LSHA", "lender": "LSHL", "admin": "LSHAD"}
+LOAN_START = 1_000_000
+
+
+def seed_counters(apps, schema_editor):
+    """Start each counter after the highest ID already issued."""
+    User = apps.get_model("main", "User")
+    LoanRequest = apps.get_model("main", "LoanRequest")
+    IdCounter = apps.get_model("main", "IdCounter")
+
+    def highest(values, pattern):
+        numbers = [int(m.group(1)) for value in values if value and (m := re.fullmatch(pattern, value))]
+        return max(numbers, default=0)
+
+    for role, prefix in USER_PREFIXES.items():
+        ids = User.objects.filter(user_id__startswith=prefix).values_list("user_id", flat=True).iterator()
+        IdCounter.objects.create(name=f"user:{role}", next_value=highest(ids, rf"{prefix}(\d+)") + 1)
+    # Old random loan IDs have 6 digits; only 7+ digit ones come from the counter
+    ids = LoanRequest.objects.filter(loan_id__regex=r"^LSH[0-9]{7,}$").values_list("loan_id", flat=True).iterator()
+    IdCounter.objects.create(name="loan", next_value=max(highest(ids, r"LSH(\d+)") + 1, LOAN_START))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0011_job_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdCounter',
+            fields=[
+                ('name', models.CharField(max_length=30, primary_key=True, serialize=False)),
+                ('next_value', models.PositiveBigIntegerField()),
+            ],
+        ),
+        migrations.RunPython(seed_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('main', '0012_id_counter'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='loanlenderstatus',
+            index=models.Index(fields=['lender', '-updated_at'], name='lls_lender_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loanrequest',
+            index=models.Index(fields=['applicant', '-created_at'], name='loan_applicant_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loanrequest',
+            index=models.Index(fields=['status', 'accepted_lender', '-created_at'], name='loan_status_lender_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loanrequest',
+            index=models.Index(fields=['created_at'], name='loan_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='paymenttransaction',
+            index=models.Index(fields=['user', 'loan_request', 'status'], name='pay_user_loan_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='paymenttransaction',
+            index=models.Index(fields=['status', '-created_at'], name='pay_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='profile',
+            index=models.Index(fields=['status'], name='profile_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['role', 'created_at'], name='user_role_created_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:16
+
+from django.db import migrations, models
+
+
+def drop_duplicate_queued_keys(apps, schema_editor):
+    """Keep the oldest Queued job per key; the rest were meant to be no-ops."""
+    Job = apps.get_model("main", "Job")
+    seen = set()
+    duplicates = []
+    for pk, key in Job.objects.filter(status="Queued").exclude(key="").order_by("created_at", "pk").values_list("pk", "key"):
+        if key in seen:
+            duplicates.append(pk)
+        seen.add(key)
+    Job.objects.filter(pk__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0013_dashboard_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_queued_keys, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='job',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'Queued'), models.Q(('key', ''), _negated=True)), fields=('key',), name='job_queued_key_uniq'),
+        ),
+    ]
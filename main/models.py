@@ -1,9 +1,11 @@
 import uuid
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Q, F, OuterRef, Subquery, Case, When, Value, Count, Avg, Min, Max
+from django.db.models.functions import Coalesce, Greatest
 from django.utils import timezone
 from django.conf import settings
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin, BaseUserManager
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.contrib.auth.models import User
 
@@ -50,14 +52,15 @@ class User(AbstractBaseUser, PermissionsMixin):
     role = models.CharField(max_length=20, choices=ROLE_CHOICES)
     created_at = models.DateTimeField(default=timezone.now)
     is_active = models.BooleanField(default=True); is_staff = models.BooleanField(default=False)
+    profile_version = models.PositiveIntegerField(default=0, editable=False)  # bumped on Profile/details save
     USERNAME_FIELD = "email"; REQUIRED_FIELDS: list[str] = []
     objects = UserManager()
+    class Meta:
+        indexes = [models.Index(fields=["role", "created_at"], name="user_role_created_idx")]  # lender pool / fan-out
     def save(self,*a,**kw):
         if not self.user_id:
-            prefix = "LSHA" if self.role=="applicant" else "LSHL" if self.role=="lender" else "LSHAD"
-            last = User.objects.filter(role=self.role).order_by("-created_at").first()
-            last_num = int(last.user_id[-4:]) if last and last.user_id and last.user_id[-4:].isdigit() else 0
-            self.user_id = f"{prefix}{str(last_num+1).zfill(4)}"
+            from main.ids import next_user_id  # main.ids imports this module
+            self.user_id = next_user_id(self.role)
         super().save(*a,**kw)
     def __str__(self): return f"{self.user_id} - {self.email} ({self.role})"
 
@@ -79,6 +82,7 @@ class Profile(models.Model):
     status=models.CharField(max_length=20,choices=STATUS_CHOICES,default="Hold")
     is_reviewed=models.BooleanField(default=False); is_blocked=models.BooleanField(default=False)
     delete_reason=models.TextField(blank=True,null=True)  # ✅ added field
+    class Meta: indexes=[models.Index(fields=["status"],name="profile_status_idx")]
     def __str__(self): return f"{self.full_name} ({self.status})"
 
 # =====================================================
@@ -116,6 +120,104 @@ class LenderDetails(models.Model):
 # =====================================================
 # LOAN REQUEST
 # =====================================================
+class LoanRequestQuerySet(models.QuerySet):
+    """
+    Dashboard status classification, resolved in SQL.
+
+    Both ``with_applicant_status()`` and ``for_lender()`` annotate each loan
+    with a ``global_status`` of Approved / Rejected / Pending (plus the
+    dashboard-specific Finalised / Closed), so ``dashboard_counts()`` can
+    produce every counter for either dashboard in one aggregate query.
+    """
+
+    def with_applicant_status(self):
+        # Lenders who had joined when the loan was submitted; those without a
+        # LoanLenderStatus row are implicitly still Pending.
+        lender_pool = (
+            User.objects.filter(role="lender", created_at__lte=OuterRef("created_at"))
+            .order_by().values("role").annotate(n=Count("id")).values("n")
+        )
+        # Counters come from the denormalised summary on LoanRequest.
+        return self.annotate(
+            status_rows=F("approved_count") + F("rejected_count") + F("pending_count"),
+            responded_count=F("approved_count") + F("rejected_count"),
+            lender_pool=Coalesce(Subquery(lender_pool), 0),
+        ).annotate(
+            global_status=Case(
+                # Applicant manually finalised a lender
+                When(status="Finalised", accepted_lender__isnull=False, then=Value("Finalised")),
+                # Lender(s) approved, applicant hasn't finalised yet
+                When(approved_count__gt=0, status__in=["Pending", "AutoApproved", "Accepted"], then=Value("Approved")),
+                # No lender response yet
+                When(responded_count=0, then=Value("Pending")),
+                # Every lender in the pool rejected (untouched lenders count as pending)
+                When(rejected_count__gte=Greatest("status_rows", "lender_pool"), then=Value("Rejected")),
+                default=Value("Pending"),
+                output_field=models.CharField(),
+            )
+        )
+
+    def for_lender(self, lender):
+        """
+        Every loan on the lender's dashboard, one row per loan, annotated with:
+
+        * ``lender_status`` – the lender's own LoanLenderStatus (Pending if no row)
+        * ``payment_txn``   – latest Completed payment by this lender, if any
+        * ``global_status`` – Finalised / Closed / Approved / Rejected / Pending
+        * ``activity_at``   – when the lender last acted (or the loan was filed)
+        """
+        my_row = LoanLenderStatus.objects.filter(loan=OuterRef("pk"), lender=lender)
+        paid = PaymentTransaction.objects.filter(
+            loan_request=OuterRef("pk"), user=lender, status="Completed"
+        ).order_by("-created_at")
+
+        # "pk IN (…)" rather than EXISTS so each side of the OR can use an index
+        acted = LoanLenderStatus.objects.filter(lender=lender).values("loan_id")
+        return self.filter(Q(pk__in=acted) | Q(created_at__gte=lender.created_at)).annotate(
+            lender_status=Coalesce(Subquery(my_row.values("status")[:1]), Value("Pending")),
+            activity_at=Coalesce(Subquery(my_row.values("updated_at")[:1]), "created_at"),
+            payment_txn=Subquery(paid.values("txn_id")[:1]),
+        ).annotate(
+            global_status=Case(
+                # Applicant finalised this lender / another lender / loan closed off
+                When(status="Accepted", accepted_lender=lender, then=Value("Finalised")),
+                When(status__in=["Accepted", "Finalised"], then=Value("Closed")),
+                When(lender_status="Approved", then=Value("Approved")),
+                When(lender_status="Rejected", then=Value("Rejected")),
+                # Paid for the profile but never explicitly approved
+                When(payment_txn__isnull=False, then=Value("Approved")),
+                default=Value("Pending"),
+                output_field=models.CharField(),
+            )
+        )
+
+    def rebuild_status_summary(self):
+        """Recompute the denormalised status summary from LoanLenderStatus rows."""
+        rows = LoanLenderStatus.objects.filter(loan=OuterRef("pk")).order_by().values("loan")
+
+        def count(status):
+            return Coalesce(Subquery(rows.filter(status=status).annotate(n=Count("pk")).values("n")), 0)
+
+        return self.update(
+            approved_count=count("Approved"),
+            rejected_count=count("Rejected"),
+            pending_count=count("Pending"),
+            last_activity=Subquery(rows.annotate(at=Max("updated_at")).values("at")),
+        )
+
+    def dashboard_counts(self):
+        """All dashboard counters in one query; expects a ``global_status`` annotation."""
+        return self.aggregate(
+            total_loans=Count("pk"),
+            total_today=Count("pk", filter=Q(created_at__date=timezone.localdate())),
+            total_approved=Count("pk", filter=Q(global_status="Approved")),
+            total_rejected=Count("pk", filter=Q(global_status="Rejected")),
+            total_pending=Count("pk", filter=Q(global_status="Pending")),
+            avg_amount=Avg("amount_requested"),
+            best_rate=Min("interest_rate"),
+        )
+
+
 class LoanRequest(models.Model):
     id=models.UUIDField(primary_key=True,default=uuid.uuid4,editable=False)
     loan_id=models.CharField(max_length=100,unique=True)
@@ -126,8 +228,48 @@ class LoanRequest(models.Model):
     status=models.CharField(max_length=20,choices=[("Pending","Pending"),("Approved","Approved"),("Rejected","Rejected"),("Hold","Hold"),("Accepted","Accepted")],default="Pending")
     accepted_lender=models.ForeignKey(settings.AUTH_USER_MODEL,on_delete=models.SET_NULL,null=True,blank=True,related_name="accepted_loans")
     created_at=models.DateTimeField(auto_now_add=True)
+    # Status summary over lender_statuses, kept in step by set_lender_status()
+    # (rebuild with `manage.py rebuild_loan_summaries`)
+    approved_count=models.PositiveIntegerField(default=0); rejected_count=models.PositiveIntegerField(default=0)
+    pending_count=models.PositiveIntegerField(default=0); last_activity=models.DateTimeField(blank=True,null=True)
+    objects=LoanRequestQuerySet.as_manager()
+    class Meta:
+        indexes=[
+            models.Index(fields=["applicant","-created_at"],name="loan_applicant_created_idx"),  # applicant dashboard
+            models.Index(fields=["status","accepted_lender","-created_at"],name="loan_status_lender_idx"),  # lender pending / finalised
+            models.Index(fields=["created_at"],name="loan_created_idx"),  # lender inbox, admin loans tab
+        ]
     def __str__(self): return self.loan_id
 
+    STATUS_COUNTERS={"Approved":"approved_count","Rejected":"rejected_count","Pending":"pending_count"}
+
+    def set_lender_status(self, lender, status, **fields):
+        """
+        Upsert ``lender``'s LoanLenderStatus for this loan and move the status
+        summary counters in the same transaction. Returns ``(row, created)``.
+        """
+        with transaction.atomic():
+            # Lock the loan so concurrent decisions apply their deltas in turn
+            LoanRequest.objects.select_for_update().only("pk").get(pk=self.pk)
+            row, created = LoanLenderStatus.objects.get_or_create(
+                loan=self, lender=lender, defaults={"status": status, **fields}
+            )
+            previous = None if created else row.status
+            if not created:
+                row.status = status
+                for name, value in fields.items():
+                    setattr(row, name, value)
+                row.save()
+
+            delta = {}
+            if previous != status:
+                if previous in self.STATUS_COUNTERS:
+                    delta[self.STATUS_COUNTERS[previous]] = Greatest(F(self.STATUS_COUNTERS[previous]) - 1, 0)
+                if status in self.STATUS_COUNTERS:
+                    delta[self.STATUS_COUNTERS[status]] = F(self.STATUS_COUNTERS[status]) + 1
+            LoanRequest.objects.filter(pk=self.pk).update(last_activity=row.updated_at, **delta)
+        return row, created
+
 # =====================================================
 # LOAN LENDER STATUS
 # =====================================================
@@ -137,7 +279,9 @@ class LoanLenderStatus(models.Model):
     lender=models.ForeignKey(settings.AUTH_USER_MODEL,on_delete=models.CASCADE,related_name="lender_decisions")
     status=models.CharField(max_length=50,choices=[("Pending","Pending"),("Approved","Approved"),("Rejected","Rejected")],default="Pending")
     remarks=models.TextField(blank=True,null=True); created_at=models.DateTimeField(auto_now_add=True); updated_at=models.DateTimeField(auto_now=True)
-    class Meta: unique_together=("loan","lender")
+    class Meta:
+        unique_together=("loan","lender")
+        indexes=[models.Index(fields=["lender","-updated_at"],name="lls_lender_updated_idx")]
     def __str__(self): return f"{self.lender}-{self.loan.loan_id}({self.status})"
 
 # =====================================================
@@ -176,7 +320,125 @@ class PaymentTransaction(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # Lender inbox "paid for this loan?" subquery and view_profile's payment check
+            models.Index(fields=["user", "loan_request", "status"], name="pay_user_loan_status_idx"),
+            # Admin payments tab filtered by status, and reconcile_payments' Pending-by-age scan
+            models.Index(fields=["status", "-created_at"], name="pay_status_created_idx"),
+        ]
+
+
+# =====================================================
+# RAZORPAY WEBHOOK EVENTS (raw inbox, applied by process_webhooks)
+# =====================================================
+class RazorpayWebhookEvent(models.Model):
+    event_id = models.CharField(max_length=100, unique=True)  # X-Razorpay-Event-Id
+    event = models.CharField(max_length=100)
+    payload = models.JSONField()
+    event_created_at = models.DateTimeField(null=True, blank=True)  # Razorpay's own timestamp
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ["event_created_at", "received_at"]
+        indexes = [models.Index(fields=["processed_at", "event_created_at"], name="webhook_pending_idx")]
+
+    def __str__(self):
+        return f"{self.event} ({self.event_id})"
+
+
+# =====================================================
+# OUTBOUND EMAIL (transactional outbox, see main/outbox.py)
+# =====================================================
+class OutboundEmail(models.Model):
+    PRIORITY_OTP = 0
+    PRIORITY_DEFAULT = 5
+    PRIORITY_CHOICES = [(PRIORITY_OTP, "OTP"), (PRIORITY_DEFAULT, "Default")]
+    STATUS_CHOICES = [("Queued", "Queued"), ("Sent", "Sent"), ("Failed", "Failed")]
+
+    kind = models.CharField(max_length=30)  # otp, password_reset, support, ...
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=255)
+    to = models.JSONField()
+    priority = models.PositiveSmallIntegerField(choices=PRIORITY_CHOICES, default=PRIORITY_DEFAULT)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="Queued")
+    # Earliest time a sender may pick the row up; moved forward while a
+    # sender holds it (lease) and after each failure (backoff).
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    smtp_ms = models.PositiveIntegerField(null=True, blank=True)  # time spent in the SMTP exchange
+
+    class Meta:
+        ordering = ["priority", "created_at"]
+        indexes = [models.Index(fields=["status", "priority", "next_attempt_at"], name="outbox_due_idx")]
+
+    def __str__(self):
+        return f"{self.kind} → {', '.join(self.to)} ({self.status})"
+
+
+# =====================================================
+# BACKGROUND JOBS (DB-backed task queue, see main/jobs.py)
+# =====================================================
+class Job(models.Model):
+    STATUS_CHOICES = [
+        ("Queued", "Queued"),
+        ("Running", "Running"),
+        ("Done", "Done"),
+        ("Dead", "Dead"),  # out of attempts; kept for inspection / manual retry
+    ]
+
+    task = models.CharField(max_length=100)
+    args = models.JSONField(default=list, blank=True)
+    kwargs = models.JSONField(default=dict, blank=True)
+    queue = models.CharField(max_length=30, default="default")
+    priority = models.SmallIntegerField(default=0)  # lower runs first
+    # Optional dedupe key: enqueueing with a key that is already Queued is a no-op
+    key = models.CharField(max_length=100, blank=True, default="")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="Queued")
+    run_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    locked_by = models.CharField(max_length=100, blank=True, default="")
+    locked_until = models.DateTimeField(null=True, blank=True)  # lease; an expired Running job is reclaimed
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    duration_ms = models.PositiveIntegerField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["priority", "run_at"]
+        indexes = [
+            models.Index(fields=["status", "queue", "priority", "run_at"], name="job_due_idx"),
+            models.Index(fields=["key", "status"], name="job_key_idx"),
+        ]
+        constraints = [
+            # At most one Queued job per key (see Task.enqueue)
+            models.UniqueConstraint(
+                fields=["key"], condition=models.Q(status="Queued") & ~models.Q(key=""), name="job_queued_key_uniq",
+            ),
+        ]
 
+    def __str__(self):
+        return f"{self.task} #{self.pk} ({self.status})"
+
+
+# =====================================================
+# ID COUNTERS (main/ids.py)
+# =====================================================
+class IdCounter(models.Model):
+    # "user:applicant", "user:lender", "user:admin", "loan"
+    name = models.CharField(max_length=30, primary_key=True)
+    next_value = models.PositiveBigIntegerField()  # first number not yet handed to any worker
+
+    def __str__(self):
+        return f"{self.name} → {self.next_value}"
 
 
 # =====================================================
@@ -221,6 +483,17 @@ class CibilReport(models.Model):
 def create_user_profile(sender,instance,created,**kw): 
     if created: pass
 
+def bump_profile_version(sender,instance,**kw):
+    """Invalidate the cached profile-completeness gate (see ProfileCompletionMiddleware)."""
+    User.objects.filter(pk=instance.user_id).update(profile_version=F("profile_version")+1)
+    # Keep a loaded copy in step, or a later full save of it writes the old version back
+    if type(instance).user.is_cached(instance):
+        instance.user.profile_version+=1
+
+for _model in (Profile,ApplicantDetails,LenderDetails):
+    post_save.connect(bump_profile_version,sender=_model,dispatch_uid=f"bump_profile_version_{_model.__name__}")
+    post_delete.connect(bump_profile_version,sender=_model,dispatch_uid=f"bump_profile_version_{_model.__name__}_delete")
+
 # =====================================================
 # DELETED USER LOG
 # =====================================================
@@ -228,9 +501,33 @@ class DeletedUserLog(models.Model):
     email=models.EmailField(); mobile=models.CharField(max_length=15,null=True,blank=True)
     pancard_number=models.CharField(max_length=20,null=True,blank=True); aadhaar_number=models.CharField(max_length=20,null=True,blank=True)
     reason=models.TextField(); deleted_at=models.DateTimeField(auto_now_add=True)
+    class Meta: indexes=[models.Index(fields=["mobile","-deleted_at"],name="deleteduserlog_mobile_idx")]
     def __str__(self): return f"{self.email}-{self.reason[:30]}"
 
 
+# =====================================================
+# MAILBOX CACHE (synced from Gmail IMAP by `manage.py sync_mailbox`)
+# =====================================================
+class MailboxMessage(models.Model):
+    folder=models.CharField(max_length=20); uid=models.PositiveBigIntegerField()
+    message_id=models.CharField(max_length=255,blank=True,null=True)
+    from_addr=models.CharField(max_length=255,blank=True); to_addr=models.CharField(max_length=255,blank=True)
+    subject=models.CharField(max_length=500,blank=True); date=models.DateTimeField(null=True,blank=True)
+    date_raw=models.CharField(max_length=100,blank=True); snippet=models.TextField(blank=True)
+    is_seen=models.BooleanField(default=False); synced_at=models.DateTimeField(auto_now=True)
+    class Meta:
+        unique_together=("folder","uid"); ordering=["-uid"]
+        indexes=[models.Index(fields=["folder","-uid"],name="mailbox_folder_uid_idx")]
+    def __str__(self): return f"{self.folder}#{self.uid} {self.subject[:40]}"
+
+class MailboxSyncState(models.Model):
+    folder=models.CharField(max_length=20,unique=True)
+    uidvalidity=models.PositiveBigIntegerField(null=True,blank=True); last_uid=models.PositiveBigIntegerField(default=0)
+    unread_count=models.PositiveIntegerField(default=0)
+    last_synced_at=models.DateTimeField(null=True,blank=True); last_error=models.TextField(blank=True)
+    def __str__(self): return f"{self.folder} (uid {self.last_uid})"
+
+
 # =====================================================
 # ADVERTISEMENT
 # =====================================================
@@ -0,0 +1,173 @@
+"""
+Transactional email outbox.
+
+Views never talk to SMTP: ``queue_email()`` writes an OutboundEmail row in
+the caller's transaction, and a sender drains the table over one reused
+SMTP connection per batch, OTP mails first. The sender is either
+
+* a daemon thread in each web process, woken after the queuing transaction
+  commits (``EMAIL_OUTBOX_IN_PROCESS``, the default), or
+* a dedicated worker: ``manage.py send_outbox --interval 1``.
+
+Both can run at once; a row is leased to one sender at a time.
+"""
+import logging
+import os
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from main.models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 6
+RETRY_BACKOFF = 30           # seconds before the first retry, doubled each time
+MAX_BACKOFF = 60 * 60
+LEASE = timedelta(minutes=5)  # a crashed sender's rows become due again after this
+
+
+def queue_email(kind, subject, body, to, priority=OutboundEmail.PRIORITY_DEFAULT, from_email=None):
+    """Queue a plain-text email; it is sent after the surrounding transaction commits."""
+    email = OutboundEmail.objects.create(
+        kind=kind, subject=subject, body=body, to=list(to),
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL, priority=priority,
+    )
+    if settings.EMAIL_OUTBOX_IN_PROCESS:
+        transaction.on_commit(wake_sender)
+    return email
+
+
+# -------------------- Sending --------------------
+def _claim(batch_size, lane):
+    """Lease up to ``batch_size`` due rows, OTPs first, to this sender."""
+    now = timezone.now()
+    due = OutboundEmail.objects.filter(status="Queued", next_attempt_at__lte=now)
+    if lane == "otp":
+        due = due.filter(priority=OutboundEmail.PRIORITY_OTP)
+
+    claimed = []
+    for email in due.order_by("priority", "next_attempt_at")[:batch_size]:
+        # Conditional update: if another sender leased the row first, it no
+        # longer matches and we skip it.
+        leased = OutboundEmail.objects.filter(
+            pk=email.pk, status="Queued", attempts=email.attempts, next_attempt_at__lte=now
+        ).update(attempts=F("attempts") + 1, next_attempt_at=now + LEASE)
+        if leased:
+            email.attempts += 1
+            claimed.append(email)
+    return claimed
+
+
+def _retry_at(attempts):
+    return timezone.now() + timedelta(seconds=min(RETRY_BACKOFF * 2 ** (attempts - 1), MAX_BACKOFF))
+
+
+def send_pending(batch_size=50, lane=None):
+    """
+    Send one batch of due emails over a single SMTP connection.
+    ``lane="otp"`` only picks OTP mails. Returns a report dict.
+    """
+    emails = _claim(batch_size, lane)
+    report = {"sent": 0, "retrying": 0, "failed": 0, "queue_ms": [], "smtp_ms": []}
+    if not emails:
+        return report
+
+    connection = get_connection()
+    try:
+        for email in emails:
+            message = EmailMessage(email.subject, email.body, email.from_email, email.to, connection=connection)
+            started = time.perf_counter()
+            try:
+                message.send()
+            except Exception as e:
+                # The session may be unusable now; the next send reconnects.
+                connection.close()
+                _record_failure(email, e, report)
+                continue
+
+            email.smtp_ms = round((time.perf_counter() - started) * 1000)
+            email.sent_at = timezone.now()
+            email.status = "Sent"
+            email.last_error = ""
+            email.save(update_fields=["status", "sent_at", "smtp_ms", "last_error"])
+            report["sent"] += 1
+            report["smtp_ms"].append(email.smtp_ms)
+            report["queue_ms"].append((email.sent_at - email.created_at).total_seconds() * 1000)
+    finally:
+        connection.close()
+    return report
+
+
+def _record_failure(email, error, report):
+    email.last_error = str(error)
+    if email.attempts >= MAX_ATTEMPTS:
+        email.status = "Failed"
+        report["failed"] += 1
+        logger.error(f"❌ Giving up on {email.kind} email to {email.to} after {email.attempts} attempts: {error}")
+    else:
+        email.next_attempt_at = _retry_at(email.attempts)
+        report["retrying"] += 1
+        logger.warning(f"⚠️ {email.kind} email to {email.to} failed ({error}); retry at {email.next_attempt_at:%H:%M:%S}")
+    email.save(update_fields=["status", "next_attempt_at", "last_error"])
+
+
+def _percentile(samples, q):
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * q))]) if ordered else 0
+
+
+def summarize(report):
+    """One-line delivery summary of a ``send_pending`` / ``drain`` report."""
+    queue, smtp = report["queue_ms"], report["smtp_ms"]
+    return (
+        f"{report['sent']} sent, {report['retrying']} retrying, {report['failed']} failed; "
+        f"queued→sent p50 {_percentile(queue, 0.5)} ms / p95 {_percentile(queue, 0.95)} ms, "
+        f"SMTP p50 {_percentile(smtp, 0.5)} ms / p95 {_percentile(smtp, 0.95)} ms"
+    )
+
+
+def drain(batch_size=50, lane=None):
+    """Send batches until nothing is due. Returns the merged report."""
+    total = {"sent": 0, "retrying": 0, "failed": 0, "queue_ms": [], "smtp_ms": []}
+    while True:
+        report = send_pending(batch_size, lane)
+        for key, value in report.items():
+            total[key] += value
+        if report["sent"] + report["retrying"] + report["failed"] < batch_size:
+            return total
+
+
+# -------------------- In-process sender --------------------
+_wakeup = threading.Event()
+_sender = {"pid": None}
+_sender_lock = threading.Lock()
+
+
+def _sender_loop():
+    while True:
+        _wakeup.wait(timeout=settings.EMAIL_OUTBOX_POLL_INTERVAL)
+        _wakeup.clear()
+        try:
+            drain(settings.EMAIL_OUTBOX_BATCH_SIZE)
+        except Exception:
+            logger.exception("❌ Outbox sender batch failed")
+        finally:
+            close_old_connections()
+
+
+def wake_sender():
+    """Start this process's sender thread if needed and have it drain the outbox now."""
+    # Checked per pid: gunicorn preloads the app, and threads don't survive fork.
+    if _sender["pid"] != os.getpid():
+        with _sender_lock:
+            if _sender["pid"] != os.getpid():
+                threading.Thread(target=_sender_loop, name="outbox-sender", daemon=True).start()
+                _sender["pid"] = os.getpid()
+    _wakeup.set()
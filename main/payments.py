@@ -0,0 +1,70 @@
+"""
+Payment state transitions shared by every path that learns a payment's
+outcome: the browser callback, the Razorpay webhook worker and the
+reconciliation job.
+"""
+import logging
+
+from django.db import transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+def apply_payment_status(payment, status, raw_response=None):
+    """
+    Move ``payment`` to ``status`` ("Completed" / "Failed") and, once it is
+    Completed against a loan, sync the dashboards (see sync_loan_for_payment).
+
+    A Completed payment is never downgraded to Failed.
+    """
+    with transaction.atomic():
+        if payment.status == "Completed" and status != "Completed":
+            return payment
+
+        payment.status = status
+        if raw_response is not None:
+            payment.raw_response = raw_response
+        payment.updated_at = timezone.now()
+        payment.save(update_fields=["status", "raw_response", "updated_at"])
+
+        if status == "Completed":
+            sync_loan_for_payment(payment)
+    return payment
+
+
+def sync_loan_for_payment(payment):
+    """The loan is Accepted for the paying lender and their LoanLenderStatus becomes Approved."""
+    if not payment.loan_request_id:
+        return
+    loan = payment.loan_request
+    lender = payment.user
+
+    # 🔹 Mark loan as Accepted (for applicant dashboard)
+    if loan.accepted_lender_id != lender.pk:
+        loan.accepted_lender = lender
+        loan.status = "Accepted"
+        loan.save(update_fields=["accepted_lender", "status"])
+        logger.info(f"📢 Loan {loan.loan_id} marked Accepted by applicant for {lender.email}")
+
+    # 🔹 Update lender feedback (for lender dashboard); no row yet
+    #    just means the lender was implicitly Pending.
+    _, created = loan.set_lender_status(lender, "Approved")
+    if created:
+        logger.info(f"🆕 Created lender feedback entry for {lender.email} → {loan.loan_id}")
+
+
+def gateway_status(client, payment):
+    """
+    Ask Razorpay what happened to ``payment``'s order. Returns
+    ``(status, raw)`` where status is "Completed" (a payment was captured),
+    "Failed" (every attempt failed) or None (no attempt yet, or one is
+    still in flight).
+    """
+    raw = client.order.payments(payment.txn_id)
+    attempts = [item.get("status") for item in raw.get("items", [])]
+    if "captured" in attempts:
+        return "Completed", raw
+    if attempts and all(state == "failed" for state in attempts):
+        return "Failed", raw
+    return None, raw
@@ -0,0 +1,170 @@
+"""
+One shared, connection-pooled Razorpay client per worker process.
+
+Creating ``razorpay.Client`` per request opened a fresh TLS connection for
+every order. ``get_client()`` instead returns a process-wide client whose
+``requests`` session keeps connections alive, applies explicit connect/read
+timeouts to every call, retries idempotent calls with jittered exponential
+backoff, and records per-endpoint latency (see ``latency_stats()``).
+
+``RAZORPAY_BASE_URL`` points the client at a local stand-in server in tests
+and benchmarks (see ``main/razorpay_standin.py``).
+"""
+import logging
+import os
+import random
+import re
+import statistics
+import threading
+import time
+from collections import defaultdict, deque
+
+import razorpay
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from main import timing
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENT_METHODS = {"get", "head", "options"}
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+
+# -------------------- Latency metrics --------------------
+_samples = defaultdict(lambda: deque(maxlen=500))
+_counters = defaultdict(lambda: {"calls": 0, "errors": 0, "retries": 0})
+_metrics_lock = threading.Lock()
+
+
+def _endpoint(method, path):
+    # /v1/orders/order_Ab12/payments -> GET /v1/orders/{id}/payments
+    return f"{method.upper()} {re.sub(r'/[a-z]+_[A-Za-z0-9]+', '/{id}', path)}"
+
+
+def _record(endpoint, elapsed_ms, ok, retried):
+    timing.record("razorpay", elapsed_ms)
+    with _metrics_lock:
+        _samples[endpoint].append(elapsed_ms)
+        counters = _counters[endpoint]
+        counters["calls"] += 1
+        counters["errors"] += 0 if ok else 1
+        counters["retries"] += retried
+    logger.debug(f"💳 Razorpay {endpoint} {elapsed_ms:.1f} ms ok={ok}")
+
+
+def latency_stats():
+    """``{endpoint: {calls, errors, retries, p50_ms, p95_ms, max_ms}}`` for this process."""
+    with _metrics_lock:
+        stats = {}
+        for endpoint, samples in _samples.items():
+            ordered = sorted(samples)
+            stats[endpoint] = {
+                **_counters[endpoint],
+                "p50_ms": round(statistics.median(ordered), 1),
+                "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 1),
+                "max_ms": round(ordered[-1], 1),
+            }
+        return stats
+
+
+def reset_latency_stats():
+    with _metrics_lock:
+        _samples.clear()
+        _counters.clear()
+
+
+# -------------------- Pooled session + client --------------------
+class PooledSession(requests.Session):
+    """Keep-alive session that applies default (connect, read) timeouts."""
+
+    def __init__(self, pool_size, timeout):
+        super().__init__()
+        self.default_timeout = timeout
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.default_timeout)
+        return super().request(method, url, **kwargs)
+
+
+class RazorpayClient(razorpay.Client):
+    """
+    razorpay.Client with our own retry policy.
+
+    The SDK's built-in retry also retries POSTs (e.g. order creation), which
+    isn't safe. Here only idempotent calls are retried on connection errors,
+    timeouts and 5xx responses. Any call is retried when the connection
+    itself timed out, because then the request never reached Razorpay.
+    """
+
+    def __init__(self, *, max_retries, backoff, **kwargs):
+        super().__init__(**kwargs)
+        self.retry_attempts = max_retries
+        self.backoff = backoff
+
+    def request(self, method, path, **options):
+        endpoint = _endpoint(method, path)
+        idempotent = method.lower() in IDEMPOTENT_METHODS
+        started = time.perf_counter()
+        attempt = 0
+        while True:
+            try:
+                result = super().request(method, path, **{**options, "headers": dict(options.get("headers", {}))})
+                _record(endpoint, (time.perf_counter() - started) * 1000, True, attempt)
+                return result
+            except Exception as e:
+                retryable = isinstance(e, requests.exceptions.ConnectTimeout) or (
+                    idempotent and isinstance(e, (
+                        requests.exceptions.ConnectionError,
+                        requests.exceptions.Timeout,
+                        razorpay.errors.ServerError,
+                    ))
+                )
+                if not retryable or attempt >= self.retry_attempts:
+                    _record(endpoint, (time.perf_counter() - started) * 1000, False, attempt)
+                    raise
+                delay = self.backoff * (2 ** attempt) * random.uniform(0.5, 1.5)
+                logger.warning(f"⚠️ Razorpay {endpoint} failed ({e}); retry {attempt + 1} in {delay:.2f}s")
+                time.sleep(delay)
+                attempt += 1
+
+
+def build_client():
+    session = PooledSession(
+        pool_size=settings.RAZORPAY_POOL_SIZE,
+        timeout=(settings.RAZORPAY_CONNECT_TIMEOUT, settings.RAZORPAY_READ_TIMEOUT),
+    )
+    client = RazorpayClient(
+        session=session,
+        auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET),
+        base_url=settings.RAZORPAY_BASE_URL,
+        max_retries=settings.RAZORPAY_MAX_RETRIES,
+        backoff=settings.RAZORPAY_RETRY_BACKOFF,
+    )
+    client.set_app_details({"title": "Loan Saathi Hub", "version": "1.0"})
+    return client
+
+
+def get_client():
+    """The process-wide client (rebuilt after fork so workers never share sockets)."""
+    global _client, _client_pid
+    if _client is None or _client_pid != os.getpid():
+        with _client_lock:
+            if _client is None or _client_pid != os.getpid():
+                _client = build_client()
+                _client_pid = os.getpid()
+    return _client
+
+
+def reset_client():
+    """Drop the shared client, e.g. after changing settings in tests."""
+    global _client
+    with _client_lock:
+        _client = None
@@ -0,0 +1,143 @@
+"""
+A local stand-in for the Razorpay REST API, for tests and benchmarks.
+
+Only the endpoints this app calls are implemented, with in-memory state::
+
+    with RazorpayStandIn() as gateway, override_settings(RAZORPAY_BASE_URL=gateway.url):
+        reset_client()
+        order = get_client().order.create({"amount": 4900, "currency": "INR"})
+        gateway.pay(order["id"])
+
+``fail_next`` answers the next N requests with 503, ``delay`` slows every
+response, and ``connections`` counts distinct client sockets (to check
+keep-alive reuse). ``port`` fixes the port (default: any free one) so a
+separately started server can be pointed at it.
+"""
+import itertools
+import json
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _QuietServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        pass  # clients that time out and hang up are expected
+
+
+class RazorpayStandIn:
+    def __init__(self, delay=0.0, port=0):
+        self.delay = delay
+        self.fail_next = 0
+        self.orders = {}
+        self.payments = {}
+        self.calls = []
+        self.connections = set()
+        self._ids = itertools.count(1)
+        self._run = uuid.uuid4().hex[:6]  # ids stay unique across stand-in instances
+        self._lock = threading.Lock()
+        self._server = _QuietServer(("127.0.0.1", port), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+    # -------------------- Test helpers --------------------
+    def new_id(self, prefix):
+        return f"{prefix}_{self._run}{next(self._ids):08d}"
+
+    def pay(self, order_id, status="captured", method="upi"):
+        """Attach a payment to ``order_id`` as if the customer had paid."""
+        with self._lock:
+            payment = {
+                "id": self.new_id("pay"), "entity": "payment", "order_id": order_id,
+                "amount": self.orders[order_id]["amount"], "currency": "INR",
+                "status": status, "method": method, "created_at": int(time.time()),
+            }
+            self.payments[payment["id"]] = payment
+            order = self.orders[order_id]
+            order["attempts"] += 1
+            if status == "captured":
+                order.update(status="paid", amount_paid=order["amount"], amount_due=0)
+            else:
+                order["status"] = "attempted"
+        return payment
+
+    # -------------------- API --------------------
+    def handle(self, method, path, body):
+        if method == "POST" and path == "/v1/orders":
+            order = {
+                "id": self.new_id("order"), "entity": "order", "amount": body["amount"],
+                "amount_paid": 0, "amount_due": body["amount"], "currency": body.get("currency", "INR"),
+                "receipt": body.get("receipt"), "notes": body.get("notes") or [], "status": "created", "attempts": 0,
+                "created_at": int(time.time()),
+            }
+            self.orders[order["id"]] = order
+            return 200, order
+
+        match = re.fullmatch(r"/v1/orders/([\w]+)(/payments)?", path)
+        if method == "GET" and match:
+            order = self.orders.get(match.group(1))
+            if not order:
+                return 400, {"error": {"code": "BAD_REQUEST_ERROR", "description": "The id provided does not exist"}}
+            if match.group(2):
+                items = [p for p in self.payments.values() if p["order_id"] == order["id"]]
+                return 200, {"entity": "collection", "count": len(items), "items": items}
+            return 200, order
+
+        match = re.fullmatch(r"/v1/payments/([\w]+)", path)
+        if method == "GET" and match and match.group(1) in self.payments:
+            return 200, self.payments[match.group(1)]
+
+        return 404, {"error": {"code": "BAD_REQUEST_ERROR", "description": f"No route for {method} {path}"}}
+
+    def _handler(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive
+            disable_nagle_algorithm = True
+
+            def _respond(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                path = self.path.split("?")[0]
+                with standin._lock:
+                    standin.calls.append((self.command, path))
+                    standin.connections.add(self.client_address)
+                    failing = standin.fail_next > 0
+                    standin.fail_next -= failing
+                if standin.delay:
+                    time.sleep(standin.delay)
+                if failing:
+                    status, payload = 503, {"error": {"code": "SERVER_ERROR", "description": "Stand-in outage"}}
+                else:
+                    with standin._lock:
+                        status, payload = standin.handle(self.command, path, json.loads(raw or b"{}"))
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = _respond
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,103 @@
+"""
+Reconciliation of PaymentTransactions stuck in "Pending".
+
+A payment stays Pending when the customer's browser never reaches
+``payment_callback``. ``reconcile_pending()`` pages through old Pending
+rows, asks Razorpay about each order with a bounded number of concurrent
+requests, and writes each batch back with one ``bulk_update``. Workers
+run it as the reconcile_payments job every ``RECONCILE_PAYMENTS_EVERY``
+seconds; ``manage.py reconcile_payments`` runs it by hand or from cron.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from main.models import PaymentTransaction
+from main.pagination import keyset_page
+from main.payments import gateway_status, sync_loan_for_payment
+from main.razorpay_client import get_client
+from main.tasks import prerender_invoice
+
+
+def _lookup(client, payment):
+    try:
+        return gateway_status(client, payment)
+    except Exception as e:
+        return "error", {"error": str(e)}
+
+
+def reconcile_pending(older_than_minutes=15, expire_after_hours=24, batch_size=100,
+                      concurrency=4, dry_run=False, client=None):
+    """
+    Settle Pending payments older than ``older_than_minutes``:
+
+    * a captured payment on the order        → Completed (loan synced)
+    * no capture and older than the expiry   → Failed (abandoned checkout)
+    * anything else                          → left Pending for the next run
+
+    Returns a summary dict of counts and timings.
+    """
+    started = time.perf_counter()
+    now = timezone.now()
+    expire_before = now - timedelta(hours=expire_after_hours)
+    client = client or get_client()
+    report = {"scanned": 0, "completed": 0, "failed": 0, "unchanged": 0, "errors": 0, "batches": 0}
+
+    pending = PaymentTransaction.objects.filter(
+        status="Pending", created_at__lt=now - timedelta(minutes=older_than_minutes)
+    ).select_related("user", "loan_request")
+
+    cursor = None
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="reconcile") as pool:
+        while True:
+            rows, cursor = keyset_page(pending, "created_at", cursor, limit=batch_size)
+            if not rows:
+                break
+            report["batches"] += 1
+            report["scanned"] += len(rows)
+
+            changed = []
+            for payment, (status, raw) in zip(rows, pool.map(lambda p: _lookup(client, p), rows)):
+                if status == "error":
+                    report["errors"] += 1
+                    continue
+                if status != "Completed":
+                    status = "Failed" if payment.created_at < expire_before else None
+                if status is None:
+                    report["unchanged"] += 1
+                    continue
+                payment.status, payment.raw_response, payment.updated_at = status, raw, now
+                changed.append(payment)
+
+            if changed and not dry_run:
+                _apply(changed)
+            for payment in changed:
+                report["completed" if payment.status == "Completed" else "failed"] += 1
+
+            if not cursor:
+                break
+
+    report["elapsed_s"] = round(time.perf_counter() - started, 2)
+    return report
+
+
+def _apply(changed):
+    with transaction.atomic():
+        # Skip rows a callback or webhook settled while we were asking Razorpay
+        still_pending = set(
+            PaymentTransaction.objects.select_for_update()
+            .filter(pk__in=[p.pk for p in changed], status="Pending")
+            .values_list("pk", flat=True)
+        )
+        changed[:] = [p for p in changed if p.pk in still_pending]
+        PaymentTransaction.objects.bulk_update(changed, ["status", "raw_response", "updated_at"])
+        for payment in changed:
+            if payment.status == "Completed":
+                sync_loan_for_payment(payment)
+                # bulk_update sends no post_save, so queue the invoice render here
+                if settings.INVOICE_PRERENDER:
+                    prerender_invoice.enqueue(args=[str(payment.pk)], key=f"invoice:{payment.pk}")
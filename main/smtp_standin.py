@@ -0,0 +1,99 @@
+"""
+A local stand-in SMTP server, for tests and benchmarks.
+
+Speaks just enough plain SMTP (no TLS/AUTH) for Django's SMTP backend::
+
+    with SMTPStandIn() as smtp, override_settings(EMAIL_HOST="127.0.0.1", EMAIL_PORT=smtp.port,
+                                                 EMAIL_USE_TLS=False, EMAIL_HOST_USER="", EMAIL_HOST_PASSWORD=""):
+        send_mail("Hi", "Body", "from@example.com", ["to@example.com"])
+        smtp.messages  # [(sender, [recipients], data)]
+
+``connections`` counts sessions opened, ``drop_next`` hangs up on the next N
+commands, ``delay`` slows every reply and ``port`` fixes the listening port
+(default: any free one).
+"""
+import socketserver
+import threading
+import time
+
+
+class _QuietServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def handle_error(self, request, client_address):
+        pass
+
+
+class SMTPStandIn:
+    def __init__(self, delay=0.0, port=0):
+        self.delay = delay
+        self.drop_next = 0
+        self.connections = 0
+        self.messages = []
+        self._lock = threading.Lock()
+        self._server = _QuietServer(("127.0.0.1", port), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def port(self):
+        return self._server.server_address[1]
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler(self):
+        standin = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def reply(self, line):
+                if standin.delay:
+                    time.sleep(standin.delay)
+                self.wfile.write(f"{line}\r\n".encode())
+
+            def handle(self):
+                with standin._lock:
+                    standin.connections += 1
+                self.reply("220 standin ESMTP")
+                sender, recipients = None, []
+                while True:
+                    raw = self.rfile.readline()
+                    if not raw:
+                        return
+                    with standin._lock:
+                        dropping = standin.drop_next > 0
+                        standin.drop_next -= dropping
+                    if dropping:
+                        return  # hang up mid-session
+                    command = raw.decode(errors="replace").strip()
+                    verb = command[:4].upper()
+                    if verb in ("EHLO", "HELO"):
+                        self.reply("250 standin")
+                    elif verb == "MAIL":
+                        sender, recipients = command[10:].strip("<>"), []
+                        self.reply("250 OK")
+                    elif verb == "RCPT":
+                        recipients.append(command[8:].strip("<>"))
+                        self.reply("250 OK")
+                    elif verb == "DATA":
+                        self.reply("354 End data with <CR><LF>.<CR><LF>")
+                        lines = []
+                        while (line := self.rfile.readline()) not in (b".\r\n", b""):
+                            lines.append(line)
+                        with standin._lock:
+                            standin.messages.append((sender, recipients, b"".join(lines)))
+                        self.reply("250 OK queued")
+                    elif verb in ("NOOP", "RSET"):
+                        self.reply("250 OK")
+                    elif verb == "QUIT":
+                        self.reply("221 Bye")
+                        return
+                    else:
+                        self.reply("502 Command not implemented")
+
+        return Handler
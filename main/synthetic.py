@@ -0,0 +1,318 @@
+"""
+Deterministic synthetic marketplace data for benchmarking
+(``manage.py seed_synthetic``).
+
+The same seed always produces the same rows (keys, timestamps, amounts,
+decisions), so a performance change can be measured before and after
+against an identical dataset. Rows are written with ``bulk_create`` in
+chunks of loans, each chunk in its own transaction; model signals don't
+fire, and the denormalised loan status summary is filled in directly.
+
+User and loan numbers come from a fixed range above the live sequences
+(``SYNTHETIC_START``), not from the ID counters, so they repeat from run to
+run too. The counters are then moved past that range, so accounts and
+loans created later never take a synthetic number.
+
+All synthetic users have an ``@synthetic.test`` email, which is how
+``purge()`` finds them again.
+"""
+import bisect
+import random
+import string
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+from main.ids import USER_PREFIXES
+from main.models import (
+    ApplicantDetails, CibilReport, IdCounter, LenderDetails, LoanLenderStatus, LoanRequest,
+    PaymentTransaction, Profile, User,
+)
+
+EMAIL_DOMAIN = "synthetic.test"
+# First number per ID counter; live IDs are far below these
+SYNTHETIC_START = {"user:lender": 9_000_000, "user:applicant": 9_000_000, "loan": 9_000_000}
+# Fixed calendar, so timestamps don't depend on when the command runs
+EPOCH = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+SPAN_DAYS = 365
+
+CITIES = [
+    ("Mumbai", "Maharashtra", "400"), ("Pune", "Maharashtra", "411"), ("Delhi", "Delhi", "110"),
+    ("Bengaluru", "Karnataka", "560"), ("Hyderabad", "Telangana", "500"), ("Chennai", "Tamil Nadu", "600"),
+    ("Kolkata", "West Bengal", "700"), ("Ahmedabad", "Gujarat", "380"), ("Jaipur", "Rajasthan", "302"),
+    ("Lucknow", "Uttar Pradesh", "226"), ("Indore", "Madhya Pradesh", "452"), ("Patna", "Bihar", "800"),
+]
+FIRST_NAMES = ["Aarav", "Vivaan", "Aditya", "Arjun", "Rohan", "Karan", "Priya", "Ananya", "Diya", "Isha",
+               "Kavya", "Neha", "Rahul", "Sneha", "Vikram", "Pooja", "Amit", "Sunita", "Ravi", "Meera"]
+LAST_NAMES = ["Sharma", "Verma", "Patel", "Singh", "Kumar", "Gupta", "Reddy", "Iyer", "Nair", "Das",
+              "Mehta", "Joshi", "Agarwal", "Chopra", "Rao", "Mishra"]
+LOAN_TYPES = [("Personal Loan", 40), ("Home Loan", 15), ("Business Loan", 20), ("Car Loan", 10),
+              ("Education Loan", 8), ("Gold Loan", 7)]
+LENDER_TYPES = ["Bank", "NBFC", "DSA", "Fintech"]
+BANKS = ["HDFC Bank", "ICICI Bank", "Axis Bank", "SBI", "Kotak Mahindra Bank", "Bajaj Finance",
+         "Tata Capital", "IDFC First Bank", "Yes Bank", "Muthoot Finance"]
+
+# Weighted status distributions
+PROFILE_STATUS = [("Active", 85), ("Hold", 10), ("Deactivated", 3), ("Deleted", 2)]
+LOAN_STATUS = [("Pending", 68), ("Accepted", 15), ("Rejected", 12), ("Hold", 5)]
+DECISION_STATUS = [("Rejected", 55), ("Approved", 35), ("Pending", 10)]
+PAYMENT_STATUS = [("Completed", 85), ("Failed", 10), ("Pending", 5)]
+
+
+# -------------------- Identity numbers --------------------
+_VERHOEFF_D = [
+    [0, 1, 2, 3, 4, 5, 6, 7, 8, 9], [1, 2, 3, 4, 0, 6, 7, 8, 9, 5], [2, 3, 4, 0, 1, 7, 8, 9, 5, 6],
+    [3, 4, 0, 1, 2, 8, 9, 5, 6, 7], [4, 0, 1, 2, 3, 9, 5, 6, 7, 8], [5, 9, 8, 7, 6, 0, 4, 3, 2, 1],
+    [6, 5, 9, 8, 7, 1, 0, 4, 3, 2], [7, 6, 5, 9, 8, 2, 1, 0, 4, 3], [8, 7, 6, 5, 9, 3, 2, 1, 0, 4],
+    [9, 8, 7, 6, 5, 4, 3, 2, 1, 0],
+]
+_VERHOEFF_P = [
+    [0, 1, 2, 3, 4, 5, 6, 7, 8, 9], [1, 5, 7, 6, 2, 8, 3, 0, 9, 4], [5, 8, 0, 3, 7, 9, 6, 1, 4, 2],
+    [8, 9, 1, 6, 0, 4, 3, 5, 2, 7], [9, 4, 5, 3, 1, 2, 6, 8, 7, 0], [4, 2, 8, 6, 5, 7, 3, 9, 0, 1],
+    [2, 7, 9, 3, 8, 0, 6, 4, 1, 5], [7, 0, 4, 6, 9, 1, 3, 2, 5, 8],
+]
+_VERHOEFF_INV = [0, 4, 3, 2, 1, 5, 6, 7, 8, 9]
+
+
+def verhoeff_valid(number):
+    check = 0
+    for i, digit in enumerate(reversed(number)):
+        check = _VERHOEFF_D[check][_VERHOEFF_P[i % 8][int(digit)]]
+    return check == 0
+
+
+def _verhoeff_digit(number):
+    check = 0
+    for i, digit in enumerate(reversed(number)):
+        check = _VERHOEFF_D[check][_VERHOEFF_P[(i + 1) % 8][int(digit)]]
+    return str(_VERHOEFF_INV[check])
+
+
+def aadhaar_number(rng):
+    """12 digits, never starting 0/1, ending in a Verhoeff check digit (as UIDAI issues them)."""
+    body = str(rng.randint(2, 9)) + "".join(rng.choice(string.digits) for _ in range(10))
+    return body + _verhoeff_digit(body)
+
+
+def pan_number(rng, surname):
+    """AAAPL1234C: 3 letters, holder type P (person), surname initial, 4 digits, a letter."""
+    letters = string.ascii_uppercase
+    return (
+        "".join(rng.choice(letters) for _ in range(3)) + "P" + surname[0].upper()
+        + f"{rng.randint(1, 9999):04d}" + rng.choice(letters)
+    )
+
+
+# -------------------- Generation --------------------
+class SyntheticIdCollision(Exception):
+    """The synthetic ID range is already in use (typically an earlier run that wasn't purged)."""
+
+
+def _claim_numbers(counter, count, chunk_size, make_key, taken):
+    """
+    The ``count`` numbers reserved for ``counter``, after checking that none
+    of their keys (``make_key(number)``) is ``taken`` yet. The live counter
+    is moved past them.
+    """
+    first = SYNTHETIC_START[counter]
+    if not count:
+        return first
+    for start in range(first, first + count, chunk_size):
+        keys = [make_key(number) for number in range(start, min(start + chunk_size, first + count))]
+        if taken(keys):
+            raise SyntheticIdCollision(f"{keys[0]} onwards ({counter}) is already in use")
+    IdCounter.objects.get_or_create(name=counter, defaults={"next_value": first + count})
+    IdCounter.objects.filter(name=counter).update(next_value=Greatest(F("next_value"), first + count))
+    return first
+
+
+def _weighted(rng, table):
+    values, weights = zip(*table)
+    return rng.choices(values, weights)[0]
+
+
+def _uuid(rng):
+    return uuid.UUID(int=rng.getrandbits(128), version=4)
+
+
+@contextmanager
+def _explicit_timestamps():
+    """Let bulk_create keep our created_at/updated_at instead of now()."""
+    fields = [
+        field for model in (LoanRequest, LoanLenderStatus, PaymentTransaction)
+        for field in model._meta.concrete_fields if getattr(field, "auto_now", False) or getattr(field, "auto_now_add", False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class _Generator:
+    def __init__(self, seed, password, chunk_size, log):
+        self.rng = random.Random(seed)
+        self.password = make_password(password)  # hashed once, shared by every account
+        self.chunk_size = chunk_size
+        self.log = log or (lambda message: None)
+        self.pans, self.aadhaars = set(), set()
+        self.txn_seq = 0
+
+    def unique(self, seen, make):
+        while (value := make()) in seen:
+            pass
+        seen.add(value)
+        return value
+
+    def claim_users(self, role, count):
+        return _claim_numbers(
+            f"user:{role}", count, self.chunk_size, lambda number: f"{USER_PREFIXES[role]}{number:04d}",
+            lambda keys: User.objects.filter(user_id__in=keys).exists(),
+        )
+
+    def claim_loans(self, count):
+        return _claim_numbers(
+            "loan", count, self.chunk_size, lambda number: f"LSH{number}",
+            lambda keys: LoanRequest.objects.filter(loan_id__in=keys).exists(),
+        )
+
+    def users(self, role, count, first_number, joined_within_days):
+        """Users numbered from ``first_number`` with Profile and role details; returns [(pk, created_at)]."""
+        rng, created = self.rng, []
+        for start in range(0, count, self.chunk_size):
+            users, profiles, details = [], [], []
+            for number in range(first_number + start, first_number + min(start + self.chunk_size, count)):
+                first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+                user_id = f"{USER_PREFIXES[role]}{number:04d}"
+                joined = EPOCH + timedelta(seconds=rng.randint(0, joined_within_days * 86400))
+                user = User(id=_uuid(rng), user_id=user_id, email=f"{user_id.lower()}@{EMAIL_DOMAIN}",
+                            role=role, password=self.password, created_at=joined)
+                status = _weighted(rng, PROFILE_STATUS)
+                city, state, pin = rng.choice(CITIES)
+                profiles.append(Profile(
+                    id=_uuid(rng), user=user, full_name=f"{first} {last}", mobile=f"{rng.randint(6, 9)}{rng.randint(0, 10**9 - 1):09d}",
+                    dob=(EPOCH - timedelta(days=rng.randint(21 * 365, 60 * 365))).date(),
+                    gender=rng.choice(["Male", "Female"]), marital_status=rng.choice(["Single", "Married"]),
+                    address=f"{rng.randint(1, 999)}, {rng.choice(LAST_NAMES)} Nagar, {city}",
+                    pancard_number=self.unique(self.pans, lambda: pan_number(rng, last)),
+                    aadhaar_number=self.unique(self.aadhaars, lambda: aadhaar_number(rng)),
+                    pincode=f"{pin}{rng.randint(0, 999):03d}", city=city, state=state,
+                    status=status, is_reviewed=status != "Hold",
+                ))
+                if role == "lender":
+                    details.append(LenderDetails(
+                        id=_uuid(rng), user=user, lender_type=rng.choice(LENDER_TYPES), bank_firm_name=rng.choice(BANKS),
+                        dsa_code=f"DSA{rng.randint(10000, 99999)}", branch_name=city, designation="Relationship Manager",
+                        created_at=joined,
+                    ))
+                else:
+                    salaried = rng.random() < 0.6
+                    details.append(ApplicantDetails(
+                        id=_uuid(rng), user=user, employment_type="Salaried" if salaried else "Self Employed",
+                        job_type="Private" if salaried else None, cibil_score=max(300, min(900, round(rng.gauss(715, 65)))),
+                        current_salary=Decimal(rng.randrange(20000, 300000, 500)) if salaried else None,
+                        total_turnover=None if salaried else Decimal(rng.randrange(500000, 50000000, 10000)),
+                        total_emi=Decimal(rng.randrange(0, 40000, 500)), created_at=joined,
+                    ))
+                users.append(user)
+                created.append((user.pk, joined))
+            with transaction.atomic():
+                User.objects.bulk_create(users, batch_size=self.chunk_size)
+                Profile.objects.bulk_create(profiles, batch_size=self.chunk_size)
+                (LenderDetails if role == "lender" else ApplicantDetails).objects.bulk_create(details, batch_size=self.chunk_size)
+            self.log(f"   {role}s: {start + len(users)}/{count}")
+        return created
+
+    def loans(self, count, first_number, applicants, lenders):
+        rng, totals = self.rng, {"loans": 0, "decisions": 0, "payments": 0, "cibil_reports": 0}
+        end = EPOCH + timedelta(days=SPAN_DAYS)
+        lenders = sorted(lenders, key=lambda row: row[1])
+        lender_joined = [joined for _, joined in lenders]
+        for start in range(0, count, self.chunk_size):
+            loans, decisions, payments, reports = [], [], [], []
+            for number in range(first_number + start, first_number + min(start + self.chunk_size, count)):
+                applicant, joined = rng.choice(applicants)
+                filed = joined + (end - joined) * rng.random()
+                status = _weighted(rng, LOAN_STATUS)
+                loan = LoanRequest(
+                    id=_uuid(rng), loan_id=f"LSH{number}", applicant_id=applicant, created_at=filed,
+                    loan_type=_weighted(rng, LOAN_TYPES), status=status,
+                    amount_requested=Decimal(max(10_000, min(5_000_000, round(rng.lognormvariate(12.6, 0.8), -3)))),
+                    duration_months=rng.choice([12, 24, 36, 48, 60, 84, 120, 180, 240]),
+                    interest_rate=Decimal(f"{rng.uniform(8.5, 24):.2f}"),
+                    reason_for_loan=rng.choice(["Medical", "Wedding", "Home renovation", "Working capital", "Travel", "Education"]),
+                )
+                # Lenders who had joined by then; a handful act on each loan
+                pool = bisect.bisect_right(lender_joined, filed)
+                acting = [lenders[i][0] for i in rng.sample(range(pool), min(pool, int(rng.expovariate(1 / 3))))]
+                counts, approvers = {"Approved": 0, "Rejected": 0, "Pending": 0}, []
+                for lender in acting:
+                    decided = filed + timedelta(minutes=rng.randint(5, 7 * 24 * 60))
+                    decision = _weighted(rng, DECISION_STATUS)
+                    counts[decision] += 1
+                    loan.last_activity = max(loan.last_activity or decided, decided)
+                    decisions.append(LoanLenderStatus(
+                        id=_uuid(rng), loan=loan, lender_id=lender, status=decision,
+                        remarks="Lender Reviewing" if decision == "Pending" else "", created_at=decided, updated_at=decided,
+                    ))
+                    if decision == "Approved":
+                        approvers.append(lender)
+                    if decision == "Approved" and rng.random() < 0.4:
+                        self.txn_seq += 1
+                        paid = _weighted(rng, PAYMENT_STATUS)
+                        at = decided + timedelta(minutes=rng.randint(1, 600))
+                        payments.append(PaymentTransaction(
+                            id=_uuid(rng), user_id=lender, loan_request=loan, amount=Decimal("49.00"),
+                            txn_id=f"order_syn{rng.getrandbits(40):010x}{self.txn_seq:x}", status=paid,
+                            created_at=at, updated_at=at,
+                        ))
+                        if paid == "Completed" and rng.random() < 0.5:
+                            reports.append(CibilReport(loan=loan, lender_id=lender, score=rng.randint(550, 880),
+                                                       created_at=at + timedelta(minutes=2)))
+                if status == "Accepted":
+                    if approvers:
+                        loan.accepted_lender_id = rng.choice(approvers)
+                    else:
+                        loan.status = "Pending"
+                loan.approved_count, loan.rejected_count, loan.pending_count = counts["Approved"], counts["Rejected"], counts["Pending"]
+                loans.append(loan)
+            with transaction.atomic(), _explicit_timestamps():
+                LoanRequest.objects.bulk_create(loans, batch_size=self.chunk_size)
+                LoanLenderStatus.objects.bulk_create(decisions, batch_size=self.chunk_size)
+                PaymentTransaction.objects.bulk_create(payments, batch_size=self.chunk_size)
+                CibilReport.objects.bulk_create(reports, batch_size=self.chunk_size)
+            for key, rows in zip(totals, (loans, decisions, payments, reports)):
+                totals[key] += len(rows)
+            self.log(f"   loans: {start + len(loans)}/{count}")
+        return totals
+
+
+def generate(applicants, lenders, loans, seed=42, password="Synthetic@123", chunk_size=5000, log=None):
+    """Create the dataset; returns row counts per kind."""
+    generator = _Generator(seed, password, chunk_size, log)
+    # Every range is checked before anything is written
+    first_lender = generator.claim_users("lender", lenders)
+    first_applicant = generator.claim_users("applicant", applicants)
+    first_loan = generator.claim_loans(loans) if applicants else None
+
+    # Lenders mostly join early, applicants throughout the year
+    lender_rows = generator.users("lender", lenders, first_lender, SPAN_DAYS // 4)
+    applicant_rows = generator.users("applicant", applicants, first_applicant, SPAN_DAYS)
+    totals = {"lenders": len(lender_rows), "applicants": len(applicant_rows)}
+    if loans and applicant_rows:
+        totals.update(generator.loans(loans, first_loan, applicant_rows, lender_rows))
+    return totals
+
+
+def purge():
+    """Delete every synthetic user; loans, decisions and payments cascade."""
+    return User.objects.filter(email__endswith=f"@{EMAIL_DOMAIN}").delete()[0]
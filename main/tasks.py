@@ -0,0 +1,55 @@
+"""
+Background tasks run by the job queue (main/jobs.py).
+
+Each task is a thin wrapper around the module that owns the work, so it
+can still be called directly (tests, management commands). Imports are
+deferred because those modules enqueue these tasks themselves.
+"""
+from django.conf import settings
+
+from main.jobs import task
+
+
+@task(max_attempts=3, timeout=120)
+def prerender_invoice(payment_pk):
+    from main.invoices import ensure_invoice_pdf
+    from main.models import PaymentTransaction
+
+    payment = PaymentTransaction.objects.select_related("user").filter(pk=payment_pk, status="Completed").first()
+    if payment:
+        ensure_invoice_pdf(payment)
+
+
+@task(max_attempts=1, timeout=60 * 60)
+def send_segment_email(segment, subject, body):
+    # Not retried: a second run would re-send to everyone already reached
+    from main.bulk_mail import send_to_segment
+
+    send_to_segment(segment, subject, body)
+
+
+@task(priority=-1)
+def process_webhooks():
+    from main.webhooks import process_pending, retry_delay
+
+    blocked = set()  # orders with a failed event: left for the retry run
+    while process_pending(blocked=blocked)[0]:
+        pass
+    if blocked:
+        # Nothing else runs this again until the next delivery. A separate key
+        # so that delivery still gets processed straight away.
+        process_webhooks.enqueue(key="process_webhooks:retry", delay=retry_delay())
+
+
+@task(max_attempts=2, timeout=10 * 60, every=settings.RECONCILE_PAYMENTS_EVERY or None)
+def reconcile_payments(**options):
+    from main.reconcile import reconcile_pending
+
+    reconcile_pending(**options)
+
+
+@task(max_attempts=1, timeout=5 * 60)
+def sync_mailbox():
+    from main.mail_sync import sync_mailbox as sync
+
+    sync()
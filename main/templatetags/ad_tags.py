@@ -1,5 +1,5 @@
 from django import template
-from main.models import PageAd
+from main.ads import ads_for
 
 register = template.Library()
 
@@ -11,8 +11,4 @@ def show_ads(context, position, page=None):
       {% show_ads "right" "loan_request" %}
       {% show_ads "bottom" %}
     """
-    qs = PageAd.objects.filter(position=position, is_active=True)
-    if page:
-        qs = qs.filter(page=page)
-
-    return {"ads": qs, "position": position}
+    return {"ads": ads_for(page or None, position), "position": position}
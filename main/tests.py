@@ -1,3 +1,1303 @@
-from django.test import TestCase
+import hashlib
+import hmac
+import json
+import multiprocessing
+import os
+import re
+import smtplib
+import tempfile
+import time
+import uuid
+import zipfile
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+import razorpay
+import requests
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.mail import send_mail
+from django.core.mail.backends.locmem import EmailBackend as LocMemBackend
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection, transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from main import ads, ids, invoices, webhooks
+from main.cache_backend import SQLiteCache
+from main.middleware.profile_check import SESSION_KEY as PROFILE_GATE
+from main.jobs import claim, run_job, schedule_periodic, task
+from main.models import (
+    ApplicantDetails, CibilReport, IdCounter, Job, LenderDetails, LoanLenderStatus, LoanRequest, MailboxMessage,
+    MailboxSyncState, OutboundEmail, PageAd, PaymentTransaction, Profile, RazorpayWebhookEvent, User,
+)
+from main.bulk_mail import send_to_segment
+from main.mail_backend import close_pooled_connections
+from main.mail_sync import MAILBOX_FOLDERS, refresh_if_stale, sync_mailbox
+from main.outbox import queue_email, send_pending
+from main.pagination import InvalidCursor, decode_cursor, encode_cursor
+from main.razorpay_client import get_client, latency_stats, reset_client, reset_latency_stats
+from main.razorpay_standin import RazorpayStandIn
+from main.synthetic import verhoeff_valid
+from main.tasks import process_webhooks, reconcile_payments
+from main.timing import RequestTimer
+from main.smtp_standin import SMTPStandIn
+from main.utils import send_email_otp
+from main.views import fan_out_to_lenders
+
+
+# -------------------- Keyset pagination --------------------
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser("admin@example.com", "x")
+        seed_marketplace(lenders=2, applicants=10, loans_each=3)
+        # Ties on the sort value must be broken by pk, never skipped or repeated
+        LoanRequest.objects.filter(pk__in=LoanRequest.objects.values("pk")[:12]).update(amount_requested=77777)
+
+    def walk(self, sort, limit=7):
+        url = reverse("dashboard_admin_data", args=["loans"])
+        seen, cursor = [], None
+        while True:
+            data = self.client.get(url, {"sort": sort, "limit": limit, **({"cursor": cursor} if cursor else {})}).json()
+            seen += [row["loan_id"] for row in data["rows"]]
+            cursor = data["next_cursor"]
+            if not cursor:
+                return seen
+
+    def test_pages_cover_every_row_once_in_order(self):
+        login_as(self.client, self.admin)
+        for sort in ("-created_at", "amount_requested", "-amount_requested"):
+            field = sort.lstrip("-")
+            expected = list(LoanRequest.objects.order_by(sort, "-pk" if sort.startswith("-") else "pk")
+                            .values_list("loan_id", flat=True))
+            self.assertEqual(self.walk(sort), expected, sort)
+            self.assertEqual(len(expected), 30, field)
+
+    def test_bad_cursors_are_rejected_with_400(self):
+        login_as(self.client, self.admin)
+        url = reverse("dashboard_admin_data", args=["loans"])
+        wrong_type = encode_cursor("-created_at", "not a date", "also not a uuid")
+        cases = [
+            ("-created_at", "%%%"),  # not base64 JSON
+            ("-created_at", encode_cursor("created_at", timezone.now(), self.admin.pk)),  # issued for another sort
+            ("-created_at", wrong_type),
+            ("-created_at", encode_cursor("-created_at", timezone.now(), "LSH12")),  # pk isn't a UUID
+            ("-amount_requested", encode_cursor("-amount_requested", [1], LoanRequest.objects.first().pk)),
+        ]
+        for sort, cursor in cases:
+            response = self.client.get(url, {"sort": sort, "cursor": cursor})
+            self.assertEqual(response.status_code, 400, cursor)
+            self.assertFalse(response.json()["ok"])
+        with self.assertRaises(InvalidCursor):
+            decode_cursor(wrong_type, "-created_at", LoanRequest)
+
+
+# -------------------- Lender fan-out --------------------
+def make_lenders(n, joined=None):
+    return User.objects.bulk_create(
+        User(email=f"fan{i}@example.com", role="lender", password="!", user_id=f"LSHL9{i:04d}",
+             created_at=joined or timezone.now() - timedelta(days=1))
+        for i in range(n)
+    )
+
+
+def make_loan(applicant, n=0):
+    return LoanRequest.objects.create(loan_id=f"LSH{3_000_000 + n}", applicant=applicant, amount_requested=100000,
+                                      duration_months=12, interest_rate=11)
+
+
+class LenderFanOutTests(TestCase):
+    def setUp(self):
+        self.applicant = User.objects.create_user("fan-applicant@example.com", "x", role="applicant")
+        make_lenders(5)
+
+    def test_bulk_fan_out_batches_inserts_and_counts_pending(self):
+        loan = make_loan(self.applicant)
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(fan_out_to_lenders(loan, batch_size=2), 5)
+        inserts = [q for q in ctx.captured_queries if q["sql"].startswith("INSERT")]
+        self.assertEqual(len(inserts), 3)  # ceil(5 / 2) multi-row INSERTs, not one per lender
+        self.assertEqual(LoanLenderStatus.objects.filter(loan=loan, status="Pending").count(), 5)
+        loan.refresh_from_db()
+        self.assertEqual(loan.pending_count, 5)
+
+    @override_settings(LAZY_LENDER_STATUSES=False)
+    def test_eager_submission_creates_a_row_per_lender(self):
+        login_as(self.client, self.applicant)
+        self.client.post(reverse("loan_request"), {"loan_type": "Personal", "amount_requested": "50000",
+                                                   "duration_months": "12", "interest_rate": "12"})
+        loan = LoanRequest.objects.get(applicant=self.applicant)
+        self.assertEqual((loan.lender_statuses.count(), loan.pending_count), (5, 5))
+
+    @override_settings(LAZY_LENDER_STATUSES=True)
+    def test_lazy_submission_creates_no_rows(self):
+        login_as(self.client, self.applicant)
+        self.client.post(reverse("loan_request"), {"loan_type": "Personal", "amount_requested": "50000",
+                                                   "duration_months": "12", "interest_rate": "12"})
+        loan = LoanRequest.objects.get(applicant=self.applicant)
+        self.assertEqual((loan.lender_statuses.count(), loan.pending_count), (0, 0))
+
+
+# -------------------- Implicit Pending rows --------------------
+class ImplicitPendingTests(TestCase):
+    def setUp(self):
+        self.applicant = User.objects.create_user("implicit-applicant@example.com", "x", role="applicant")
+        self.lenders = make_lenders(3)
+        self.loan = make_loan(self.applicant)
+
+    def status(self):
+        return LoanRequest.objects.with_applicant_status().get(pk=self.loan.pk).global_status
+
+    def test_untouched_lenders_count_as_pending(self):
+        self.assertEqual(self.status(), "Pending")
+        for lender in self.lenders[:2]:
+            self.loan.set_lender_status(lender, "Rejected")
+        self.assertEqual(self.status(), "Pending")  # the third lender hasn't looked yet
+        self.loan.set_lender_status(self.lenders[2], "Rejected")
+        self.assertEqual(self.status(), "Rejected")
+
+        # A lender who joined after submission is not in the loan's pool
+        User.objects.create_user("late-lender@example.com", "x", role="lender")
+        self.assertEqual(self.status(), "Rejected")
+        self.assertEqual(LoanLenderStatus.objects.filter(loan=self.loan).count(), 3)
+
+    def test_first_touch_creates_the_row(self):
+        lender = self.lenders[0]
+        Profile.objects.create(user=lender, full_name="L", pancard_number="ABCDE1234F", aadhaar_number="1" * 12,
+                               mobile="9999999999", status="Active", is_reviewed=True)
+        LenderDetails.objects.create(user=lender, bank_firm_name="Bank")
+        lender.refresh_from_db()
+        login_as(self.client, lender)
+        url = reverse("approve_loan", args=[self.loan.pk])
+        self.assertEqual(self.client.get(url).status_code, 405)
+        self.client.post(url)
+        row = LoanLenderStatus.objects.get(loan=self.loan, lender=lender)
+        self.assertEqual(row.status, "Approved")
+        self.assertEqual(self.status(), "Approved")
+
+    def test_lenders_only_act_on_loans_in_their_inbox(self):
+        late = User.objects.create_user("late-lender@example.com", "x", role="lender")
+        login_as(self.client, late)  # joined after self.loan was filed
+        self.assertEqual(self.client.post(reverse("approve_loan", args=[self.loan.pk])).status_code, 404)
+        self.assertEqual(self.client.post(reverse("reject_loan", args=[self.loan.pk]), {"reason": "x"}).status_code, 404)
+        self.assertFalse(LoanLenderStatus.objects.filter(lender=late).exists())
+
+
+class LenderInboxTests(TestCase):
+    def test_each_loan_resolves_to_one_dashboard_state(self):
+        applicant = User.objects.create_user("inbox-applicant@example.com", "x", role="applicant")
+        lender, other = make_lenders(2)
+        loans = {name: make_loan(applicant, n) for n, name in enumerate(
+            ["untouched", "rejected", "approved", "paid", "finalised", "closed", "before_joining"])}
+        LoanRequest.objects.filter(pk=loans["before_joining"].pk).update(created_at=timezone.now() - timedelta(days=30))
+        loans["rejected"].set_lender_status(lender, "Rejected")
+        loans["approved"].set_lender_status(lender, "Approved")
+        PaymentTransaction.objects.create(user=lender, loan_request=loans["paid"], txn_id="order_inbox", amount=49,
+                                          status="Completed")
+        LoanRequest.objects.filter(pk=loans["finalised"].pk).update(status="Accepted", accepted_lender=lender)
+        LoanRequest.objects.filter(pk=loans["closed"].pk).update(status="Accepted", accepted_lender=other)
+
+        rows = {row.pk: row for row in LoanRequest.objects.for_lender(lender)}
+        state = {name: rows[loan.pk].global_status for name, loan in loans.items() if loan.pk in rows}
+        self.assertEqual(state, {
+            "untouched": "Pending", "rejected": "Rejected", "approved": "Approved", "paid": "Approved",
+            "finalised": "Finalised", "closed": "Closed",
+        })  # a loan filed before the lender joined, never touched, isn't in the inbox
+        self.assertEqual(rows[loans["untouched"].pk].lender_status, "Pending")
+        self.assertEqual(rows[loans["paid"].pk].payment_txn, "order_inbox")
+
+        counts = LoanRequest.objects.for_lender(lender).dashboard_counts()
+        self.assertEqual((counts["total_loans"], counts["total_approved"], counts["total_rejected"],
+                          counts["total_pending"]), (6, 2, 1, 1))
+
+
+# -------------------- Loan status summary --------------------
+class LoanStatusSummaryTests(TestCase):
+    def summary(self, loan):
+        return LoanRequest.objects.values_list("approved_count", "rejected_count", "pending_count").get(pk=loan.pk)
+
+    def assertSummary(self, loan, expected):
+        self.assertEqual(self.summary(loan), expected)
+        # The incremental counters always agree with a rebuild from the rows
+        LoanRequest.objects.filter(pk=loan.pk).rebuild_status_summary()
+        self.assertEqual(self.summary(loan), expected)
+
+    def test_transitions_move_the_counters(self):
+        applicant = User.objects.create_user("summary-applicant@example.com", "x", role="applicant")
+        first, second = make_lenders(2)
+        loan = make_loan(applicant)
+
+        row, created = loan.set_lender_status(first, "Pending", remarks="Lender Reviewing")
+        self.assertTrue(created)
+        self.assertSummary(loan, (0, 0, 1))
+        row, created = loan.set_lender_status(first, "Approved", remarks="Looks good")
+        self.assertFalse(created)
+        self.assertEqual((row.status, row.remarks), ("Approved", "Looks good"))
+        self.assertSummary(loan, (1, 0, 0))
+        loan.set_lender_status(first, "Rejected")
+        self.assertSummary(loan, (0, 1, 0))
+        loan.set_lender_status(first, "Rejected")  # repeating a decision changes nothing
+        self.assertSummary(loan, (0, 1, 0))
+        loan.set_lender_status(second, "Approved")
+        self.assertSummary(loan, (1, 1, 0))
+
+        loan.refresh_from_db()
+        self.assertEqual(loan.last_activity, LoanLenderStatus.objects.get(loan=loan, lender=second).updated_at)
+
+    def test_rebuild_repairs_drifted_counters(self):
+        seed_marketplace(lenders=4, applicants=3, loans_each=2)
+        summaries = LoanRequest.objects.order_by("pk").values_list("approved_count", "rejected_count", "pending_count")
+        expected = list(summaries)
+        self.assertTrue(any(expected))
+        LoanRequest.objects.update(approved_count=9, rejected_count=9, pending_count=9)
+        LoanRequest.objects.rebuild_status_summary()
+        self.assertEqual(list(summaries), expected)
+
+        LoanRequest.objects.update(approved_count=9, rejected_count=9, pending_count=9)
+        out = StringIO()
+        call_command("rebuild_loan_summaries", "--batch-size", "2", stdout=out)
+        self.assertEqual(list(summaries), expected)
+        self.assertIn(f"for {len(expected)} loan(s)", out.getvalue())
+
+
+# -------------------- Profile gate --------------------
+class ProfileGateTests(TestCase):
+    def test_gate_is_cached_until_the_profile_changes(self):
+        user = User.objects.create_user("gate@example.com", "x", role="applicant")
+        self.client.force_login(user)
+        dashboard = reverse("dashboard_applicant")
+        self.assertRedirects(self.client.get(dashboard), reverse("profile_form", args=[user.pk]), fetch_redirect_response=False)
+
+        profile = Profile.objects.create(user=user, full_name="Gate User", pancard_number="ABCDE1234F",
+                                         aadhaar_number="234567890123", mobile="9876543210", status="Hold")
+        ApplicantDetails.objects.create(user=user, employment_type="Salaried")
+        self.assertRedirects(self.client.get(dashboard), reverse("review_profile"), fetch_redirect_response=False)
+
+        profile.is_reviewed, profile.status = True, "Active"
+        profile.save()
+        self.assertEqual(self.client.get(dashboard).status_code, 200)
+        user.refresh_from_db()
+        self.assertEqual(self.client.session[PROFILE_GATE], [str(user.pk), user.profile_version, True, False])
+
+        # Warm requests reuse the session copy
+        with mock.patch("main.middleware.profile_check.is_profile_complete") as check:
+            self.assertEqual(self.client.get(dashboard).status_code, 200)
+        check.assert_not_called()
+
+        # Any save to the details bumps profile_version and re-checks
+        ApplicantDetails.objects.filter(user=user).delete()
+        self.assertRedirects(self.client.get(dashboard), reverse("profile_form", args=[user.pk]), fetch_redirect_response=False)
+
+
+    def test_admin_approval_releases_the_review_gate(self):
+        user = User.objects.create_user("review@example.com", "x", role="applicant")
+        Profile.objects.create(user=user, full_name="Review User", pancard_number="ABCDE1234F",
+                               aadhaar_number="234567890123", mobile="9876543210", status="Hold")
+        ApplicantDetails.objects.create(user=user, employment_type="Salaried")
+        self.client.force_login(user)
+        dashboard = reverse("dashboard_applicant")
+        self.assertRedirects(self.client.get(dashboard), reverse("review_profile"), fetch_redirect_response=False)
+        version = User.objects.get(pk=user.pk).profile_version
+
+        admin = self.client_class()
+        admin.force_login(User.objects.create_superuser("boss@example.com", "x"))
+        response = admin.post(reverse("admin_user_action", args=[user.pk]), {"action": "accept"},
+                              HTTP_X_REQUESTED_WITH="XMLHttpRequest")
+        self.assertTrue(response.json()["ok"])
+
+        self.assertGreater(User.objects.get(pk=user.pk).profile_version, version)
+        self.assertEqual(self.client.get(dashboard).status_code, 200)
+
+
+# -------------------- Page ad cache --------------------
+class PageAdCacheTests(TestCase):
+    def test_snapshot_is_refreshed_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            PageAd.objects.create(page="login", title="Old", image="ads/old.png", position="left")
+        self.assertEqual([ad.title for ad in ads.ads_for("login", "left")], ["Old"])
+        version = cache.get(ads.VERSION_KEY)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            PageAd.objects.create(page="login", title="New", image="ads/new.png", position="left")
+            # Not committed yet: the version stays put so nobody caches these rows under it
+            self.assertEqual(cache.get(ads.VERSION_KEY), version)
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(len(ads.ads_for("login", "left")), 1)  # still the committed snapshot
+
+        callbacks[0]()
+        self.assertNotEqual(cache.get(ads.VERSION_KEY), version)
+        with self.assertNumQueries(1):
+            self.assertEqual([ad.title for ad in ads.ads_for("login", "left")], ["Old", "New"])
+        with self.assertNumQueries(0):
+            ads.ads_for("login")
+
+
+# -------------------- Invoice downloads --------------------
+@override_settings(INVOICE_PRERENDER=False)
+class InvoiceDownloadTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=self.media.name))
+        lender, _, _ = seed_marketplace(lenders=2, applicants=2, loans_each=2)
+        self.payment = PaymentTransaction.objects.create(user=lender, txn_id="order_etag", amount=49, status="Completed")
+        invoices.store_invoice_pdf(self.payment, b"%PDF-1.4 stored")
+        login_as(self.client, lender)
+        self.url = reverse("invoice") + "?txn_id=order_etag&download=1"
+
+    def test_completed_invoice_is_served_from_storage_then_304(self):
+        with mock.patch("main.views.render_invoice_pdf") as render:
+            response = self.client.get(self.url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(b"".join(response.streaming_content), b"%PDF-1.4 stored")
+            etag = response["ETag"]
+            self.assertEqual(etag, invoices.invoice_etag(self.payment))
+            self.assertIn("immutable", response["Cache-Control"])
+
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response["ETag"], etag)
+            self.assertIn("immutable", response["Cache-Control"])
+
+            # An ETag from an older template version is served in full
+            stale = self.client.get(self.url, HTTP_IF_NONE_MATCH='"order_etag-000000000000"')
+            self.assertEqual(stale.status_code, 200)
+            stale.close()
+        render.assert_not_called()
+
+
+class ExportInvoicesTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=self.media.name, INVOICE_PRERENDER=False, PDF_RENDER_WORKERS=1))
+
+    def test_archive_names_by_txn_id_and_skips_failed_renders(self):
+        from concurrent.futures import Future
+
+        lender = User.objects.create_user("invoices@example.com", "x", role="lender")
+        stored, fresh, broken = (
+            PaymentTransaction.objects.create(user=lender, txn_id=f"order_{prefix}SAMETAIL", amount=49, status="Completed")
+            for prefix in ("A", "B", "C")
+        )
+        invoices.store_invoice_pdf(stored, b"%PDF stored")
+
+        def submit(html):
+            future = Future()
+            if "order_CSAMETAIL" in html:
+                future.set_exception(OSError("wkhtmltopdf exited with 1"))
+            else:
+                future.set_result(b"%PDF fresh")
+            return future
+
+        output = os.path.join(self.media.name, "export.zip")
+        month = timezone.localtime().strftime("%Y-%m")
+        out, err = StringIO(), StringIO()
+        with mock.patch("main.management.commands.export_invoices.submit_pdf", side_effect=submit):
+            call_command("export_invoices", month=month, output=output, stdout=out, stderr=err)
+
+        with zipfile.ZipFile(output) as archive:
+            self.assertEqual(
+                sorted(archive.namelist()), [f"gst-summary-{month}.csv", "order_ASAMETAIL.pdf", "order_BSAMETAIL.pdf"]
+            )
+            self.assertEqual(archive.read("order_BSAMETAIL.pdf"), b"%PDF fresh")
+        self.assertTrue(default_storage.exists(invoices.invoice_pdf_name(fresh)))
+        self.assertFalse(default_storage.exists(invoices.invoice_pdf_name(broken)))
+        self.assertIn("order_CSAMETAIL", err.getvalue())
+        self.assertIn("1 failed to render", out.getvalue())
+
+
+# -------------------- Mailbox sync --------------------
+class FakeIMAP:
+    """Just the IMAP4 calls main.mail_sync makes, over in-memory folders."""
+
+    def __init__(self):
+        self.folders = {name: {"uidvalidity": 7, "messages": {}} for name in MAILBOX_FOLDERS.values()}
+        self.fetched = []
+        self.selected = None
+
+    def add(self, folder, uid, subject, seen=False, body="Hello there"):
+        header = (f"From: Asha <asha@example.com>\r\nTo: support@loansaathihub.in\r\nSubject: {subject}\r\n"
+                  "Date: Mon, 06 Jan 2025 10:00:00 +0530\r\nMessage-ID: <m{uid}@example.com>\r\n").encode()
+        self.folders[folder]["messages"][uid] = (b"\\Seen" if seen else b"", header, body.encode())
+
+    def login(self, user, password):
+        return "OK", [b"Logged in"]
+
+    def logout(self):
+        return "BYE", [b""]
+
+    def select(self, name, readonly=False):
+        self.selected = self.folders[name]
+        return "OK", [str(len(self.selected["messages"])).encode()]
+
+    def response(self, code):
+        return code, [str(self.selected["uidvalidity"]).encode()]
+
+    def uid(self, command, *args):
+        messages = self.selected["messages"]
+        if command == "SEARCH":
+            low = int(args[1].split()[1].split(":")[0])
+            # Like a real server, `n:*` always includes the newest message
+            uids = sorted(u for u in messages if u >= low) or sorted(messages)[-1:]
+            return "OK", [" ".join(map(str, uids)).encode()]
+        uids = [int(u) for u in args[0].split(",")]
+        self.fetched += uids
+        data = []
+        for n, uid in enumerate(uids, 1):
+            flags, header, text = messages[uid]
+            data += [(f"{n} (UID {uid} FLAGS (".encode() + flags + f") BODY[HEADER] {{{len(header)}}}".encode(), header),
+                     (f" BODY[TEXT]<0> {{{len(text)}}}".encode(), text), b")"]
+        return "OK", data
+
+    def search(self, charset, criterion):
+        unseen = [str(n) for n, (flags, _, _) in enumerate(self.selected["messages"].values(), 1) if not flags]
+        return "OK", [" ".join(unseen).encode()]
+
+
+class MailboxSyncTests(TestCase):
+    def setUp(self):
+        self.imap = FakeIMAP()
+        self.imap.add("INBOX", 3, "Loan query", seen=True)
+        self.imap.add("INBOX", 5, "KYC documents", body="Please find my PAN attached")
+
+    def sync(self):
+        return sync_mailbox(["inbox"], connect=lambda: self.imap)
+
+    def test_incremental_uid_sync(self):
+        self.assertEqual(self.sync(), {"inbox": 2})
+        state = MailboxSyncState.objects.get(folder="inbox")
+        self.assertEqual((state.last_uid, state.uidvalidity, state.unread_count, state.last_error), (5, 7, 1, ""))
+        message = MailboxMessage.objects.get(folder="inbox", uid=5)
+        self.assertEqual((message.subject, message.is_seen), ("KYC documents", False))
+        self.assertEqual(message.snippet, "Please find my PAN attached")
+
+        # Only messages above the last seen UID are fetched again
+        self.imap.fetched.clear()
+        self.assertEqual(self.sync(), {"inbox": 0})
+        self.assertEqual(self.imap.fetched, [])
+        self.imap.add("INBOX", 9, "New lead")
+        self.assertEqual(self.sync(), {"inbox": 1})
+        self.assertEqual(self.imap.fetched, [9])
+        self.assertEqual(MailboxSyncState.objects.get(folder="inbox").last_uid, 9)
+
+        # A new UIDVALIDITY means the old UIDs are meaningless: start over
+        self.imap.folders["INBOX"]["uidvalidity"] = 8
+        self.imap.folders["INBOX"]["messages"] = {}
+        self.imap.add("INBOX", 1, "After migration")
+        self.sync()
+        self.assertEqual(list(MailboxMessage.objects.filter(folder="inbox").values_list("uid", flat=True)), [1])
+
+    def test_login_failure_is_recorded_not_raised(self):
+        def refuse():
+            raise OSError("connection refused")
+        self.assertEqual(sync_mailbox(["inbox"], connect=refuse), {})
+        self.assertIn("connection refused", MailboxSyncState.objects.get(folder="inbox").last_error)
+
+    def test_refresh_if_stale_queues_one_sync(self):
+        self.sync()
+        state = MailboxSyncState.objects.get(folder="inbox")
+        refresh_if_stale(state)
+        self.assertFalse(Job.objects.filter(key="sync_mailbox").exists())
+
+        state.last_synced_at = timezone.now() - timedelta(minutes=10)
+        refresh_if_stale(state)
+        refresh_if_stale(None)  # never synced
+        self.assertEqual(Job.objects.filter(key="sync_mailbox", status="Queued").count(), 1)
+
+
+# -------------------- Razorpay client --------------------
+class RazorpayClientTests(SimpleTestCase):
+    def setUp(self):
+        self.gateway = RazorpayStandIn().__enter__()
+        self.addCleanup(self.gateway.__exit__, None, None, None)
+        overrides = override_settings(
+            RAZORPAY_BASE_URL=self.gateway.url, RAZORPAY_KEY_ID="rzp_test_x", RAZORPAY_KEY_SECRET="secret",
+            RAZORPAY_RETRY_BACKOFF=0.01, RAZORPAY_MAX_RETRIES=2, RAZORPAY_READ_TIMEOUT=0.5,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        reset_client()
+        reset_latency_stats()
+        self.addCleanup(reset_client)
+
+    def test_client_is_shared_and_keeps_connections_alive(self):
+        self.assertIs(get_client(), get_client())
+        order = get_client().order.create({"amount": 4900, "currency": "INR"})
+        for _ in range(5):
+            self.assertEqual(get_client().order.fetch(order["id"])["status"], "created")
+        self.assertEqual(len(self.gateway.connections), 1)
+
+    def test_idempotent_calls_retry_through_server_errors(self):
+        order = get_client().order.create({"amount": 4900})
+        self.gateway.fail_next = 2
+        self.assertEqual(get_client().order.fetch(order["id"])["id"], order["id"])
+        stats = latency_stats()["GET /v1/orders/{id}"]
+        self.assertEqual((stats["calls"], stats["errors"], stats["retries"]), (1, 0, 2))
+
+    def test_order_creation_is_not_retried(self):
+        self.gateway.fail_next = 1
+        with self.assertRaises(razorpay.errors.ServerError):
+            get_client().order.create({"amount": 4900})
+        self.assertEqual(self.gateway.calls, [("POST", "/v1/orders")])
+        self.assertEqual(latency_stats()["POST /v1/orders"]["errors"], 1)
+
+    def test_read_timeout_gives_up_after_bounded_retries(self):
+        order = get_client().order.create({"amount": 4900})
+        self.gateway.delay = 1
+        with self.assertRaises(requests.exceptions.ReadTimeout):
+            get_client().order.fetch(order["id"])
+        self.assertEqual(self.gateway.calls.count(("GET", f"/v1/orders/{order['id']}")), 3)
+
+
+# -------------------- Razorpay webhooks --------------------
+class RazorpayWebhookTests(TestCase):
+    def setUp(self):
+        self.gateway = RazorpayStandIn().__enter__()
+        self.addCleanup(self.gateway.__exit__, None, None, None)
+        self.enterContext(override_settings(
+            RAZORPAY_BASE_URL=self.gateway.url, RAZORPAY_KEY_ID="rzp_test_x", RAZORPAY_KEY_SECRET="secret",
+            RAZORPAY_WEBHOOK_SECRET="whsec", RAZORPAY_RETRY_BACKOFF=0.01, INVOICE_PRERENDER=False,
+        ))
+        reset_client()
+        self.addCleanup(reset_client)
+
+        self.lender = User.objects.create_user("lender@example.com", "x", role="lender")
+        applicant = User.objects.create_user("applicant@example.com", "x", role="applicant")
+        self.loan = make_loan(applicant)
+        login_as(self.client, self.lender)
+
+    def initiate(self, loan_ref):
+        return self.client.post(reverse("initiate_payment"), {"amount": "49", "loan_id": loan_ref})
+
+    def deliver(self, event, order_id, payment_id):
+        body = json.dumps({
+            "event": event, "created_at": int(time.time()),
+            "payload": {"payment": {"entity": {"id": payment_id, "order_id": order_id}}},
+        }).encode()
+        signature = hmac.new(b"whsec", body, hashlib.sha256).hexdigest()
+        return self.client.post(reverse("razorpay_webhook"), body, content_type="application/json",
+                                HTTP_X_RAZORPAY_SIGNATURE=signature, HTTP_X_RAZORPAY_EVENT_ID=f"evt_{payment_id}")
+
+    def test_webhook_alone_settles_the_loan(self):
+        order_id = self.initiate(str(self.loan.pk)).json()["order_id"]
+        payment = PaymentTransaction.objects.get(txn_id=order_id)
+        self.assertEqual(payment.loan_request, self.loan)
+        self.assertEqual(self.gateway.orders[order_id]["notes"], {"loan_id": self.loan.loan_id})
+
+        # The lender closes the tab: no browser callback, only Razorpay's webhook
+        captured = self.gateway.pay(order_id)
+        self.assertEqual(self.deliver("payment.captured", order_id, captured["id"]).status_code, 200)
+        process_webhooks()
+
+        payment.refresh_from_db()
+        self.loan.refresh_from_db()
+        self.assertEqual(payment.status, "Completed")
+        self.assertEqual((self.loan.status, self.loan.accepted_lender), ("Accepted", self.lender))
+        self.assertEqual(self.loan.lender_statuses.get(lender=self.lender).status, "Approved")
+
+    def test_failed_event_is_retried_later(self):
+        order_id = self.initiate(str(self.loan.pk)).json()["order_id"]
+        other_id = self.initiate(str(self.loan.pk)).json()["order_id"]
+        self.deliver("payment.captured", order_id, self.gateway.pay(order_id)["id"])
+        self.deliver("payment.captured", other_id, self.gateway.pay(other_id)["id"])
+        Job.objects.all().delete()  # the deliveries' own run
+
+        real_apply = webhooks.apply_payment_status
+        outage = {"on": True}
+
+        def flaky(payment, *args, **kwargs):
+            if outage["on"] and payment.txn_id == order_id:
+                raise OperationalError("database is locked")
+            return real_apply(payment, *args, **kwargs)
+
+        with mock.patch("main.webhooks.apply_payment_status", side_effect=flaky):
+            process_webhooks()
+            # The other order's event applied; the failed one waited instead of being retried in the same run
+            event = RazorpayWebhookEvent.objects.get(payload__payload__payment__entity__order_id=order_id)
+            self.assertEqual((event.attempts, event.processed_at), (1, None))
+            self.assertEqual(RazorpayWebhookEvent.objects.filter(processed_at__isnull=False).count(), 1)
+            retry = Job.objects.get(key="process_webhooks:retry", status="Queued")
+            self.assertGreater(retry.run_at, timezone.now() + timedelta(seconds=webhooks.RETRY_BACKOFF - 5))
+
+            outage["on"] = False
+            Job.objects.filter(pk=retry.pk).update(run_at=timezone.now())
+            self.assertEqual(run_job(claim("test", 1)[0]), "Done")
+
+        event.refresh_from_db()
+        self.assertEqual(event.attempts, 2)
+        self.assertIsNotNone(event.processed_at)
+        self.assertFalse(Job.objects.filter(status="Queued").exists())
+        self.assertEqual(PaymentTransaction.objects.get(txn_id=order_id).status, "Completed")
+
+    def test_payload_must_be_a_json_object(self):
+        for body in (b"[]", b'"x"', b"not json"):
+            signature = hmac.new(b"whsec", body, hashlib.sha256).hexdigest()
+            response = self.client.post(reverse("razorpay_webhook"), body, content_type="application/json",
+                                        HTTP_X_RAZORPAY_SIGNATURE=signature)
+            self.assertEqual(response.status_code, 400, body)
+        self.assertFalse(RazorpayWebhookEvent.objects.exists())
+
+    def test_initiate_checks_the_posted_loan(self):
+        self.assertEqual(self.initiate(self.loan.loan_id).status_code, 200)  # public id works too
+        self.assertEqual(self.initiate("LSH404").status_code, 404)
+        self.assertEqual(self.initiate(str(uuid.uuid4())).status_code, 404)
+
+        # Loans filed before the lender joined aren't on their dashboard
+        LoanRequest.objects.filter(pk=self.loan.pk).update(created_at=self.lender.created_at - timedelta(days=1))
+        self.assertEqual(self.initiate(self.loan.loan_id).status_code, 404)
+        self.assertEqual(PaymentTransaction.objects.count(), 1)
+
+
+# -------------------- Payment reconciliation --------------------
+class ReconcilePaymentsTests(TestCase):
+    def setUp(self):
+        self.gateway = RazorpayStandIn().__enter__()
+        self.addCleanup(self.gateway.__exit__, None, None, None)
+        overrides = override_settings(
+            RAZORPAY_BASE_URL=self.gateway.url, RAZORPAY_KEY_ID="rzp_test_x", RAZORPAY_KEY_SECRET="secret",
+            RAZORPAY_RETRY_BACKOFF=0.01,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        reset_client()
+        self.addCleanup(reset_client)
+
+        self.lender = User.objects.create_user("lender@example.com", "x", role="lender")
+        applicant = User.objects.create_user("applicant@example.com", "x", role="applicant")
+        self.loan = LoanRequest.objects.create(
+            loan_id="LSHLOAN0001", applicant=applicant, amount_requested=50000,
+            duration_months=12, interest_rate=12,
+        )
+
+    def payment(self, age):
+        order = get_client().order.create({"amount": 4900, "currency": "INR"})
+        payment = PaymentTransaction.objects.create(user=self.lender, txn_id=order["id"], amount=49)
+        PaymentTransaction.objects.filter(pk=payment.pk).update(created_at=timezone.now() - age)
+        return payment
+
+    def reconcile(self, *args):
+        out = StringIO()
+        call_command("reconcile_payments", "--batch-size", "2", *args, stdout=out)
+        return out.getvalue()
+
+    def status(self, payment):
+        return PaymentTransaction.objects.get(pk=payment.pk).status
+
+    def initiated(self, age):
+        """A payment started from the lender dashboard's button for self.loan."""
+        login_as(self.client, self.lender)
+        order_id = self.client.post(reverse("initiate_payment"), {"loan_id": str(self.loan.pk)}).json()["order_id"]
+        payment = PaymentTransaction.objects.get(txn_id=order_id)
+        PaymentTransaction.objects.filter(pk=payment.pk).update(created_at=timezone.now() - age)
+        return payment
+
+    def test_settles_old_pending_payments_from_gateway_state(self):
+        captured = self.initiated(timedelta(hours=1))
+        self.assertEqual(captured.loan_request, self.loan)
+        self.gateway.pay(captured.txn_id)
+        declined = self.payment(timedelta(hours=1))
+        self.gateway.pay(declined.txn_id, status="failed")
+        abandoned = self.payment(timedelta(days=2))
+        in_checkout = self.payment(timedelta(hours=1))
+        too_recent = self.payment(timedelta(minutes=2))
+        self.gateway.pay(too_recent.txn_id)
+
+        output = self.reconcile()
+
+        self.assertEqual(self.status(captured), "Completed")
+        self.assertEqual(self.status(declined), "Pending")  # customer may still retry the order
+        self.assertEqual(self.status(abandoned), "Failed")
+        self.assertEqual(self.status(in_checkout), "Pending")
+        self.assertEqual(self.status(too_recent), "Pending")
+        self.assertIn("Scanned 4 in 2 batch(es)", output)
+        self.assertIn("1 completed, 1 failed, 2 still pending, 0 error(s)", output)
+
+        self.loan.refresh_from_db()
+        self.assertEqual((self.loan.status, self.loan.accepted_lender), ("Accepted", self.lender))
+        self.assertEqual(self.loan.lender_statuses.get(lender=self.lender).status, "Approved")
+
+    def test_dry_run_and_gateway_errors_write_nothing(self):
+        captured = self.payment(timedelta(hours=1))
+        self.gateway.pay(captured.txn_id)
+        self.assertIn("1 completed", self.reconcile("--dry-run"))
+        self.assertEqual(self.status(captured), "Pending")
+
+        self.gateway.fail_next = 10
+        self.assertIn("1 error(s)", self.reconcile())
+        self.assertEqual(self.status(captured), "Pending")
+
+    def test_payment_success_page_checks_the_gateway(self):
+        payment = self.payment(timedelta(0))
+        self.client.force_login(self.lender)
+        session = self.client.session
+        session[PROFILE_GATE] = [str(self.lender.pk), self.lender.profile_version, True, False]
+        session.save()
+        url = f"/payment/success/?txn_id={payment.txn_id}"
+
+        response = self.client.get(url)
+        self.assertEqual(response.context["status"], "Pending")
+        self.assertEqual(self.status(payment), "Pending")
+
+        self.gateway.pay(payment.txn_id)
+        response = self.client.get(url)
+        self.assertEqual(response.context["status"], "Completed")
+        self.assertEqual(self.status(payment), "Completed")
+
+
+# -------------------- Email outbox --------------------
+class CountingBackend(LocMemBackend):
+    """locmem backend that counts connections and can refuse a recipient."""
+    connections = 0
+    refuse = set()
+
+    def __init__(self, *args, **kwargs):
+        CountingBackend.connections += 1
+        super().__init__(*args, **kwargs)
+
+    def send_messages(self, messages):
+        if any(set(m.to) & self.refuse for m in messages):
+            raise ConnectionResetError("SMTP session dropped")
+        return super().send_messages(messages)
+
+
+@override_settings(EMAIL_BACKEND="main.tests.CountingBackend", EMAIL_OUTBOX_IN_PROCESS=False)
+class OutboxTests(TestCase):
+    def setUp(self):
+        CountingBackend.connections, CountingBackend.refuse = 0, set()
+
+    def test_otp_jumps_the_queue_and_batch_shares_a_connection(self):
+        for n in range(3):
+            queue_email("support", f"[Support] {n}", "help", ["support@example.com"])
+        self.assertTrue(send_email_otp("new@example.com")["ok"])
+        self.assertEqual(mail.outbox, [])  # nothing is sent inside the request
+
+        report = send_pending(batch_size=10)
+
+        self.assertEqual(report["sent"], 4)
+        self.assertEqual(mail.outbox[0].subject, "Loan Saathi Hub OTP Verification")
+        self.assertEqual(CountingBackend.connections, 1)
+        self.assertFalse(OutboundEmail.objects.exclude(status="Sent").exists())
+        self.assertEqual(send_pending()["sent"], 0)
+
+    def test_failures_back_off_and_eventually_give_up(self):
+        CountingBackend.refuse = {"bounce@example.com"}
+        bad = queue_email("support", "bad", "x", ["bounce@example.com"])
+        queue_email("support", "good", "x", ["ok@example.com"])
+
+        report = send_pending()
+        self.assertEqual((report["sent"], report["retrying"]), (1, 1))
+        bad.refresh_from_db()
+        self.assertEqual((bad.status, bad.attempts), ("Queued", 1))
+        self.assertGreater(bad.next_attempt_at, timezone.now())
+        self.assertEqual(send_pending()["retrying"], 0)  # not due yet
+
+        OutboundEmail.objects.filter(pk=bad.pk).update(attempts=5, next_attempt_at=timezone.now())
+        self.assertEqual(send_pending()["failed"], 1)
+        bad.refresh_from_db()
+        self.assertEqual(bad.status, "Failed")
+
+
+# -------------------- Pooled SMTP backend --------------------
+class PooledEmailBackendTests(TestCase):
+    def setUp(self):
+        self.smtp = SMTPStandIn().__enter__()
+        self.addCleanup(self.smtp.__exit__, None, None, None)
+        overrides = override_settings(
+            EMAIL_BACKEND="main.mail_backend.PooledEmailBackend", EMAIL_HOST="127.0.0.1", EMAIL_PORT=self.smtp.port,
+            EMAIL_USE_TLS=False, EMAIL_HOST_USER="", EMAIL_HOST_PASSWORD="",
+            EMAIL_POOL_SIZE=2, EMAIL_POOL_MAX_MESSAGES=100,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.addCleanup(close_pooled_connections)
+
+    def send(self, n):
+        for i in range(n):
+            send_mail(f"Hi {i}", "Body", "from@example.com", [f"user{i}@example.com"])
+
+    def test_send_mail_calls_share_one_connection(self):
+        self.send(5)
+        self.assertEqual((len(self.smtp.messages), self.smtp.connections), (5, 1))
+
+    def test_connections_are_recycled_and_replaced_after_a_drop(self):
+        with override_settings(EMAIL_POOL_MAX_MESSAGES=2):
+            self.send(5)
+        self.assertEqual(self.smtp.connections, 3)
+
+        self.smtp.drop_next = 1
+        with self.assertRaises(smtplib.SMTPServerDisconnected):
+            self.send(1)
+        self.send(2)  # the dead connection was retired, not handed out again
+        self.assertEqual(len(self.smtp.messages), 7)
+
+    def test_segment_bulk_send_reaches_each_member_separately(self):
+        for i in range(5):
+            User.objects.create_user(f"lender{i}@example.com", "x", role="lender", is_active=i != 4)
+        User.objects.create_user("applicant@example.com", "x", role="applicant")
+
+        self.assertEqual(send_to_segment("active_lenders", "News", "Hello", batch_size=2), (4, 0))
+        self.assertEqual(sorted(r for _, (r,), _ in self.smtp.messages),
+                         [f"lender{i}@example.com" for i in range(4)])
+        self.assertEqual(self.smtp.connections, 1)
+
+
+# -------------------- Job queue --------------------
+CALLS = []
+
+
+@task(name="tests.record", max_attempts=2, retry_backoff=60)
+def record_call(value, fail=False):
+    if fail:
+        raise RuntimeError("boom")
+    CALLS.append(value)
+
+
+@task(name="tests.tick", every=600)
+def tick():
+    CALLS.append("tick")
+
+
+@override_settings(JOBS_IN_PROCESS=False)
+class JobQueueTests(TestCase):
+    def setUp(self):
+        CALLS.clear()
+
+    def test_jobs_run_in_priority_order_and_record_timing(self):
+        record_call.delay("low")
+        record_call.enqueue(args=["high"], priority=-1)
+        record_call.enqueue(args=["later"], delay=3600)
+
+        jobs = claim("test", limit=10)
+        self.assertEqual([job.args for job in jobs], [["high"], ["low"]])
+        for job in jobs:
+            self.assertEqual(run_job(job), "Done")
+        self.assertEqual(CALLS, ["high", "low"])
+        self.assertFalse(Job.objects.filter(status="Done", duration_ms__isnull=True).exists())
+        self.assertEqual(claim("test", limit=10), [])  # "later" isn't due yet
+
+    def test_failures_retry_with_backoff_then_go_dead(self):
+        job = record_call.enqueue(args=["x"], kwargs={"fail": True})
+        self.assertEqual(run_job(claim("test", 1)[0]), "Queued")
+        job.refresh_from_db()
+        self.assertIn("RuntimeError: boom", job.last_error)
+        self.assertGreater(job.run_at, timezone.now())
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        self.assertEqual(run_job(claim("test", 1)[0]), "Dead")
+
+    def test_periodic_tasks_are_queued_once_per_slot(self):
+        # Pinned 300s into a slot (of tick's 600s and reconcile's 900s), so both calls share it
+        now = datetime.fromtimestamp((int(time.time()) // 1800) * 1800 + 300, dt_timezone.utc)
+        schedule_periodic(now)
+        schedule_periodic(now + timedelta(seconds=1))  # another worker, same slot
+        job = Job.objects.get(task="tests.tick")
+        self.assertEqual(job.run_at.timestamp() % 600, 0)
+        self.assertTrue(now < job.run_at <= now + timedelta(seconds=600))
+        self.assertEqual(Job.objects.filter(task=reconcile_payments.name).count(), int(bool(reconcile_payments.every)))
+
+        Job.objects.exclude(pk=job.pk).delete()  # reconcile's slot may already be due on the real clock
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        self.assertEqual(run_job(claim("test", 10)[0]), "Done")
+        self.assertEqual(CALLS, ["tick"])
+        schedule_periodic(job.run_at)
+        self.assertEqual(Job.objects.filter(task="tests.tick", status="Queued").get().run_at, job.run_at + timedelta(seconds=600))
+
+    def test_key_dedupes_and_expired_leases_are_reclaimed(self):
+        self.assertIsNotNone(record_call.enqueue(args=["a"], key="once"))
+        self.assertIsNone(record_call.enqueue(args=["b"], key="once"))
+
+        job = claim("crashed-worker", 1)[0]
+        self.assertEqual(claim("other", 1), [])
+        Job.objects.filter(pk=job.pk).update(locked_until=timezone.now() - timedelta(seconds=1))
+        reclaimed = claim("other", 1)[0]
+        self.assertEqual((reclaimed.pk, reclaimed.attempts), (job.pk, 2))
+
+    def test_concurrent_enqueues_of_a_key_insert_one_job(self):
+        record_call.enqueue(args=["first"], key="race")
+        # The second caller checked before the first committed
+        with mock.patch("django.db.models.query.QuerySet.exists", return_value=False):
+            self.assertIsNone(record_call.enqueue(args=["second"], key="race"))
+            self.assertIsNotNone(record_call.enqueue(args=["keyless"]))
+        self.assertEqual(Job.objects.filter(key="race").count(), 1)
+
+    def test_failed_job_is_not_requeued_over_a_newer_one(self):
+        job = record_call.enqueue(args=["x"], kwargs={"fail": True}, key="same")
+        running = claim("test", 1)[0]
+        newer = record_call.enqueue(args=["y"], key="same")  # allowed: the first one is Running
+        self.assertIsNotNone(newer)
+
+        self.assertEqual(run_job(running), "Dead")
+        job.refresh_from_db()
+        self.assertIn("superseded", job.last_error)
+        self.assertEqual(Job.objects.get(key="same", status="Queued").pk, newer.pk)
+
+
+@override_settings(JOBS_IN_PROCESS=False)
+class RunWorkerTests(TransactionTestCase):
+    def test_burst_worker_drains_the_queue_concurrently(self):
+        CALLS.clear()
+        for n in range(6):
+            record_call.delay(n)
+        out = StringIO()
+        call_command("run_worker", "--concurrency", "3", "--burst", stdout=out)
+        self.assertEqual(sorted(CALLS), list(range(6)))
+        self.assertIn("tests.record: 6 runs, 0 failed", out.getvalue())
+
+
+# -------------------- Shared SQLite cache --------------------
+def _bump(location, times):
+    cache = SQLiteCache(location, {})
+    for _ in range(times):
+        if not cache.add("hits", 1, 60):
+            cache.incr("hits")
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.location = os.path.join(tmp.name, "cache.sqlite3")
+        self.cache = SQLiteCache(self.location, {"OPTIONS": {"MAX_ENTRIES": 3, "CULL_FREQUENCY": 0}})
+
+    def test_counter_is_exact_across_processes(self):
+        if "fork" not in multiprocessing.get_all_start_methods():
+            self.skipTest("needs fork")
+        ctx = multiprocessing.get_context("fork")
+        workers = [ctx.Process(target=_bump, args=(self.location, 50)) for _ in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(self.cache.get("hits"), 200)
+
+    def test_expired_keys_are_gone_and_can_be_added_again(self):
+        self.cache.set("otp", {"code": "123456"}, 0.05)
+        self.assertEqual(self.cache.get("otp"), {"code": "123456"})
+        self.assertFalse(self.cache.add("otp", "other"))
+        time.sleep(0.1)
+        self.assertIsNone(self.cache.get("otp"))
+        with self.assertRaises(ValueError):
+            self.cache.incr("otp")
+        self.assertTrue(self.cache.add("otp", "fresh"))
+        self.assertEqual(self.cache.get("otp"), "fresh")
+
+    def test_least_recently_used_keys_are_evicted(self):
+        for n, key in enumerate("abcd"):
+            self.cache.set(key, n)
+        self.cache._db().execute("UPDATE cache SET accessed = 0 WHERE key = ?", (self.cache.make_key("b"),))
+        self.cache._cull()
+        self.assertEqual(sorted(self.cache.get_many("abcd")), ["a", "c", "d"])
+
+
+# -------------------- ID allocation --------------------
+@override_settings(ID_BLOCK_SIZE=5)
+class IdAllocatorTests(TransactionTestCase):
+    def setUp(self):
+        ids._blocks_pid = None  # start every test as a fresh worker
+        IdCounter.objects.update_or_create(name="loan", defaults={"next_value": ids.LOAN_START})
+
+    def test_block_is_reserved_once_and_served_from_memory(self):
+        with self.assertNumQueries(4):  # BEGIN, UPDATE, SELECT, COMMIT
+            self.assertEqual(ids.next_loan_id(), "LSH1000000")
+        with self.assertNumQueries(0):
+            self.assertEqual([ids.next_loan_id() for _ in range(4)], [f"LSH100000{n}" for n in range(1, 5)])
+
+    def test_workers_get_disjoint_blocks(self):
+        first = [ids.allocate("test") for _ in range(3)]
+        ids._blocks_pid = None  # as if another process
+        second = [ids.allocate("test") for _ in range(3)]
+        self.assertEqual(first, [1, 2, 3])
+        self.assertEqual(second, [6, 7, 8])
+
+    def test_inside_a_transaction_ids_are_taken_one_at_a_time(self):
+        with transaction.atomic():
+            user = User.objects.create_user(email="a@example.com", password="x", role="applicant")
+            lender = User.objects.create_user(email="l@example.com", password="x", role="lender")
+        self.assertEqual((user.user_id, lender.user_id), ("LSHA0001", "LSHL0001"))
+        try:
+            with transaction.atomic():
+                ids.allocate("user:applicant")
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        # The rolled-back number is handed out again; it was never used
+        self.assertEqual(User.objects.create_user(email="b@example.com", password="x", role="applicant").user_id, "LSHA0002")
+
+
+# -------------------- Dashboard query plans --------------------
+def seed_marketplace(lenders=20, applicants=150, loans_each=4):
+    """
+    A marketplace at a realistic shape: applicants with several loans,
+    lenders who acted on some and paid for a few profiles. Returns one
+    lender, one applicant and a loan the lender paid for.
+    """
+    users, profiles = [], []
+    for n in range(lenders + applicants):
+        role = "lender" if n < lenders else "applicant"
+        user = User(email=f"{role}{n}@example.com", role=role, password="!", created_at=timezone.now() - timedelta(days=30),
+                    user_id=f"{'LSHL' if role == 'lender' else 'LSHA'}{n:05d}")
+        users.append(user)
+        profiles.append(Profile(user=user, full_name=f"User {n}", pancard_number=f"ABCDE{n:04d}F",
+                                aadhaar_number=f"{n:012d}", status="Active", is_reviewed=True))
+    User.objects.bulk_create(users)
+    Profile.objects.bulk_create(profiles)
+    lender_users, applicant_users = users[:lenders], users[lenders:]
+    ApplicantDetails.objects.bulk_create(ApplicantDetails(user=u, cibil_score=700) for u in applicant_users)
+    LenderDetails.objects.bulk_create(LenderDetails(user=u, bank_firm_name="Bank") for u in lender_users)
+
+    loans = LoanRequest.objects.bulk_create(
+        LoanRequest(loan_id=f"LSH{2_000_000 + n}", applicant=applicant_users[n % applicants],
+                    amount_requested=50000 + n, duration_months=12, interest_rate=12,
+                    status="Accepted" if n % 10 == 0 else "Pending",
+                    accepted_lender=lender_users[n % lenders] if n % 10 == 0 else None)
+        for n in range(applicants * loans_each)
+    )
+    LoanLenderStatus.objects.bulk_create(
+        LoanLenderStatus(loan=loan, lender=lender, status="Approved" if (n + i) % 3 else "Rejected")
+        for n, loan in enumerate(loans) for i, lender in enumerate(lender_users) if (n + i) % 4 == 0
+    )
+    PaymentTransaction.objects.bulk_create(
+        PaymentTransaction(user=lender_users[n % lenders], loan_request=loan, txn_id=f"order_{n}", amount=49,
+                           status="Completed" if n % 2 else "Pending")
+        for n, loan in enumerate(loans[::3])
+    )
+    LoanRequest.objects.rebuild_status_summary()
+    lender, paid = lender_users[1], loans[3]
+    LoanLenderStatus.objects.get_or_create(loan=paid, lender=lender, defaults={"status": "Approved"})
+    PaymentTransaction.objects.create(user=lender, loan_request=paid, txn_id="order_paid", amount=49, status="Completed")
+    return lender, applicant_users[0], paid
+
+
+def login_as(client, user):
+    client.force_login(user)
+    session = client.session
+    session[PROFILE_GATE] = [str(user.pk), user.profile_version, True, False]
+    session.save()
+
+
+class DashboardQueryPlanTests(TestCase):
+    """
+    Every filtered query a dashboard runs must be answered from an index.
+    Queries without a WHERE clause (the admin table counts and payment
+    totals) read the whole table by definition and are not checked.
+    """
+
+    # Tables whose filtered reads are allowed to scan, with the reason
+    UNINDEXED = {
+        "main_pagead": "a handful of admin-managed rows, read once per process by the ad snapshot (main/ads.py)",
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.lender, cls.applicant, cls.loan = seed_marketplace()
+        cls.admin = User.objects.create_superuser("admin@example.com", "x")
+
+    def full_scans(self, sql):
+        # Asked whether an index *can* serve each query, not whether the
+        # planner would pick it at this volume: SQLite has no statistics
+        # here, and Postgres is told to avoid sequential scans if it can.
+        with connection.cursor() as cursor:
+            if connection.vendor == "sqlite":
+                cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+                steps = [row[-1] for row in cursor.fetchall()]
+                return [s for s in steps if re.match(r"SCAN (?!CONSTANT ROW)", s) and " USING " not in s]
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute(f"EXPLAIN {sql}")
+            return [row[0].strip() for row in cursor.fetchall() if "Seq Scan" in row[0]]
+
+    def assertIndexed(self, user, url):
+        login_as(self.client, user)
+        with CaptureQueriesContext(connection) as captured:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        problems = []
+        for query in captured.captured_queries:
+            sql = query["sql"]
+            if any(f'FROM "{table}"' in sql for table in self.UNINDEXED):
+                continue
+            if sql.startswith("SELECT") and " WHERE " in sql and "django_session" not in sql:
+                problems += [f"{scan} in: {sql[:300]}" for scan in self.full_scans(sql)]
+        self.assertFalse(problems, "\n".join(problems))
+
+    def test_lender_dashboard(self):
+        self.assertIndexed(self.lender, reverse("dashboard_lender"))
+
+    def test_applicant_dashboard(self):
+        self.assertIndexed(self.applicant, reverse("dashboard_applicant"))
+
+    def test_view_and_partial_profile(self):
+        self.assertIndexed(self.lender, reverse("view_profile", args=[self.loan.pk]))
+        self.assertIndexed(self.lender, reverse("partial_profile", args=[self.loan.pk]))
+
+    def test_admin_dashboard_and_filtered_tabs(self):
+        self.assertIndexed(self.admin, reverse("dashboard_admin"))
+        self.assertIndexed(self.admin, reverse("dashboard_admin_data", args=["users"]) + "?status=Hold")
+        self.assertIndexed(self.admin, reverse("dashboard_admin_data", args=["loans"]) + "?status=Pending")
+        self.assertIndexed(self.admin, reverse("dashboard_admin_data", args=["payments"]) + "?status=Completed")
+
+
+# -------------------- Query budgets --------------------
+class QueryBudgetTests(TestCase):
+    """
+    Each view runs at most its budget of queries, and the same number at
+    both scales: a count that grows with the data is an N+1.
+    """
+
+    BUDGETS = {
+        "dashboard_admin": 13,
+        "dashboard_lender": 5,
+        "dashboard_applicant": 10,
+        "view_profile": 9,
+        "partial_profile": 9,
+    }
+    SCALES = {"small": (3, 10, 2), "large": (15, 60, 6)}  # lenders, applicants, loans each
+
+    def measure(self, lenders, applicants, loans_each):
+        counts = {}
+        with transaction.atomic():
+            lender, applicant, loan = seed_marketplace(lenders, applicants, loans_each)
+            admin = User.objects.create_superuser("admin@example.com", "x")
+            requests = {
+                "dashboard_admin": (admin, reverse("dashboard_admin")),
+                "dashboard_lender": (lender, reverse("dashboard_lender")),
+                "dashboard_applicant": (applicant, reverse("dashboard_applicant")),
+                "view_profile": (lender, reverse("view_profile", args=[loan.pk])),
+                "partial_profile": (lender, reverse("partial_profile", args=[loan.pk])),
+            }
+            for view, (user, url) in requests.items():
+                login_as(self.client, user)
+                self.client.get(url)  # warm per-process caches (ads, sessions)
+                with CaptureQueriesContext(connection) as captured:
+                    self.assertEqual(self.client.get(url).status_code, 200, view)
+                counts[view] = len(captured)
+            transaction.set_rollback(True)
+        return counts
+
+    def test_views_stay_within_a_constant_query_budget(self):
+        measured = {scale: self.measure(*shape) for scale, shape in self.SCALES.items()}
+        for view, budget in self.BUDGETS.items():
+            with self.subTest(view=view):
+                small, large = measured["small"][view], measured["large"][view]
+                self.assertEqual(small, large, f"{view}: {small} queries at small scale, {large} at large")
+                self.assertLessEqual(large, budget, f"{view} ran {large} queries, budget is {budget}")
+
+
+# -------------------- Synthetic data --------------------
+class SeedSyntheticTests(TransactionTestCase):
+    def seed(self, seed, *args):
+        call_command("seed_synthetic", "--users", "12", "--lenders", "4", "--loans", "40",
+                     "--seed", str(seed), "--chunk-size", "10", *args, stdout=StringIO())
+        snapshot = {
+            "users": list(User.objects.order_by("user_id").values_list("id", "user_id", "email")),
+            "profiles": list(Profile.objects.order_by("pancard_number").values_list(
+                "user__user_id", "pancard_number", "aadhaar_number", "status")),
+            "loans": list(LoanRequest.objects.order_by("loan_id").values_list(
+                "id", "loan_id", "applicant__user_id", "amount_requested", "status", "created_at",
+                "approved_count", "rejected_count", "pending_count")),
+            "decisions": LoanLenderStatus.objects.count(),
+            "payments": list(PaymentTransaction.objects.order_by("txn_id").values_list("txn_id", "status")),
+            "reports": CibilReport.objects.count(),
+        }
+        # The summary written by the generator matches a rebuild from the decision rows
+        LoanRequest.objects.rebuild_status_summary()
+        rebuilt = list(LoanRequest.objects.order_by("loan_id").values_list("approved_count", "rejected_count", "pending_count"))
+        self.assertEqual(rebuilt, [row[-3:] for row in snapshot["loans"]])
+        return snapshot
+
+    def test_generates_valid_rows_deterministically(self):
+        first = self.seed(7)
+        self.assertEqual(len(first["profiles"]), 16)
+        self.assertEqual(len(first["loans"]), 40)
+        self.assertGreater(first["decisions"], 0)
+        for _, pan, aadhaar, _ in first["profiles"]:
+            self.assertRegex(pan, r"^[A-Z]{5}[0-9]{4}[A-Z]$")
+            self.assertRegex(aadhaar, r"^[2-9][0-9]{11}$")
+            self.assertTrue(verhoeff_valid(aadhaar), aadhaar)
+
+        # Committed runs, with a purge in between: same keys, same emails
+        self.assertEqual(self.seed(7, "--purge"), first)
+        self.assertNotEqual(self.seed(8, "--purge")["loans"], first["loans"])
+
+    def test_numbers_stay_out_of_the_live_sequences(self):
+        self.seed(7)
+        self.assertEqual(IdCounter.objects.get(name="user:lender").next_value, 9_000_004)
+        self.assertEqual(IdCounter.objects.get(name="loan").next_value, 9_000_040)
+        self.assertEqual(ids.reserve_block("user:applicant", 1), 9_000_012)
+
+        with self.assertRaisesMessage(CommandError, "LSHL9000000 onwards"):
+            self.seed(7)  # the earlier run is still there
+        self.assertEqual(User.objects.count(), 16)
+
+
+# -------------------- End-to-end HTTP benchmark --------------------
+class BenchE2ETests(TransactionTestCase):
+    def test_journey_completes_and_writes_comparable_results(self):
+        path = os.path.join(tempfile.mkdtemp(), "e2e.json")
+        out = StringIO()
+        call_command("bench_e2e", "--journeys", "1", "--concurrency", "1", "--warmup", "0", "--lenders", "1",
+                     "--no-pdf", "--output", path, stdout=out)
+        with open(path) as f:
+            results = json.load(f)
+        self.assertEqual(results["summary"]["journeys_completed"], 1)
+        for name, row in results["steps"].items():
+            self.assertEqual((row["count"], row["errors"]), (1, 0), f"{name}: {row['first_error']}")
+            self.assertIsNotNone(row["queries"], name)
+        self.assertGreater(results["steps"]["payment_callback"]["queries"], 0)
+        self.assertEqual(PaymentTransaction.objects.count(), 0)  # run data is removed afterwards
+
+        call_command("bench_e2e", "--journeys", "1", "--warmup", "0", "--lenders", "1", "--no-pdf",
+                     "--output", path + ".2", "--compare", path, stdout=out)
+        self.assertIn("payment_callback", out.getvalue().rsplit("Δ against", 1)[1])
+
+
+# -------------------- Request timing --------------------
+@override_settings(REQUEST_TIMING=True, SLOW_REQUEST_MS=60_000, SLOW_REQUEST_TOP_SQL=3)
+class RequestTimingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser("admin@example.com", "x")
+        cls.lender, cls.applicant, cls.loan = seed_marketplace(lenders=3, applicants=5, loans_each=2)
+
+    def test_server_timing_header_for_staff_only(self):
+        login_as(self.client, self.admin)
+        response = self.client.get(reverse("dashboard_admin"))
+        metrics = {m.split(";")[0]: m for m in response["Server-Timing"].split(", ")}
+        self.assertEqual(set(metrics), {"total", "db", "template"})
+        queries = int(re.search(r'desc="(\d+) queries"', metrics["db"]).group(1))
+        self.assertGreater(queries, 0)
+        self.assertGreater(float(re.search(r"dur=([\d.]+)", metrics["template"]).group(1)), 0)
+
+        login_as(self.client, self.lender)
+        self.assertNotIn("Server-Timing", self.client.get(reverse("dashboard_lender")))
+        self.client.logout()
+        self.assertNotIn("Server-Timing", self.client.get("/"))
+
+    def test_slow_request_logged_with_slowest_sql(self):
+        login_as(self.client, self.applicant)
+        with override_settings(SLOW_REQUEST_MS=0), self.assertLogs("loan_saathi_hub.slow_requests", "WARNING") as logs:
+            self.client.get(reverse("dashboard_applicant"))
+        entry = json.loads(logs.records[0].args[0])
+        self.assertEqual((entry["path"], entry["status"], entry["user"]), ("/dashboard/applicant/", 200, self.applicant.user_id))
+        self.assertGreater(entry["queries"], 3)
+        self.assertEqual(len(entry["slowest_sql"]), 3)
+        self.assertEqual(entry["slowest_sql"], sorted(entry["slowest_sql"], key=lambda row: -row["ms"]))
+
+        with self.assertNoLogs("loan_saathi_hub.slow_requests"):
+            self.client.get(reverse("dashboard_applicant"))
+
+    def test_outbound_calls_are_charged_to_the_active_request_only(self):
+        with RazorpayStandIn() as gateway, override_settings(RAZORPAY_BASE_URL=gateway.url):
+            reset_client()
+            get_client().order.create({"amount": 4900, "currency": "INR"})  # no request: not recorded
+            with RequestTimer().activate() as timer:
+                get_client().order.create({"amount": 4900, "currency": "INR"})
+                User.objects.count()
+        reset_client()
+        self.assertEqual(set(timer.outbound), {"razorpay"})
+        self.assertGreater(timer.outbound["razorpay"], 0)
+        self.assertEqual(timer.queries, 1)
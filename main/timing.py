@@ -0,0 +1,147 @@
+"""
+Per-request timing: where a request's time went.
+
+``RequestTimingMiddleware`` (loan_saathi_hub/middleware.py) activates a
+``RequestTimer`` for each request. While it is active:
+
+* every SQL statement is timed through ``connection.execute_wrapper``
+  (count, total time, the N slowest statements),
+* top-level template renders are timed by ``TimedDjangoTemplates``
+  (the TEMPLATES backend); queries run while rendering count in both,
+* outbound calls report themselves with ``outbound(kind)`` /
+  ``record(kind, ms)``: Razorpay, SMTP, IMAP and wkhtmltopdf.
+
+The timer lives in a context variable, so work on other threads (the
+outbox sender, job workers, the PDF pool) is never charged to a request;
+outside a request ``outbound()`` and ``record()`` do nothing.
+"""
+import heapq
+import time
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.db import connections
+from django.template.backends.django import DjangoTemplates, Template
+
+_current = ContextVar("request_timer", default=None)
+
+
+class RequestTimer:
+    def __init__(self, top_sql=5):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_ms = 0.0
+        self.template_ms = 0.0
+        self.outbound = defaultdict(float)  # kind → ms
+        self.top_sql = top_sql
+        self._slowest = []  # min-heap of (ms, seq, sql)
+        self._rendering = 0
+
+    @property
+    def total_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def __call__(self, execute, sql, params, many, context):
+        """``execute_wrapper`` hook."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            ms = (time.perf_counter() - started) * 1000
+            self.queries += 1
+            self.db_ms += ms
+            if self.top_sql:
+                entry = (ms, self.queries, sql)
+                if len(self._slowest) < self.top_sql:
+                    heapq.heappush(self._slowest, entry)
+                else:
+                    heapq.heappushpop(self._slowest, entry)
+
+    @contextmanager
+    def activate(self):
+        token = _current.set(self)
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(self))
+                yield self
+        finally:
+            _current.reset(token)
+
+    def slowest_sql(self):
+        return [{"ms": round(ms, 2), "sql": sql} for ms, _, sql in sorted(self._slowest, reverse=True)]
+
+    def server_timing(self):
+        """``Server-Timing`` header value (durations in ms)."""
+        metrics = [
+            f"total;dur={self.total_ms:.1f}",
+            f'db;dur={self.db_ms:.1f};desc="{self.queries} queries"',
+            f"template;dur={self.template_ms:.1f}",
+        ]
+        metrics += [f"{kind};dur={ms:.1f}" for kind, ms in self.outbound.items()]
+        return ", ".join(metrics)
+
+
+def current():
+    """The active request's timer, or None."""
+    return _current.get()
+
+
+def record(kind, elapsed_ms):
+    timer = _current.get()
+    if timer is not None:
+        timer.outbound[kind] += elapsed_ms
+
+
+@contextmanager
+def outbound(kind):
+    """Charge the block's wall time to outbound ``kind`` (smtp, imap, razorpay, wkhtmltopdf)."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(kind, (time.perf_counter() - started) * 1000)
+
+
+class Timed:
+    """Proxy that charges every method call on ``target`` to outbound ``kind``."""
+
+    def __init__(self, target, kind):
+        self._target, self._kind = target, kind
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            with outbound(self._kind):
+                return attr(*args, **kwargs)
+
+        return call
+
+
+# -------------------- Templates --------------------
+class _TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        timer = _current.get()
+        if timer is None or timer._rendering:  # nested render_to_string: already counted
+            return super().render(context, request)
+        timer._rendering += 1
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            timer._rendering -= 1
+            timer.template_ms += (time.perf_counter() - started) * 1000
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, with render time charged to the request timer."""
+
+    def from_string(self, template_code):
+        return _TimedTemplate(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return _TimedTemplate(super().get_template(template_name).template, self)
@@ -3,9 +3,10 @@ import random
 import logging
 import warnings
 from django.conf import settings
-from django.core.mail import send_mail
 from dotenv import load_dotenv
-import razorpay
+
+from main.models import OutboundEmail
+from main.outbox import queue_email
 
 # -------------------- ENV + LOGGER SETUP --------------------
 load_dotenv()
@@ -18,67 +19,42 @@ warnings.filterwarnings("ignore", message="pkg_resources is deprecated")
 
 def get_razorpay_client():
     """
-    Return a configured Razorpay client.
-    This replaces the old PhonePe SDK client.
+    Return the shared, connection-pooled Razorpay client for this process
+    (see main/razorpay_client.py), or None if credentials are missing.
     """
-    try:
-        key_id = os.getenv("RAZORPAY_KEY_ID", getattr(settings, "RAZORPAY_KEY_ID", ""))
-        key_secret = os.getenv("RAZORPAY_KEY_SECRET", getattr(settings, "RAZORPAY_KEY_SECRET", ""))
-        if not key_id or not key_secret:
-            raise ValueError("Missing Razorpay API credentials.")
-        client = razorpay.Client(auth=(key_id, key_secret))
-        logger.info("✅ Razorpay client initialized successfully.")
-        return client
-    except Exception as e:
-        logger.error(f"❌ Failed to initialize Razorpay client: {e}")
+    from main.razorpay_client import get_client
+
+    if not settings.RAZORPAY_KEY_ID or not settings.RAZORPAY_KEY_SECRET:
+        logger.error("❌ Failed to initialize Razorpay client: Missing Razorpay API credentials.")
         return None
+    return get_client()
 
 
 # -------------------- EMAIL OTP SERVICE (Enhanced + Safe) --------------------
-import random
-import logging
-from django.core.mail import send_mail
-from django.conf import settings
-
-logger = logging.getLogger("main.utils")
-
 def send_email_otp(email: str) -> dict:
     """
-    Sends a 6-digit OTP to the given email.
-    ✅ Production: Uses Gmail SMTP (App Password required)
-    ✅ Local/Render fallback: Logs OTP if email fails (for testing)
-    
+    Queues a 6-digit OTP mail for the given email on the outbox's priority
+    lane (main/outbox.py); the request never waits on SMTP.
+
     Returns dict:
-        {"ok": True, "otp": "123456"}       ✅ success or fallback
-        {"ok": False, "error": "reason"}    ❌ unrecoverable failure
+        {"ok": True, "otp": "123456"}       ✅ queued
+        {"ok": False, "error": "reason"}    ❌ could not be queued
     """
     otp = str(random.randint(100000, 999999))
     subject = "Loan Saathi Hub OTP Verification"
     message = f"Your OTP for Loan Saathi Hub is {otp}. It will expire in 5 minutes."
 
     try:
-        send_mail(
-            subject=subject,
-            message=message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[email],
-            fail_silently=False,
-        )
-        logger.info(f"✅ OTP {otp} sent successfully to {email}")
-        return {"ok": True, "otp": otp}
-
+        queue_email("otp", subject, message, [email], priority=OutboundEmail.PRIORITY_OTP)
     except Exception as e:
-        error_msg = str(e)
-        logger.error(f"❌ OTP sending failed to {email}: {error_msg}")
-
-        # 🧩 Fallback for development or Render test environments
-        if settings.DEBUG or "render" in settings.ALLOWED_HOSTS or "localhost" in settings.ALLOWED_HOSTS:
-            logger.warning(f"⚠️ Fallback mode active — OTP {otp} generated but not emailed to {email}")
-            # Allow the flow to continue even if SMTP fails
-            return {"ok": True, "otp": otp, "fallback": True, "warning": error_msg}
-
-        # 🛑 In production (DEBUG=False), fail explicitly
-        return {"ok": False, "error": error_msg}
+        logger.error(f"❌ OTP could not be queued for {email}: {e}")
+        return {"ok": False, "error": str(e)}
+
+    logger.info(f"📨 OTP queued for {email}")
+    if settings.DEBUG:
+        # 🧩 Local testing without a working SMTP login
+        logger.warning(f"⚠️ DEBUG: OTP for {email} is {otp}")
+    return {"ok": True, "otp": otp}
 
 
 # -------------------- ID GENERATORS --------------------
@@ -1,25 +1,12 @@
-import pdfkit
-import shutil
-
-# Auto-detect wkhtmltopdf on Render or fallback
-WKHTML_PATH = shutil.which("wkhtmltopdf")
-if WKHTML_PATH:
-    pdfkit_config = pdfkit.configuration(wkhtmltopdf=WKHTML_PATH)
-else:
-    pdfkit_config = None
-
-
 import os
 import uuid
 import json
 import random
 import re
 import logging
-import smtplib
-import imaplib
-import email
 import requests
-from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+from datetime import datetime, timedelta
 from decimal import Decimal, InvalidOperation
 
 from django.conf import settings
@@ -31,20 +18,19 @@ from django.contrib.auth.decorators import login_required
 from django.contrib.auth.hashers import make_password
 from django.contrib.auth.tokens import default_token_generator
 from django.contrib.auth.forms import SetPasswordForm
-from django.core.mail import send_mail
 from django.db import transaction, models
-from django.db.models import Q
-from django.http import JsonResponse
+from django.db.models import Q, F, OuterRef, Subquery, Exists, Case, When, Value
+from django.core.files.storage import default_storage
+from django.core.mail import EmailMessage
+from django.http import JsonResponse, HttpResponse, HttpResponseNotModified, FileResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.urls import reverse
 from django.utils import timezone
-from django.utils.crypto import get_random_string
 from django.utils.dateparse import parse_date
 from django.utils.encoding import force_bytes
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.views.decorators.csrf import csrf_protect, csrf_exempt
 from django.views.decorators.http import require_POST, require_http_methods
-from email.mime.text import MIMEText
 from dotenv import load_dotenv
 import math
 import razorpay
@@ -59,10 +45,21 @@ from main.models import PaymentTransaction
 
 # ✅ Django app imports
 from main.utils import send_email_otp
+from main.pagination import keyset_page, InvalidCursor
+from main.mail_sync import cached_emails, refresh_if_stale as refresh_mailbox_if_stale
+from main.razorpay_client import get_client as get_razorpay_client
+from main.payments import apply_payment_status, gateway_status
+from main.outbox import queue_email
+from main.bulk_mail import SEGMENTS, segment_choices
+from main.tasks import send_segment_email, process_webhooks
+from main.webhooks import verify_signature as verify_webhook_signature, record_event as record_webhook_event
+from main.invoices import invoice_context, invoice_etag, ensure_invoice_pdf, render_invoice_pdf
+from main.ids import next_loan_id
 from main.models import (
     User, Profile, ApplicantDetails, LenderDetails,
     LoanRequest, LoanLenderStatus, PaymentTransaction,
-    SupportTicket, Complaint, Feedback, CibilReport, DeletedUserLog
+    SupportTicket, Complaint, Feedback, CibilReport, DeletedUserLog,
+    MailboxSyncState,
 )
 from main.forms import (
     ApplicantRegistrationForm, LenderRegistrationForm, LoginForm,
@@ -112,7 +109,7 @@ def is_profile_complete(user):
 
     # ✅ Applicant-specific completeness
     if user.role == "applicant":
-        details = getattr(user, "applicantdetails", None) or ApplicantDetails.objects.filter(user=user).first()
+        details = getattr(user, "applicant_details", None)
         if not details:
             return False
         if not any([
@@ -124,7 +121,7 @@ def is_profile_complete(user):
 
     # ✅ Lender-specific completeness
     elif user.role == "lender":
-        details = getattr(user, "lenderdetails", None) or LenderDetails.objects.filter(user=user).first()
+        details = getattr(user, "lender_details", None)
         if not details:
             return False
         if not any([
@@ -545,136 +542,245 @@ def admin_logout(request):
     return redirect("admin_login")
 
 # -------------------- Admin Dashboard --------------------
+ADMIN_PAGE_SIZE = 25
+ADMIN_MAX_PAGE_SIZE = 100
+
 @login_required
 def dashboard_admin(request):
     if not request.user.is_superuser:
         messages.error(request, "Admins only.")
         return redirect("index")
 
-    # ✅ Users / Applicants / Lenders / Loans / Payments
-    users_qs = User.objects.select_related("profile").all().order_by("-created_at")
-    applicants = ApplicantDetails.objects.select_related("user", "user__profile").all().order_by("-id")
-    lenders = LenderDetails.objects.select_related("user", "user__profile").all().order_by("-id")
-    loans = LoanRequest.objects.select_related("applicant", "accepted_lender").all().order_by("-created_at")
-    payments = (
-        PaymentTransaction.objects.select_related("user", "user__profile")
-        .all()
-        .order_by("-created_at")
-    )
-
-    # ✅ Decorated Users (with deleted log email fix)
-    decorated_users = []
-    for u in users_qs:
-        profile = getattr(u, "profile", None)
-        status = getattr(profile, "status", "No Profile") if profile else "No Profile"
-        delete_reason = getattr(profile, "delete_reason", None) if profile else None
-
-        # 🛠 Fix: Show actual email from DeletedUserLog (if deleted)
-        display_email = u.email
-        if status == "Deleted":
-            last_log = (
-                DeletedUserLog.objects.filter(mobile=getattr(profile, "mobile", None))
-                .order_by("-deleted_at")
-                .first()
-            )
-            if last_log and last_log.email:
-                display_email = last_log.email
-
-        decorated_users.append({
-            "obj": u,
-            "profile": profile,
-            "status": status,
-            "display_email": display_email,
-            "delete_reason": delete_reason or "No reason provided",
-            "can_delete": status not in ["Deleted", "No Profile"],
-        })
-
-    # ✅ Gmail Integration (Unread count + last 5 mails latest first)
-    mails, unread_count = [], 0
-    try:
-        import imaplib, email
-        from email.header import decode_header
-
-        mail = imaplib.IMAP4_SSL("imap.gmail.com")
-        mail.login(settings.EMAIL_HOST_USER, settings.EMAIL_HOST_PASSWORD)
-        mail.select("inbox")
-
-        # Count unread mails
-        status, response = mail.search(None, "UNSEEN")
-        if status == "OK" and response[0]:
-            unread_count = len(response[0].split())
-
-        # Fetch last 5 mails (latest first)
-        status, data = mail.search(None, "ALL")
-        if status == "OK" and data[0]:
-            ids = data[0].split()
-            for num in reversed(ids[-5:]):  # latest first
-                _, raw = mail.fetch(num, "(RFC822)")
-                msg = email.message_from_bytes(raw[0][1])
-
-                # Decode subject safely
-                subject, encoding = decode_header(msg.get("Subject"))[0]
-                if isinstance(subject, bytes):
-                    subject = subject.decode(encoding or "utf-8", errors="ignore")
-
-                # Extract snippet
-                snippet = ""
-                if msg.is_multipart():
-                    for part in msg.walk():
-                        ctype = part.get_content_type()
-                        disp = str(part.get("Content-Disposition"))
-                        if ctype == "text/plain" and "attachment" not in disp:
-                            snippet = part.get_payload(decode=True).decode(errors="ignore")[:120]
-                            break
-                        elif ctype == "text/html" and not snippet:
-                            snippet = part.get_payload(decode=True).decode(errors="ignore")[:120]
-                else:
-                    snippet = msg.get_payload(decode=True).decode(errors="ignore")[:120]
-
-                mails.append({
-                    "from": msg.get("From"),
-                    "to": msg.get("To"),
-                    "subject": subject,
-                    "date": msg.get("Date"),
-                    "snippet": snippet.strip(),
-                })
-
-        mail.logout()
-
-    except Exception as e:
-        logger.error(f"📧 Gmail fetch error: {e}")
-        mails = [{"from": "Error", "subject": "Email fetch failed", "date": "", "snippet": str(e)}]
+    # ✅ Table sizes only — rows are streamed page by page via dashboard_admin_data
+    counts = {
+        "users": User.objects.count(),
+        "applicants": ApplicantDetails.objects.count(),
+        "lenders": LenderDetails.objects.count(),
+        "deleted": DeletedUserLog.objects.count(),
+        "loans": LoanRequest.objects.count(),
+        "payments": PaymentTransaction.objects.count(),
+    }
 
-    # ✅ Razorpay-specific data (aggregated summary)
-    total_completed = payments.filter(status="Completed").count()
-    total_pending = payments.filter(status="Pending").count()
-    total_failed = payments.filter(status="Failed").count()
-    total_revenue = payments.filter(status="Completed").aggregate(
-        total=models.Sum("amount")
-    )["total"] or 0
+    # ✅ Gmail (read from the local mailbox cache, refreshed by the sync_mailbox job)
+    inbox_state = MailboxSyncState.objects.filter(folder="inbox").first()
+    refresh_mailbox_if_stale(inbox_state)
+    unread_count = inbox_state.unread_count if inbox_state else 0
+    mails = cached_emails("inbox", limit=5)
+
+    # ✅ Razorpay-specific data (aggregated summary, single query)
+    razorpay_summary = PaymentTransaction.objects.aggregate(
+        total_completed=models.Count("id", filter=Q(status="Completed")),
+        total_pending=models.Count("id", filter=Q(status="Pending")),
+        total_failed=models.Count("id", filter=Q(status="Failed")),
+        total_revenue=models.Sum("amount", filter=Q(status="Completed")),
+    )
+    razorpay_summary["total_revenue"] = razorpay_summary["total_revenue"] or 0
 
     # ✅ Context
     context = {
-        "users_dec": decorated_users,
-        "users": users_qs,
-        "applicants": applicants,
-        "lenders": lenders,
-        "loans": loans,
-        "payments": payments,
+        "counts": counts,
         "unread_mails_count": unread_count,
         "mails": mails,
-        "razorpay_summary": {
-            "total_completed": total_completed,
-            "total_pending": total_pending,
-            "total_failed": total_failed,
-            "total_revenue": total_revenue,
-        },
+        "mail_synced_at": inbox_state.last_synced_at if inbox_state else None,
+        "mail_sync_error": inbox_state.last_error if inbox_state else "",
+        "razorpay_summary": razorpay_summary,
+        "page_size": ADMIN_PAGE_SIZE,
     }
 
     # ✅ Final Render
     return render(request, "dashboard_admin.html", context)
 
 
+# -------------------- Admin Dashboard Data (paginated JSON per tab) --------------------
+def _fmt_dt(value):
+    return timezone.localtime(value).strftime("%d-%m-%Y %H:%M") if value else ""
+
+
+def _users_qs():
+    # Latest DeletedUserLog email per deleted user, resolved in the same query
+    # (the profile email is masked on delete, the log keeps the original).
+    latest_log_email = (
+        DeletedUserLog.objects.filter(mobile=OuterRef("profile__mobile"))
+        .order_by("-deleted_at")
+        .values("email")[:1]
+    )
+    return User.objects.select_related("profile").annotate(
+        deleted_log_email=Case(
+            When(profile__status="Deleted", then=Subquery(latest_log_email)),
+            default=Value(None),
+            output_field=models.EmailField(),
+        )
+    )
+
+
+def _user_row(u):
+    profile = getattr(u, "profile", None)
+    status = profile.status if profile else "No Profile"
+    display_email = u.deleted_log_email if status == "Deleted" and u.deleted_log_email else u.email
+
+    return {
+        "id": str(u.id),
+        "user_id": u.user_id,
+        "email": display_email,
+        "role": u.role,
+        "joined": _fmt_dt(u.created_at),
+        "status": status,
+        "delete_reason": (profile.delete_reason if profile else None) or "No reason provided",
+        "profile_url": reverse("admin_full_profile", args=[u.id]),
+    }
+
+
+def _details_row(d):
+    profile = getattr(d.user, "profile", None)
+    return {
+        "id": str(d.user.id),
+        "user_id": d.user.user_id,
+        "full_name": profile.full_name if profile else None,
+        "email": d.user.email,
+        "mobile": profile.mobile if profile else None,
+        "status": profile.status if profile else None,
+    }
+
+
+def _deleted_row(d):
+    return {
+        "email": d.email,
+        "mobile": d.mobile,
+        "pancard_number": d.pancard_number,
+        "aadhaar_number": d.aadhaar_number,
+        "reason": d.reason,
+        "deleted_at": _fmt_dt(d.deleted_at),
+    }
+
+
+def _loan_row(loan):
+    return {
+        "loan_id": loan.loan_id,
+        "loan_type": loan.loan_type,
+        "amount": str(loan.amount_requested),
+        "status": loan.status,
+        "created": _fmt_dt(loan.created_at),
+    }
+
+
+def _payment_row(p):
+    profile = getattr(p.user, "profile", None)
+    return {
+        "loan_id": p.loan_request.loan_id if p.loan_request else None,
+        "txn_id": p.txn_id,
+        "lender_name": profile.full_name if profile else None,
+        "email": p.user.email,
+        "mobile": profile.mobile if profile else None,
+        "amount": str(p.amount),
+        "payment_method": p.payment_method,
+        "status": p.status,
+    }
+
+
+# Each tab declares its base queryset, searchable columns, whitelisted
+# filters (query param -> lookup) and sorts. Sorts must be local,
+# non-null fields so they can be used as keyset cursors.
+ADMIN_TABS = {
+    "users": {
+        "qs": _users_qs,
+        "search": ["email", "user_id", "profile__full_name", "profile__mobile"],
+        "filters": {"role": "role", "status": "profile__status"},
+        "sorts": ["-created_at", "created_at", "email", "-email"],
+        "row": _user_row,
+    },
+    "applicants": {
+        "qs": lambda: ApplicantDetails.objects.select_related("user", "user__profile"),
+        "search": ["user__email", "user__user_id", "user__profile__full_name", "user__profile__mobile"],
+        "filters": {"status": "user__profile__status"},
+        "sorts": ["-created_at", "created_at"],
+        "row": _details_row,
+    },
+    "lenders": {
+        "qs": lambda: LenderDetails.objects.select_related("user", "user__profile"),
+        "search": ["user__email", "user__user_id", "user__profile__full_name", "user__profile__mobile", "bank_firm_name"],
+        "filters": {"status": "user__profile__status", "lender_type": "lender_type"},
+        "sorts": ["-created_at", "created_at"],
+        "row": _details_row,
+    },
+    "deleted": {
+        "qs": lambda: DeletedUserLog.objects.all(),
+        "search": ["email", "mobile", "pancard_number", "aadhaar_number"],
+        "filters": {},
+        "sorts": ["-deleted_at", "deleted_at"],
+        "row": _deleted_row,
+    },
+    "loans": {
+        "qs": lambda: LoanRequest.objects.all(),
+        "search": ["loan_id", "loan_type", "applicant__email"],
+        "filters": {"status": "status", "loan_type": "loan_type"},
+        "sorts": ["-created_at", "created_at", "-amount_requested", "amount_requested"],
+        "row": _loan_row,
+    },
+    "payments": {
+        "qs": lambda: PaymentTransaction.objects.select_related("user", "user__profile", "loan_request"),
+        "search": ["txn_id", "user__email", "loan_request__loan_id"],
+        "filters": {"status": "status", "payment_method": "payment_method"},
+        "sorts": ["-created_at", "created_at", "-amount", "amount"],
+        "row": _payment_row,
+    },
+}
+
+
+@login_required
+def dashboard_admin_data(request, tab):
+    """
+    One keyset-paginated page of an admin dashboard table.
+
+    Query params: ``q`` (search), any filter declared for the tab,
+    ``sort``, ``cursor`` (from the previous page) and ``limit``.
+    """
+    if not request.user.is_superuser:
+        return JsonResponse({"ok": False, "msg": "🚫 Access denied."}, status=403)
+
+    spec = ADMIN_TABS.get(tab)
+    if not spec:
+        return JsonResponse({"ok": False, "msg": "❌ Unknown tab."}, status=404)
+
+    qs = spec["qs"]()
+
+    q = (request.GET.get("q") or "").strip()
+    if q:
+        search = Q()
+        for field in spec["search"]:
+            search |= Q(**{f"{field}__icontains": q})
+        qs = qs.filter(search)
+
+    for param, lookup in spec["filters"].items():
+        value = (request.GET.get(param) or "").strip()
+        if not value:
+            continue
+        if param == "status" and value == "No Profile":
+            qs = qs.filter(**{lookup.replace("__status", "__isnull"): True})
+        else:
+            qs = qs.filter(**{lookup: value})
+
+    sort = request.GET.get("sort") or spec["sorts"][0]
+    if sort not in spec["sorts"]:
+        return JsonResponse({"ok": False, "msg": f"❌ Unsupported sort: {sort}"}, status=400)
+
+    try:
+        limit = min(max(int(request.GET.get("limit", ADMIN_PAGE_SIZE)), 1), ADMIN_MAX_PAGE_SIZE)
+    except ValueError:
+        limit = ADMIN_PAGE_SIZE
+
+    try:
+        rows, next_cursor = keyset_page(qs, sort, request.GET.get("cursor"), limit)
+    except InvalidCursor as e:
+        return JsonResponse({"ok": False, "msg": f"❌ {e}"}, status=400)
+
+    return JsonResponse({
+        "ok": True,
+        "rows": [spec["row"](obj) for obj in rows],
+        "next_cursor": next_cursor,
+        "has_more": next_cursor is not None,
+    })
+
+
 # -------------------- Admin View Profile --------------------
 from django.db.models import Q
 
@@ -754,7 +860,7 @@ def admin_user_action(request, user_id):
                     profile.is_reviewed = True
                     profile.save()
                 target.is_active = True
-                target.save()
+                target.save(update_fields=["is_active"])
                 msg = "✅ User approved"
 
             elif action == "deactivate":
@@ -795,7 +901,7 @@ def admin_user_action(request, user_id):
                 target.is_active = False
                 target.email = f"disabled+{target.id}@blocked.loansaathihub"
                 target.username = f"disabled_{target.id}"
-                target.save()
+                target.save(update_fields=["is_active", "email"])
 
                 if profile:
                     profile.status = "Deleted"
@@ -840,63 +946,59 @@ def dashboard_applicant(request):
     if profile and not profile.is_reviewed:
         return render(request, "review_profile.html", {"profile": profile})
 
+    # ✅ Per-loan status classified in SQL (see LoanRequestQuerySet)
     loans = (
         LoanRequest.objects.filter(applicant=request.user)
-        .prefetch_related("lender_statuses", "accepted_lender")
+        .with_applicant_status()
+        .select_related("accepted_lender__profile")
+        .prefetch_related("lender_statuses__lender__lender_details", "lender_statuses__lender__profile")
         .order_by("-created_at")
     )
-    today = date.today()
 
     for loan in loans:
-        statuses = list(loan.lender_statuses.all()) if hasattr(loan, "lender_statuses") else []
-        approved_lenders = [ls for ls in statuses if ls.status == "Approved"]
-        rejected_lenders = [ls for ls in statuses if ls.status == "Rejected"]
-
-        # 🧩 1️⃣: If applicant has manually accepted a lender (manual finalisation)
-        if loan.status == "Finalised" and loan.accepted_lender:
-            loan.global_status = "Finalised"
+        if loan.global_status == "Finalised":
             loan.global_remarks = f"✅ You finalised {loan.accepted_lender.profile.full_name or 'the lender'}."
-            continue
-
-        # 🧩 2️⃣: Lender(s) approved, but applicant hasn’t finalised yet
-        if approved_lenders and loan.status in ["Pending", "AutoApproved", "Accepted"]:
-            loan.global_status = "Approved"
-            loan.global_remarks = f"✅ {len(approved_lenders)} lender(s) approved your loan. Please review and choose one."
-            continue
-
-        # 🧩 3️⃣: No lender response yet
-        if not statuses or all(ls.status == "Pending" for ls in statuses):
-            loan.global_status = "Pending"
-            loan.global_remarks = "⌛ Awaiting lender responses."
-            continue
-
-        # 🧩 4️⃣: All lenders rejected
-        if len(rejected_lenders) == len(statuses):
-            loan.global_status = "Rejected"
+        elif loan.global_status == "Approved":
+            loan.global_remarks = f"✅ {loan.approved_count} lender(s) approved your loan. Please review and choose one."
+        elif loan.global_status == "Rejected":
             loan.global_remarks = "❌ All lenders rejected your loan."
-            continue
-
-        # 🧩 5️⃣: In review
-        loan.global_status = "Pending"
-        loan.global_remarks = "⌛ Lenders are reviewing your loan."
-
-    total_today = loans.filter(created_at__date=today).count()
-    total_approved = sum(1 for loan in loans if loan.global_status == "Approved")
-    total_rejected = sum(1 for loan in loans if loan.global_status == "Rejected")
-    total_pending = sum(1 for loan in loans if loan.global_status == "Pending")
+        elif loan.responded_count == 0:
+            loan.global_remarks = "⌛ Awaiting lender responses."
+        else:
+            loan.global_remarks = "⌛ Lenders are reviewing your loan."
 
+    # ✅ Every counter from a single aggregate query
+    recent_lender = (
+        LoanRequest.objects.filter(applicant=request.user, accepted_lender__isnull=False)
+        .order_by("-created_at")
+        .values_list("accepted_lender__lender_details__bank_firm_name", flat=True)
+        .first()
+    )
     context = {
         "loans": loans,
-        "total_today": total_today,
-        "total_approved": total_approved,
-        "total_rejected": total_rejected,
-        "total_pending": total_pending,
+        **loans.dashboard_counts(),
+        "recent_lender": recent_lender,
     }
     return render(request, "dashboard_applicant.html", context)
 
 
 
 # -------------------- Lender Dashboard --------------------
+def untouched_loans_for(lender):
+    """
+    Loans the lender has no LoanLenderStatus row for, i.e. implicitly
+    "Pending". Like the old eager fan-out, only loans submitted after the
+    lender joined are offered.
+    """
+    acted = LoanLenderStatus.objects.filter(loan=OuterRef("pk"), lender=lender)
+    return LoanRequest.objects.filter(created_at__gte=lender.created_at).exclude(Exists(acted))
+
+
+def lender_inbox(lender):
+    """Loans on the lender's dashboard; see LoanRequestQuerySet.for_lender()."""
+    return LoanRequest.objects.for_lender(lender).select_related("applicant", "applicant__profile")
+
+
 @login_required
 def dashboard_lender(request):
     user = request.user
@@ -906,79 +1008,26 @@ def dashboard_lender(request):
     if profile and not profile.is_reviewed:
         return render(request, "review_profile.html", {"profile": profile})
 
-    # ✅ Step 2: Fetch all feedbacks for this lender
-    lender_feedbacks = (
-        LoanLenderStatus.objects.filter(lender=user)
-        .select_related("loan", "loan__applicant")
-        .order_by("-updated_at")
-    )
-
-    # ✅ Step 3: Annotate each feedback with enhanced display logic
-    for fb in lender_feedbacks:
-        loan = fb.loan
-
-        # -------------------------
-        # 🌐 Unified Display Logic
-        # -------------------------
-        if loan.status == "Accepted" and loan.accepted_lender == user:
-            # Applicant finalised this lender
-            fb.display_status = "Finalised"
-            fb.loan.global_status = "Approved"
-
-        elif loan.status == "Accepted" and loan.accepted_lender != user:
-            # Applicant finalised another lender
-            fb.display_status = "Closed"
-            fb.loan.global_status = "Rejected"
-
-        elif loan.status == "Finalised":
-            # Loan completely closed off
-            fb.display_status = "Closed"
-            fb.loan.global_status = "Rejected"
-
-        elif fb.status == "Approved":
-            # Lender approved the request; awaiting applicant
-            fb.display_status = "Approved"
-            fb.loan.global_status = "Approved"
-
-        elif fb.status == "Rejected":
-            fb.display_status = "Rejected"
-            fb.loan.global_status = "Rejected"
-
-        else:
-            fb.display_status = "Pending"
-            fb.loan.global_status = "Pending"
-
-        # ✅ Step 3A: Payment check per loan
-        payment = (
-            PaymentTransaction.objects.filter(
-                user=user,
-                loan_request=loan,
-                status="Completed"
-            )
-            .order_by("-created_at")
-            .first()
+    # ✅ Step 2: One row per loan with the lender's status, payment and
+    #    display state resolved in SQL (implicit Pending when untouched)
+    inbox = lender_inbox(user)
+    lender_feedbacks = [
+        SimpleNamespace(
+            loan=loan,
+            display_status=loan.global_status,
+            payment_done=loan.payment_txn is not None,
+            payment_txn=loan.payment_txn,
         )
+        for loan in inbox.order_by("-activity_at")
+    ]
 
-        fb.payment_done = bool(payment)
-        fb.payment_txn = payment.txn_id if payment else None
-
-        # ✅ Step 3B: Mark Approved if payment done but still pending
-        if fb.payment_done and fb.display_status == "Pending":
-            fb.display_status = "Approved"
-            fb.loan.global_status = "Approved"
-
-    # ✅ Step 4: Dashboard counts (updated with new states)
-    today = timezone.now().date()
-    total_today = lender_feedbacks.filter(loan__created_at__date=today).count()
-    total_approved = sum(1 for fb in lender_feedbacks if fb.display_status == "Approved")
-    total_rejected = sum(1 for fb in lender_feedbacks if fb.display_status == "Rejected")
-    total_pending = sum(1 for fb in lender_feedbacks if fb.display_status == "Pending")
+    # ✅ Step 3: Dashboard counts in a single conditional aggregate
+    counts = inbox.dashboard_counts()
 
-    # ✅ Step 5: Pending and finalised loan sections
-    handled_loans = LoanLenderStatus.objects.filter(lender=user).values_list("loan_id", flat=True)
+    # ✅ Step 4: Pending and finalised loan sections
     pending_loans = (
-        LoanRequest.objects.filter(status="Pending", accepted_lender__isnull=True)
-        .exclude(id__in=handled_loans)
+        untouched_loans_for(user)
+        .filter(status="Pending", accepted_lender__isnull=True)
         .select_related("applicant")
         .order_by("-created_at")
     )
@@ -987,14 +1036,11 @@ def dashboard_lender(request):
         .select_related("applicant", "accepted_lender")
     )
 
-    # ✅ Step 6: Render everything
+    # ✅ Step 5: Render everything
     context = {
         "profile": profile,
         "lender_feedbacks": lender_feedbacks,
-        "total_today": total_today,
-        "total_approved": total_approved,
-        "total_rejected": total_rejected,
-        "total_pending": total_pending,
+        **counts,
         "pending_loans": pending_loans,
         "finalised_loans": finalised_loans,
     }
@@ -1008,7 +1054,7 @@ def dashboard_lender(request):
 def applicant_accept_loan(request, loan_id, lender_id):
     try:
         loan = get_object_or_404(LoanRequest, id=loan_id, applicant=request.user)
-        lender = get_object_or_404(User, id=lender_id, is_lender=True)
+        lender = get_object_or_404(User, id=lender_id, role="lender")
 
         # ✅ Ensure lender approved this loan
         if not LoanLenderStatus.objects.filter(loan=loan, lender=lender, status="Approved").exists():
@@ -1024,13 +1070,17 @@ def applicant_accept_loan(request, loan_id, lender_id):
                 "msg": f"You already finalised {loan.accepted_lender.profile.full_name or 'another lender'}."
             }, status=400)
 
-        # ✅ Finalise this loan manually
-        loan.accepted_lender = lender
-        loan.status = "Finalised"
-        loan.save(update_fields=["accepted_lender", "status"])
-
-        # ✅ Lock other lenders
-        LoanLenderStatus.objects.exclude(lender=lender).filter(loan=loan).update(status="Finalised")
+        with transaction.atomic():
+            # ✅ Finalise this loan manually
+            loan.accepted_lender = lender
+            loan.status = "Finalised"
+            loan.save(update_fields=["accepted_lender", "status"])
+
+            # ✅ Lock other lenders and refresh the loan's status summary
+            LoanLenderStatus.objects.exclude(lender=lender).filter(loan=loan).update(
+                status="Finalised", updated_at=timezone.now()
+            )
+            LoanRequest.objects.filter(pk=loan.pk).rebuild_status_summary()
 
         return JsonResponse({
             "ok": True,
@@ -1044,42 +1094,75 @@ def applicant_accept_loan(request, loan_id, lender_id):
 
 
 # -------------------- Loan Request --------------------
+LENDER_FANOUT_BATCH = 500
+
+def fan_out_to_lenders(loan, batch_size=LENDER_FANOUT_BATCH):
+    """
+    Create one Pending LoanLenderStatus per lender using batched multi-row
+    INSERTs (one round-trip per `batch_size` lenders instead of one each).
+    """
+    lender_ids = User.objects.filter(role="lender").values_list("id", flat=True)
+    statuses = [
+        LoanLenderStatus(loan=loan, lender_id=lender_id, status="Pending", remarks="Lender Reviewing")
+        for lender_id in lender_ids
+    ]
+    LoanLenderStatus.objects.bulk_create(statuses, batch_size=batch_size)
+    LoanRequest.objects.filter(pk=loan.pk).update(pending_count=F("pending_count") + len(statuses))
+    return len(statuses)
+
 @login_required
 def loan_request(request):
     if request.method=="POST" and request.user.role=="applicant":
-        loan_id="LSH"+get_random_string(6,allowed_chars="0123456789")
-        loan=LoanRequest.objects.create(
-            id=uuid.uuid4(),loan_id=loan_id,applicant=request.user,
-            loan_type=request.POST.get("loan_type") or "",
-            amount_requested=request.POST.get("amount_requested") or 0,
-            duration_months=request.POST.get("duration_months") or 0,
-            interest_rate=request.POST.get("interest_rate") or 0,
-            reason_for_loan=request.POST.get("reason_for_loan") or "",status="Pending")
-        for lender in User.objects.filter(role="lender"):
-            LoanLenderStatus.objects.create(loan=loan,lender=lender,status="Pending",remarks="Lender Reviewing")
+        loan_id=next_loan_id()  # allocated before the transaction so a reserved block survives rollback
+        with transaction.atomic():
+            loan=LoanRequest.objects.create(
+                id=uuid.uuid4(),loan_id=loan_id,applicant=request.user,
+                loan_type=request.POST.get("loan_type") or "",
+                amount_requested=request.POST.get("amount_requested") or 0,
+                duration_months=request.POST.get("duration_months") or 0,
+                interest_rate=request.POST.get("interest_rate") or 0,
+                reason_for_loan=request.POST.get("reason_for_loan") or "",status="Pending")
+            if not settings.LAZY_LENDER_STATUSES:
+                fan_out_to_lenders(loan)
         messages.success(request,f"✅ Loan {loan.loan_id} submitted.")
         return redirect("dashboard_router")
     return render(request,"loan_request.html")
 
 # -------------------- Lender Approve / Reject Loan --------------------
+# A lender with no LoanLenderStatus row for a loan is implicitly "Pending",
+# so acting on a loan creates the row on first touch.
+# Only loans on the lender's own dashboard (LoanRequest.objects.for_lender) can be acted on.
 @login_required
+@require_POST
 def reject_loan(request,loan_id):
-    if request.method=="POST":
-        reason=request.POST.get("reason")
-        loan=get_object_or_404(LoanRequest,id=loan_id)
-        lender_status=get_object_or_404(LoanLenderStatus,loan=loan,lender=request.user)
-        lender_status.status,lender_status.remarks="Rejected",reason; lender_status.save()
-        messages.warning(request,f"Loan {loan.loan_id} rejected: {reason}")
-        return redirect("dashboard_lender")
+    reason=request.POST.get("reason")
+    if request.user.role!="lender":
+        messages.error(request,"Only lenders can reject loans."); return redirect("dashboard_router")
+    loan=get_object_or_404(LoanRequest.objects.for_lender(request.user),id=loan_id)
+    loan.set_lender_status(request.user,"Rejected",remarks=reason)
+    messages.warning(request,f"Loan {loan.loan_id} rejected: {reason}")
+    return redirect("dashboard_lender")
 
 @login_required
+@require_POST
 def approve_loan(request,loan_id):
-    ls=get_object_or_404(LoanLenderStatus,loan__id=loan_id,lender=request.user)
-    ls.status,ls.remarks="Approved","Payment done, Loan Approved"; ls.save()
-    messages.success(request,f"Loan {ls.loan.loan_id} approved.")
+    if request.user.role!="lender":
+        messages.error(request,"Only lenders can approve loans."); return redirect("dashboard_router")
+    loan=get_object_or_404(LoanRequest.objects.for_lender(request.user),id=loan_id)
+    loan.set_lender_status(request.user,"Approved",remarks="Payment done, Loan Approved")
+    messages.success(request,f"Loan {loan.loan_id} approved.")
     return redirect("dashboard_lender")
 
 
+def _resolve_loan(ref, queryset=None):
+    """A loan by its UUID or its public loan_id (LSH…), or None."""
+    queryset = LoanRequest.objects.all() if queryset is None else queryset
+    try:
+        return queryset.filter(id=uuid.UUID(str(ref))).first()
+    except ValueError:
+        return queryset.filter(loan_id=ref).first()
+
+
 # ---------------------------------------------------------------------
 # ✅ Step 1: Initiate Razorpay Payment (₹49 fixed, includes 18% GST)
 # ---------------------------------------------------------------------
@@ -1100,22 +1183,33 @@ def initiate_payment(request):
             amount_paise = int(total_amount * 100)
             merchant_order_id = f"ORD-{user.id}-{uuid.uuid4().hex[:8].upper()}"
 
-            # ✅ Razorpay Client (LIVE keys loaded from Render environment)
-            client = razorpay.Client(auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET))
-            client.set_app_details({"title": "Loan Saathi Hub", "version": "1.0"})
+            # ✅ The loan being unlocked, linked now so the webhook and the
+            #    reconciliation job can settle it without the browser callback
+            loan = None
+            if request.POST.get("loan_id"):
+                loan = _resolve_loan(request.POST["loan_id"], LoanRequest.objects.for_lender(user))
+                if user.role != "lender" or loan is None:
+                    return JsonResponse({"ok": False, "error": "Loan not found."}, status=404)
+
+            # ✅ Shared pooled Razorpay client (LIVE keys loaded from Render environment)
+            client = get_razorpay_client()
 
             # ✅ Create order on Razorpay
-            order = client.order.create({
+            order_data = {
                 "amount": amount_paise,
                 "currency": "INR",
                 "receipt": merchant_order_id[:40],
                 "payment_capture": 1,
-            })
+            }
+            if loan:
+                order_data["notes"] = {"loan_id": loan.loan_id}
+            order = client.order.create(order_data)
 
             # ✅ Save order locally
             with transaction.atomic():
                 PaymentTransaction.objects.create(
                     user=user,
+                    loan_request=loan,
                     txn_id=order["id"],
                     amount=total_amount,
                     status="Pending",
@@ -1168,7 +1262,7 @@ def payment_callback(request):
             return JsonResponse({"ok": False, "error": "Incomplete payment data"}, status=400)
 
         # ✅ Verify Razorpay signature
-        client = razorpay.Client(auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET))
+        client = get_razorpay_client()
         verified = True
         try:
             client.utility.verify_payment_signature({
@@ -1187,49 +1281,16 @@ def payment_callback(request):
 
         # ✅ Attach correct loan reference if missing
         from main.models import LoanRequest, LoanLenderStatus
-        if loan_id:
-            # Handle both integer ID and loan_id string
-            loan = LoanRequest.objects.filter(Q(id=loan_id) | Q(loan_id=loan_id)).first()
-            if loan and not payment.loan_request:
+        if loan_id and not payment.loan_request_id:
+            # Orders created before loans were linked at initiate time
+            loan = _resolve_loan(loan_id)
+            if loan:
                 payment.loan_request = loan
                 payment.save(update_fields=["loan_request"])
                 logger.info(f"🔗 Linked payment {payment.txn_id} → Loan {loan.loan_id}")
 
-        # ✅ Update payment details
-        payment.status = "Completed" if verified else "Failed"
-        payment.raw_response = dict(data)
-        payment.updated_at = timezone.now()
-        payment.save(update_fields=["status", "raw_response", "updated_at"])
-
-        # ✅ If verified, sync dashboards (auto approve lender)
-        if verified and payment.loan_request:
-            loan = payment.loan_request
-            lender = payment.user
-
-            # 🔹 Mark loan as Accepted (for applicant dashboard)
-            if loan.accepted_lender != lender:
-                loan.accepted_lender = lender
-                loan.status = "Accepted"
-                loan.save(update_fields=["accepted_lender", "status"])
-                logger.info(f"📢 Loan {loan.loan_id} marked Accepted by applicant for {lender.email}")
-
-            # 🔹 Update lender feedback (for lender dashboard)
-            updated_rows = LoanLenderStatus.objects.filter(
-                lender=lender,
-                loan=loan
-            ).update(
-                status="Approved",
-                updated_at=timezone.now()
-            )
-
-            # ✅ If feedback didn’t exist, create one (failsafe)
-            if updated_rows == 0:
-                LoanLenderStatus.objects.create(
-                    lender=lender,
-                    loan=loan,
-                    status="Approved"
-                )
-                logger.info(f"🆕 Created lender feedback entry for {lender.email} → {loan.loan_id}")
+        # ✅ Update payment and, if verified, sync dashboards (auto approve lender)
+        apply_payment_status(payment, "Completed" if verified else "Failed", dict(data))
 
         logger.info(f"✅ Payment updated | TxnID={payment.txn_id} | Verified={verified}")
 
@@ -1243,6 +1304,28 @@ def payment_callback(request):
         logger.error(f"❌ Error during Razorpay callback: {e}", exc_info=True)
         return JsonResponse({"ok": False, "error": str(e)}, status=400)
 
+# ---------------------------------------------------------------------
+# ✅ Razorpay Webhook (verify + store only; applied by process_webhooks)
+# ---------------------------------------------------------------------
+@csrf_exempt
+@require_POST
+def razorpay_webhook(request):
+    """
+    Verify the webhook signature, persist the raw event keyed by its event id
+    (duplicates are dropped) and acknowledge straight away. The state changes
+    are applied in order by the process_webhooks job (or `manage.py process_webhooks`).
+    """
+    if not verify_webhook_signature(request.body, request.headers.get("X-Razorpay-Signature")):
+        logger.warning("⚠️ Razorpay webhook with invalid signature rejected.")
+        return JsonResponse({"ok": False, "error": "Invalid signature"}, status=400)
+    try:
+        with transaction.atomic():
+            record_webhook_event(request.body, request.headers.get("X-Razorpay-Event-Id"))
+            process_webhooks.enqueue(key="process_webhooks")
+    except ValueError:
+        return JsonResponse({"ok": False, "error": "Malformed payload"}, status=400)
+    return JsonResponse({"ok": True})
+
 # ---------------------------------------------------------------------
 # ✅ Step 3: Payment Success Page (Auto Invoice + Redirect)
 # ---------------------------------------------------------------------
@@ -1260,25 +1343,35 @@ def payment_success(request):
             context["message"] = "⚠️ Invalid request. No transaction ID provided."
             return render(request, "payments/payment_success.html", context)
 
-        payment = PaymentTransaction.objects.select_related("user").filter(txn_id=txn_id).first()
+        payment = PaymentTransaction.objects.select_related("user", "loan_request").filter(txn_id=txn_id).first()
         if not payment:
             context.update({
                 "status": "not_found",
                 "message": f"⚠️ No transaction found for ID: {txn_id}",
             })
         else:
-            # ✅ Mark payment as completed if pending
-            if payment.status not in ["Completed", "Failed"]:
-                payment.status = "Completed"
-                payment.save(update_fields=["status"])
+            # ✅ Still Pending (callback not seen yet) → ask Razorpay instead of assuming success
+            if payment.status == "Pending":
+                try:
+                    status, raw = gateway_status(get_razorpay_client(), payment)
+                    if status == "Completed":
+                        apply_payment_status(payment, status, raw)
+                except Exception as e:
+                    logger.warning(f"⚠️ Could not confirm {payment.txn_id} with Razorpay: {e}")
 
             user = payment.user
             profile = getattr(user, "profile", None)
             user_name = getattr(profile, "full_name", user.email.split("@")[0])
 
+            messages_by_status = {
+                "Completed": "✅ Payment Successful! Thank you for using Loan Saathi Hub.",
+                "Failed": "❌ Payment failed or cancelled.",
+            }
             context.update({
-                "status": "Completed",
-                "message": "✅ Payment Successful! Thank you for using Loan Saathi Hub.",
+                "status": payment.status,
+                "message": messages_by_status.get(
+                    payment.status, "⏳ We're confirming your payment with the bank. This page will refresh shortly."
+                ),
                 "amount": payment.amount,
                 "date": payment.created_at.strftime("%d %b %Y, %I:%M %p"),
                 "payment_method": payment.payment_method,
@@ -1339,31 +1432,29 @@ def invoice_view(request):
         messages.error(request, "Invoice not found.")
         return redirect("dashboard_router")
 
-    total_amount = payment.amount or Decimal("49.00")
-    base_amount = (total_amount / Decimal("1.18")).quantize(Decimal("0.01"))
-    gst_amount = (total_amount - base_amount).quantize(Decimal("0.01"))
-
-    user = payment.user
-    profile = getattr(user, "profile", None)
-    user_name = getattr(profile, "full_name", user.email.split("@")[0])
-
-    context = {
-        "invoice_number": f"INV-{payment.txn_id[-8:].upper()}",
-        "txn_id": payment.txn_id,
-        "amount": total_amount,
-        "base_amount": base_amount,
-        "gst_amount": gst_amount,
-        "user_email": user.email,
-        "user_name": user_name,
-        "date": payment.created_at.strftime("%d %b %Y, %I:%M %p"),
-        "payment_method": payment.payment_method or "Razorpay",
-    }
+    context = invoice_context(payment)
 
     if "download" in request.GET:
-        html_content = render_to_string("payments/invoice.html", context)
-        pdf = pdfkit.from_string(html_content, False, configuration=pdfkit_config)
-        response = HttpResponse(pdf, content_type="application/pdf")
-        response["Content-Disposition"] = f'attachment; filename="{context["invoice_number"]}.pdf"'
+        filename = f'{context["invoice_number"]}.pdf'
+        if payment.status != "Completed":
+            # Not final yet, so render fresh and don't let anything cache it
+            response = HttpResponse(render_invoice_pdf(payment), content_type="application/pdf")
+            response["Content-Disposition"] = f'attachment; filename="{filename}"'
+            response["Cache-Control"] = "private, no-store"
+            return response
+
+        # ✅ Completed invoices are immutable: serve the stored PDF
+        etag = invoice_etag(payment)
+        if etag in request.headers.get("If-None-Match", ""):
+            response = HttpResponseNotModified()
+        else:
+            name = ensure_invoice_pdf(payment)
+            response = FileResponse(
+                default_storage.open(name, "rb"), as_attachment=True,
+                filename=filename, content_type="application/pdf",
+            )
+        response["ETag"] = etag
+        response["Cache-Control"] = "private, max-age=31536000, immutable"
         return response
 
     return render(request, "payments/invoice.html", context)
@@ -1468,7 +1559,7 @@ def forgot_password_view(request):
             uid=urlsafe_base64_encode(force_bytes(user.pk))
             token=default_token_generator.make_token(user)
             link=request.build_absolute_uri(reverse("reset_password",args=[uid,token]))
-            send_mail("🔑 Reset your password",f"Hi {email}, reset here: {link}",settings.DEFAULT_FROM_EMAIL,[email])
+            queue_email("password_reset","🔑 Reset your password",f"Hi {email}, reset here: {link}",[email])
             messages.success(request,"✅ Reset email sent.")
         except User.DoesNotExist: messages.error(request,"❌ Email not found.")
     return render(request,"forgot_password.html")
@@ -1487,14 +1578,16 @@ def reset_password_view(request,uidb64,token):
 def support_view(request):
     form=SupportForm(request.POST or None)
     if request.method=="POST" and form.is_valid():
-        ticket=form.save(); send_mail(f"[Support] {ticket.subject}",ticket.message,settings.DEFAULT_FROM_EMAIL,[settings.DEFAULT_FROM_EMAIL])
+        with transaction.atomic():
+            ticket=form.save(); queue_email("support",f"[Support] {ticket.subject}",ticket.message,[settings.DEFAULT_FROM_EMAIL])
         return render(request,"support.html",{"form":SupportForm(),"success":True})
     return render(request,"support.html",{"form":form})
 
 def complaint_view(request):
     form=ComplaintForm(request.POST or None)
     if request.method=="POST" and form.is_valid():
-        c=form.save(); send_mail(f"[Complaint] Against {c.complaint_against or 'Unknown'}",c.message,settings.DEFAULT_FROM_EMAIL,[settings.DEFAULT_FROM_EMAIL])
+        with transaction.atomic():
+            c=form.save(); queue_email("complaint",f"[Complaint] Against {c.complaint_against or 'Unknown'}",c.message,[settings.DEFAULT_FROM_EMAIL])
         return render(request,"complaint.html",{"form":ComplaintForm(),"success":True})
     return render(request,"complaint.html",{"form":form})
 
@@ -1503,7 +1596,8 @@ def feedback_view(request):
     if request.method=="POST" and form.is_valid():
         fb=form.save(commit=False)
         if request.user.is_authenticated: fb.user=request.user; fb.email=fb.email or request.user.email
-        fb.save(); send_mail(f"[Feedback] rating:{fb.rating}",fb.message,settings.DEFAULT_FROM_EMAIL,[settings.DEFAULT_FROM_EMAIL])
+        with transaction.atomic():
+            fb.save(); queue_email("feedback",f"[Feedback] rating:{fb.rating}",fb.message,[settings.DEFAULT_FROM_EMAIL])
         return render(request,"feedback.html",{"form":FeedbackForm(),"success":True})
     return render(request,"feedback.html",{"form":form})
 
@@ -1605,115 +1699,41 @@ def resend_email_otp_view(request):
     return JsonResponse({"ok":False,"msg":"Failed to resend OTP"})
 
 
-# --------------- Gmail View in Admin Dashboard ---------------
-
-def fetch_emails(folder="inbox", search="ALL", limit=15):
-    """Fetch emails safely from Gmail IMAP and return structured list."""
-    mails = []
-    try:
-        # ✅ Connect securely to Gmail IMAP
-        mail = imaplib.IMAP4_SSL("imap.gmail.com")
-        mail.login(settings.EMAIL_HOST_USER, settings.EMAIL_HOST_PASSWORD)
-
-        # ✅ Select folder (case-insensitive)
-        mail.select(folder)
-
-        # ✅ Search emails
-        status, data = mail.search(None, search)
-        if status != "OK" or not data or not data[0]:
-            return [{"from": "System", "subject": "No emails found", "date": "", "snippet": ""}]
-
-        # ✅ Process latest messages
-        for num in data[0].split()[-limit:]:
-            _, raw = mail.fetch(num, "(RFC822)")
-            msg = email.message_from_bytes(raw[0][1])
-
-            snippet = ""
-            payload = msg.get_payload()
-
-            # ✅ Handle multipart messages
-            if isinstance(payload, list):
-                for part in payload:
-                    ctype = part.get_content_type()
-                    if ctype == "text/plain":
-                        snippet = part.get_payload(decode=True).decode(errors="ignore")[:200]
-                        break
-                    elif ctype == "text/html" and not snippet:
-                        snippet = part.get_payload(decode=True).decode(errors="ignore")[:200]
-            else:
-                if isinstance(payload, bytes):
-                    snippet = payload.decode(errors="ignore")[:200]
-                elif isinstance(payload, str):
-                    snippet = payload[:200]
-
-            mails.append({
-                "from": msg.get("From"),
-                "to": msg.get("To"),
-                "subject": msg.get("Subject") or "(No Subject)",
-                "date": msg.get("Date"),
-                "snippet": snippet.strip() if snippet else "(No content)",
-            })
-
-        mail.logout()
-
-    except imaplib.IMAP4.error as e:
-        mails = [{"from": "Error", "subject": f"IMAP login failed: {e}", "date": "", "snippet": ""}]
-    except Exception as e:
-        mails = [{"from": "Error", "subject": str(e), "date": "", "snippet": ""}]
-    return mails
-
 # ------------------------- Admin Emails (Gmail Integration) -------------------------
 @login_required
 def admin_emails(request):
     """
     Display Gmail Inbox and Sent emails for admin users,
     along with categorized filters like OTP, Complaints, Feedback, etc.
+    Emails come from the local mailbox cache (`manage.py sync_mailbox`, or
+    the sync_mailbox job queued when the cache is stale).
     """
     if not request.user.is_superuser:
         return redirect("dashboard_admin")
 
-    try:
-        # ✅ Fetch latest 20 emails from Inbox and Sent
-        inbox = fetch_emails("inbox", limit=20)
-        sent = fetch_emails('"[Gmail]/Sent Mail"', limit=20)
-
-        # ✅ Apply subject-based categorization (case-insensitive)
-        otp = [m for m in inbox if m.get("subject") and "otp" in m["subject"].lower()]
-        complaints = [m for m in inbox if m.get("subject") and "complaint" in m["subject"].lower()]
-        feedback = [m for m in inbox if m.get("subject") and "feedback" in m["subject"].lower()]
-        deleted_users = [m for m in inbox if m.get("subject") and "deleted" in m["subject"].lower()]
-
-        # ✅ Sort emails by date (latest first when possible)
-        def parse_date_safe(mail_item):
-            from email.utils import parsedate_to_datetime
-            try:
-                return parsedate_to_datetime(mail_item.get("date"))
-            except Exception:
-                return None
-
-        inbox.sort(key=parse_date_safe, reverse=True)
-        sent.sort(key=parse_date_safe, reverse=True)
-
-        context = {
-            "inbox": inbox,
-            "sent": sent,
-            "otp": otp,
-            "complaints": complaints,
-            "feedback": feedback,
-            "deleted_users": deleted_users,
-        }
+    inbox = cached_emails("inbox", limit=20)
+    sent = cached_emails("sent", limit=20)
+    states = {st.folder: st for st in MailboxSyncState.objects.all()}
 
-    except Exception as e:
-        # ✅ Catch any unexpected Gmail/IMAP error
-        context = {
-            "inbox": [{"from": "Error", "subject": f"Gmail Error: {e}", "date": "", "snippet": ""}],
-            "sent": [],
-            "otp": [],
-            "complaints": [],
-            "feedback": [],
-            "deleted_users": [],
-        }
+    # ✅ Apply subject-based categorization (case-insensitive)
+    otp = [m for m in inbox if "otp" in m["subject"].lower()]
+    complaints = [m for m in inbox if "complaint" in m["subject"].lower()]
+    feedback = [m for m in inbox if "feedback" in m["subject"].lower()]
+    deleted_users = [m for m in inbox if "deleted" in m["subject"].lower()]
+
+    inbox_state = states.get("inbox")
+    refresh_mailbox_if_stale(inbox_state)  # 🔄 background job; this page never waits on IMAP
 
+    context = {
+        "inbox": inbox,
+        "sent": sent,
+        "otp": otp,
+        "complaints": complaints,
+        "feedback": feedback,
+        "deleted_users": deleted_users,
+        "mail_synced_at": inbox_state.last_synced_at if inbox_state else None,
+        "mail_sync_error": "; ".join(st.last_error for st in states.values() if st.last_error),
+    }
     return render(request, "admin_emails.html", context)
 
 
@@ -1723,27 +1743,31 @@ def admin_email_compose(request):
     if not request.user.is_superuser:
         return redirect("dashboard_admin")
 
+    context = {"segments": segment_choices()}
     if request.method == "POST":
-        to = request.POST.get("to")
+        to = [addr.strip() for addr in (request.POST.get("to") or "").split(",") if addr.strip()]
+        segment = request.POST.get("segment") or ""
         subject = request.POST.get("subject")
         body = request.POST.get("body")
 
+        # 📣 Bulk mode: stream the segment from the DB and send over the SMTP pool in the background
+        if segment:
+            if segment not in SEGMENTS:
+                return render(request, "admin_email_compose.html", {**context, "error": "Unknown recipient segment."})
+            send_segment_email.delay(segment, subject, body)
+            messages.success(request, f"📣 Sending to {SEGMENTS[segment][0].lower()} in the background.")
+            return redirect("admin_emails")
+
+        if not to:
+            return render(request, "admin_email_compose.html", {**context, "error": "Enter at least one recipient."})
         try:
-            msg = MIMEText(body)
-            msg["Subject"] = subject
-            msg["From"] = settings.EMAIL_HOST_USER
-            msg["To"] = to
-
-            smtp = smtplib.SMTP("smtp.gmail.com", 587)
-            smtp.starttls()
-            smtp.login(settings.EMAIL_HOST_USER, settings.EMAIL_HOST_PASSWORD)
-            smtp.sendmail(settings.EMAIL_HOST_USER, [to], msg.as_string())
-            smtp.quit()
+            # Pooled backend (main/mail_backend.py): no SMTP handshake per message
+            EmailMessage(subject, body, settings.EMAIL_HOST_USER, to).send()
             return redirect("admin_emails")
         except Exception as e:
-            return render(request, "admin_email_compose.html", {"error": str(e)})
+            return render(request, "admin_email_compose.html", {**context, "error": str(e)})
 
-    return render(request, "admin_email_compose.html")
+    return render(request, "admin_email_compose.html", context)
 
 # ---------------------------------------------------------------------
 # ✅ Expense & Profit Projection Dashboard (with Chart)
@@ -1858,17 +1882,11 @@ New advertisement request received:
 """
 
         try:
-            send_mail(
-                subject,
-                content,
-                settings.DEFAULT_FROM_EMAIL,
-                ["loansaathihub@gmail.com"],
-                fail_silently=False,
-            )
-            logger.info(f"✅ Ad request email sent from {email}")
+            queue_email("advertise", subject, content, ["loansaathihub@gmail.com"])
+            logger.info(f"✅ Ad request email queued from {email}")
             return JsonResponse({"ok": True, "msg": "Your advertisement request has been sent!"})
         except Exception as e:
-            logger.exception("❌ Failed to send advertisement email")
+            logger.exception("❌ Failed to queue advertisement email")
             return JsonResponse({"ok": False, "msg": f"Error sending email: {e}"})
 
     return render(request, "advertise.html")
@@ -0,0 +1,131 @@
+"""
+Razorpay webhook inbox.
+
+The webhook view only verifies the signature and stores the raw event,
+keyed by Razorpay's event id, so a retry storm costs one INSERT (or a no-op
+on duplicates) per delivery. ``process_pending()`` applies the stored
+events to PaymentTransaction / LoanRequest / LoanLenderStatus, oldest first.
+It runs from the process_webhooks job (queued by each delivery, and again
+after ``retry_delay()`` while failed events have attempts left) or from
+``manage.py process_webhooks``.
+"""
+import hashlib
+import hmac
+import json
+import logging
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from main.models import PaymentTransaction, RazorpayWebhookEvent
+from main.payments import apply_payment_status
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 5
+RETRY_BACKOFF = 30  # seconds before the first retry, doubled after each failure
+
+
+def verify_signature(body, signature):
+    secret = settings.RAZORPAY_WEBHOOK_SECRET
+    if not secret or not signature:
+        return False
+    expected = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature)
+
+
+def record_event(body, event_id=None):
+    """Store a verified delivery; duplicates of an event id are dropped."""
+    payload = json.loads(body)
+    if not isinstance(payload, dict):
+        raise ValueError("Webhook payload is not a JSON object")
+    created_at = payload.get("created_at")
+    RazorpayWebhookEvent.objects.bulk_create([
+        RazorpayWebhookEvent(
+            event_id=event_id or hashlib.sha256(body).hexdigest(),
+            event=payload.get("event", ""),
+            payload=payload,
+            event_created_at=datetime.fromtimestamp(created_at, dt_timezone.utc) if created_at else None,
+        )
+    ], ignore_conflicts=True)
+
+
+# -------------------- Processing --------------------
+def _entity(payload, name):
+    return (payload.get("payload", {}).get(name) or {}).get("entity") or {}
+
+
+def _order_id(payload):
+    return _entity(payload, "payment").get("order_id") or _entity(payload, "order").get("id")
+
+
+def _payment_for(event):
+    order_id = _order_id(event.payload)
+    return PaymentTransaction.objects.select_related("user", "loan_request").filter(txn_id=order_id).first()
+
+
+def _payment_captured(event):
+    payment = _payment_for(event)
+    if payment:
+        apply_payment_status(payment, "Completed", event.payload)
+
+
+def _payment_failed(event):
+    payment = _payment_for(event)
+    if payment:
+        apply_payment_status(payment, "Failed", event.payload)
+
+
+HANDLERS = {
+    "payment.captured": _payment_captured,
+    "order.paid": _payment_captured,
+    "payment.failed": _payment_failed,
+}
+
+
+def process_pending(batch_size=100, blocked=None):
+    """
+    Apply unprocessed events in Razorpay's order. If an event fails, later
+    events for the same order wait for the next run so they never overtake
+    it. ``blocked`` is the set of such order ids; share one set between the
+    passes of a run so a failed event isn't retried within it. Returns
+    ``(applied, failed)``.
+    """
+    events = RazorpayWebhookEvent.objects.filter(
+        processed_at__isnull=True, attempts__lt=MAX_ATTEMPTS
+    ).order_by("event_created_at", "received_at", "pk")[:batch_size]
+
+    applied, failed = 0, 0
+    blocked = set() if blocked is None else blocked
+    for event in events:
+        order_id = _order_id(event.payload)
+        if order_id in blocked:
+            continue
+        event.attempts += 1
+        try:
+            with transaction.atomic():
+                handler = HANDLERS.get(event.event)
+                if handler:
+                    handler(event)
+                event.processed_at = timezone.now()
+                event.last_error = ""
+                event.save(update_fields=["attempts", "processed_at", "last_error"])
+            applied += 1
+        except Exception as e:
+            logger.error(f"❌ Webhook {event.event_id} ({event.event}) failed: {e}", exc_info=True)
+            event.last_error = str(e)
+            event.save(update_fields=["attempts", "last_error"])
+            blocked.add(order_id)
+            failed += 1
+    return applied, failed
+
+
+def retry_delay():
+    """Seconds to wait before retrying the failed events that still have attempts left."""
+    attempts = RazorpayWebhookEvent.objects.filter(
+        processed_at__isnull=True, attempts__gt=0, attempts__lt=MAX_ATTEMPTS
+    ).aggregate(fewest=Min("attempts"))["fewest"] or 1
+    return RETRY_BACKOFF * 2 ** (attempts - 1)